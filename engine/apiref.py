@@ -0,0 +1,369 @@
+# engine/apiref.py
+"""API reference pages rendered from the OpenAPI spec.
+
+Operations are streamed out of the spec one at a time, with local ``$ref``s
+resolved, and listed under each of their tags. An untagged operation is
+grouped under the first path segment after any version prefix, so
+``/v1/backups`` goes under ``backups``. Each tag gets its own page, covering parameters,
+request and response schemas and a curl example. ``reference.md`` becomes the
+index over those pages.
+
+Each operation is rendered to a Markdown fragment keyed by the fingerprint of
+the resolved operation. Fragments are kept in ``api-fragments.json`` in
+``CACHE_DIR``, so a run re-renders only the operations whose definition, or
+one of whose referenced schemas, changed. Pages are written through a
+``_Builder`` that collects parts and joins them once.
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from .state import digest, load_json, save_json, slug
+
+SOURCE = "intake/tech-docs/openapi.yaml"
+TAGS_DIR = "docs/samples/api-reference/tags"
+FRAGMENTS = "api-fragments.json"
+APIREF_VERSION = 1      # bump when the fragment templates change
+METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+DEFAULT_SERVER = "https://api.example.com"
+DEFAULT_OVERVIEW = "Authentication uses bearer tokens. Pagination uses `limit` and `offset`."
+MAX_DEPTH = 4           # nested schema levels listed in field tables
+
+_VERSION_SEGMENT = re.compile(r"^v\d+(?:\.\d+)*$", re.I)
+_FORMAT_EXAMPLES = {"date": "2025-01-01", "date-time": "2025-01-01T00:00:00Z",
+                    "uuid": "00000000-0000-0000-0000-000000000000", "email": "user@example.com"}
+_TYPE_EXAMPLES = {"string": "string", "integer": 0, "number": 0, "boolean": True}
+
+
+def _cell(value: Any) -> str:
+    """Single-line, pipe-safe table cell."""
+    return " ".join(str(value or "").split()).replace("|", "\\|")
+
+
+class _Builder:
+    """Incremental string builder: parts are appended and joined once."""
+    __slots__ = ("parts",)
+
+    def __init__(self) -> None:
+        self.parts: List[str] = []
+
+    def line(self, *chunks: str) -> "_Builder":
+        self.parts.extend(chunks)
+        self.parts.append("\n")
+        return self
+
+    def blank(self) -> "_Builder":
+        self.parts.append("\n")
+        return self
+
+    def raw(self, text: str) -> "_Builder":
+        self.parts.append(text)
+        return self
+
+    def table(self, header: Tuple[str, ...], rows: List[Tuple[str, ...]]) -> "_Builder":
+        self.line("| ", " | ".join(header), " |")
+        self.line("|", "---|" * len(header))
+        for row in rows:
+            self.line("| ", " | ".join(row), " |")
+        return self.blank()
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+# ---------- spec ------------------------------------------------------------
+
+class _Resolver:
+    """Inline local ``$ref``s (``#/components/...``); each ref is resolved once.
+
+    The spec is parsed JSON, so plain ``dict``/``list`` checks suffice.
+    """
+
+    def __init__(self, spec: Mapping[str, Any]):
+        self.spec = spec
+        self._done: Dict[str, Any] = {}
+
+    def _lookup(self, ref: str) -> Any:
+        node: Any = self.spec
+        for part in ref[2:].split("/"):
+            part = part.replace("~1", "/").replace("~0", "~")
+            if not isinstance(node, dict) or part not in node:
+                return {"$ref": ref}        # dangling refs are shown as-is
+            node = node[part]
+        return node
+
+    def resolve(self, node: Any, active: Tuple[str, ...] = ()) -> Any:
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str) and ref.startswith("#/"):
+                if ref in active:
+                    return {"$ref": ref}    # recursive schema: stop at the cycle
+                if ref not in self._done:
+                    self._done[ref] = self.resolve(self._lookup(ref), active + (ref,))
+                return self._done[ref]
+            return {k: self.resolve(v, active) for k, v in node.items()}
+        if isinstance(node, list):
+            return [self.resolve(v, active) for v in node]
+        return node
+
+
+@dataclass
+class Operation:
+    method: str
+    path: str
+    tags: List[str]
+    detail: Dict[str, Any]      # resolved operation, path-level parameters merged in
+
+    @property
+    def label(self) -> str:
+        return f"{self.method.upper()} {self.path}"
+
+    def fingerprint(self, server: str = DEFAULT_SERVER) -> str:
+        return digest("apiref", APIREF_VERSION, server, self.method, self.path, self.detail)
+
+
+def _default_tag(path: str) -> str:
+    for seg in path.strip("/").split("/"):
+        if seg and not _VERSION_SEGMENT.match(seg) and not seg.startswith("{"):
+            return seg
+    return "default"
+
+
+def operations(spec: Mapping[str, Any]) -> Iterator[Operation]:
+    """Every operation in ``spec`` in document order, resolved."""
+    resolver = _Resolver(spec)
+    for path, item in (spec.get("paths") or {}).items():
+        item = resolver.resolve(item)
+        if not isinstance(item, dict):
+            continue
+        shared = item.get("parameters") or []
+        for method in METHODS:
+            detail = item.get(method)
+            if not isinstance(detail, dict):
+                continue
+            own = detail.get("parameters") or []
+            names = {(p.get("name"), p.get("in")) for p in own if isinstance(p, dict)}
+            params = [p for p in shared if isinstance(p, dict)
+                      and (p.get("name"), p.get("in")) not in names] + list(own)
+            detail = dict(detail, parameters=params)
+            tags = [str(t) for t in detail.get("tags") or []] or [_default_tag(path)]
+            yield Operation(method, path, tags, detail)
+
+
+# ---------- fragments -------------------------------------------------------
+
+def _type(schema: Any) -> str:
+    if not isinstance(schema, dict):
+        return ""
+    if "$ref" in schema:
+        return schema["$ref"].rsplit("/", 1)[-1]
+    kind = schema.get("type") or ("object" if "properties" in schema else "")
+    if kind == "array":
+        return f"array of {_type(schema.get('items')) or 'any'}"
+    if schema.get("enum"):
+        kind = f"{kind} ({', '.join(str(v) for v in schema['enum'])})".strip()
+    if schema.get("format"):
+        kind = f"{kind} ({schema['format']})" if kind else str(schema["format"])
+    return kind
+
+
+def _fields(schema: Any, prefix: str = "", depth: int = 0) -> Iterator[Tuple[str, ...]]:
+    """(field, type, required, description) rows, nested objects flattened."""
+    if not isinstance(schema, dict) or depth >= MAX_DEPTH:
+        return
+    if schema.get("type") == "array" and isinstance(schema.get("items"), dict):
+        yield from _fields(schema["items"], f"{prefix}[]" if prefix else "[]", depth + 1)
+        return
+    required = set(schema.get("required") or [])
+    for name, sub in (schema.get("properties") or {}).items():
+        full = f"{prefix}.{name}" if prefix else str(name)
+        desc = sub.get("description") if isinstance(sub, dict) else ""
+        yield (f"`{full}`", _cell(_type(sub)), "yes" if name in required else "no", _cell(desc))
+        yield from _fields(sub, full, depth + 1)
+
+
+def example(schema: Any, depth: int = 0) -> Any:
+    """Example value for ``schema``: its own example or default, else one by type."""
+    if not isinstance(schema, dict) or depth > MAX_DEPTH:
+        return None
+    for key in ("example", "default"):
+        if key in schema:
+            return schema[key]
+    if schema.get("enum"):
+        return schema["enum"][0]
+    kind = schema.get("type") or ("object" if "properties" in schema else None)
+    if kind == "object":
+        return {k: example(v, depth + 1) for k, v in (schema.get("properties") or {}).items()}
+    if kind == "array":
+        return [example(schema.get("items"), depth + 1)]
+    if kind == "string" and schema.get("format") in _FORMAT_EXAMPLES:
+        return _FORMAT_EXAMPLES[schema["format"]]
+    return _TYPE_EXAMPLES.get(kind)
+
+
+def _json_body(op: Operation) -> Tuple[Optional[str], Any]:
+    content = (op.detail.get("requestBody") or {}).get("content") or {}
+    for media, body in content.items():
+        return media, (body or {}).get("schema")
+    return None, None
+
+
+def _curl(op: Operation, server: str) -> List[str]:
+    path, query, headers = op.path, [], []
+    for p in op.detail.get("parameters") or []:
+        value = example(p.get("schema") or {}) if "example" not in p else p["example"]
+        value = "" if value is None else (json.dumps(value) if isinstance(value, (dict, list)) else
+                                          str(value).lower() if isinstance(value, bool) else str(value))
+        where, name = p.get("in"), p.get("name")
+        if where == "path":
+            path = path.replace("{" + str(name) + "}", value)
+        elif where == "query":
+            query.append(f"{name}={value}")
+        elif where == "header":
+            headers.append(f'-H "{name}: {value}"')
+    url = server.rstrip("/") + path + ("?" + "&".join(query) if query else "")
+    first = "curl" + ("" if op.method == "get" else f" -X {op.method.upper()}")
+    lines = [f'{first} -H "Authorization: Bearer TOKEN"']
+    media, schema = _json_body(op)
+    if media:
+        lines.append(f'-H "Content-Type: {media}"')
+    lines += headers
+    if schema is not None:
+        body = json.dumps(example(schema), separators=(",", ":"), ensure_ascii=False)
+        lines.append(f"-d '{body}'")
+    lines.append(f'"{url}"')
+    return [lines[0]] + [f"  {l}" for l in lines[1:]]
+
+
+def render_operation(op: Operation, server: str = DEFAULT_SERVER) -> str:
+    """Markdown fragment for one operation (``### summary`` ... trailing blank line)."""
+    d = op.detail
+    b = _Builder()
+    b.line("### ", _cell(d.get("summary")) or op.label).blank()
+    b.line("`", op.label, "`").blank()
+    if d.get("deprecated"):
+        b.line("**Deprecated.**").blank()
+    if d.get("description"):
+        b.line(str(d["description"]).strip()).blank()
+
+    params = [p for p in d.get("parameters") or [] if isinstance(p, dict)]
+    if params:
+        b.line("**Parameters**").blank()
+        b.table(("Name", "In", "Type", "Required", "Description"), [
+            (f"`{p.get('name')}`", _cell(p.get("in")), _cell(_type(p.get("schema"))),
+             "yes" if p.get("required") else "no", _cell(p.get("description")))
+            for p in params
+        ])
+
+    media, schema = _json_body(op)
+    if media:
+        required = ", required" if (d.get("requestBody") or {}).get("required") else ""
+        b.line("**Request body** (`", media, "`", required, ")").blank()
+        rows = list(_fields(schema))
+        if rows:
+            b.table(("Field", "Type", "Required", "Description"), rows)
+
+    responses = d.get("responses") or {}
+    if responses:
+        b.line("**Responses**").blank()
+        b.table(("Status", "Description"), [
+            (f"`{status}`", _cell((resp or {}).get("description") if isinstance(resp, dict) else ""))
+            for status, resp in responses.items()
+        ])
+        for status, resp in responses.items():
+            content = (resp or {}).get("content") if isinstance(resp, dict) else None
+            for rmedia, body in (content or {}).items():
+                rows = list(_fields((body or {}).get("schema")))
+                if rows:
+                    b.line("`", str(status), "` response (`", rmedia, "`):").blank()
+                    b.table(("Field", "Type", "Required", "Description"), rows)
+                break
+
+    b.line("```bash").line(" \\\n".join(_curl(op, server))).line("```").blank()
+    return b.text()
+
+
+# ---------- pages -----------------------------------------------------------
+
+@dataclass
+class Reference:
+    index: str = ""                                       # reference.md body
+    pages: Dict[str, str] = field(default_factory=dict)   # file name -> page body
+    titles: Dict[str, str] = field(default_factory=dict)  # file name -> tag
+    hits: int = 0
+    misses: int = 0
+
+
+def build(spec: Mapping[str, Any], full: bool = False) -> Reference:
+    """Index and per-tag page bodies for ``spec``; unchanged operations come from the cache.
+
+    ``full`` re-renders every operation (the cache is still rewritten).
+    """
+    cached: Dict[str, str] = {} if full else load_json(FRAGMENTS, {}) or {}
+    fragments: Dict[str, str] = {}
+    servers = spec.get("servers") or []
+    server = (servers[0] or {}).get("url") if servers and isinstance(servers[0], dict) else None
+    server = server or DEFAULT_SERVER
+    out = Reference()
+
+    by_tag: Dict[str, _Builder] = {}
+    listed: Dict[str, List[Tuple[str, str]]] = {}
+    for op in operations(spec):
+        fp = op.fingerprint(server)
+        text = fragments.get(fp) or cached.get(fp)
+        if text is None:
+            text = render_operation(op, server)
+            out.misses += 1
+        else:
+            out.hits += 1
+        fragments[fp] = text
+        for tag in op.tags:
+            by_tag.setdefault(tag, _Builder()).raw(text)
+            listed.setdefault(tag, []).append((op.label, str(op.detail.get("summary") or "")))
+
+    described = {str(t.get("name")): t.get("description") for t in spec.get("tags") or []
+                 if isinstance(t, dict)}
+    index = _Builder()
+    info = spec.get("info") or {}
+    index.line("## Overview").line(str(info.get("description") or DEFAULT_OVERVIEW).strip()).blank()
+    if by_tag:
+        names: Dict[str, str] = {}
+        taken = set()
+        for tag in by_tag:
+            stem = base = slug(tag, "default")
+            n = 1
+            while stem in taken:
+                n += 1
+                stem = f"{base}-{n}"
+            taken.add(stem)
+            names[tag] = f"{stem}.md"
+        index.line("## Tags").blank()
+        index.table(("Tag", "Operations", "Description"), [
+            (f"[{_cell(tag)}](tags/{names[tag]})", str(len(listed[tag])), _cell(described.get(tag)))
+            for tag in by_tag
+        ])
+        index.line("## Operations").blank()
+        for tag in by_tag:
+            for label, summary in listed[tag]:
+                index.line(f"- `{label}`", f" — {_cell(summary)}" if summary else "",
+                           f" ([{_cell(tag)}](tags/{names[tag]}))")
+        index.blank()
+        for tag, body in by_tag.items():
+            page = _Builder()
+            page.line("## ", _cell(tag)).blank()
+            if described.get(tag):
+                page.line(str(described[tag]).strip()).blank()
+            page.raw(body.text())
+            page.line("Back to the [API reference index](../reference.md).").blank()
+            page.line("Source: ", SOURCE)
+            out.pages[names[tag]] = page.text()
+            out.titles[names[tag]] = tag
+    index.line("Source: ", SOURCE)
+    out.index = index.text()
+
+    if fragments != cached:
+        save_json(FRAGMENTS, fragments)     # only this spec's fragments are kept
+    return out
@@ -0,0 +1,144 @@
+# engine/artifact.py
+"""Typed Markdown artifacts passed between roles.
+
+Writers build an ``Artifact`` from structured front matter (title, tags,
+risk_band, approvals, ...) and a body; editors edit the body, compliance reads
+``meta`` directly and the publisher serializes the front matter once via
+``render()``. The rendered text, content hash and parsed body are cached on the
+artifact and dropped whenever the body or metadata is edited.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+from .markdown import MarkdownDoc, parse
+
+# Plain YAML scalars we emit unquoted; anything else is JSON-quoted (valid YAML).
+_PLAIN = re.compile(r"^(?=.)(?![-?:,\[\]{}#&*!|>'\"%@`\s])(?!.*(?:: |\s#))[^\n]*(?<![\s:])$")
+_FLOW_UNSAFE = re.compile(r"[,\[\]{}]")
+
+
+def _scalar(value: Any, flow: bool = False) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    s = str(value)
+    if _PLAIN.match(s) and not (flow and _FLOW_UNSAFE.search(s)):
+        return s
+    return json.dumps(s, ensure_ascii=False)
+
+
+def _emit(meta: Mapping[str, Any], indent: str = "") -> Iterator[str]:
+    for key, value in meta.items():
+        if isinstance(value, Mapping):
+            yield f"{indent}{key}:\n"
+            yield from _emit(value, indent + "  ")
+        elif isinstance(value, (list, tuple)):
+            yield f"{indent}{key}: [{', '.join(_scalar(v, flow=True) for v in value)}]\n"
+        else:
+            yield f"{indent}{key}: {_scalar(value)}\n"
+
+
+def dump_front_matter(meta: Mapping[str, Any]) -> str:
+    """Serialize ``meta`` as a ``---`` delimited YAML block (insertion order kept)."""
+    if not meta:
+        return ""
+    return "---\n" + "".join(_emit(meta)) + "---\n"
+
+
+class Artifact:
+    """Front matter + Markdown body bound for one output path."""
+
+    __slots__ = ("_meta", "_front", "_body", "path", "_text", "_hash", "_doc")
+
+    def __init__(self, meta: Optional[Dict[str, Any]], body: str, path: Optional[str] = None):
+        self._meta: Dict[str, Any] = dict(meta or {})
+        self._front: Optional[str] = None   # serialized front matter, built on demand
+        self._body = body
+        self.path = path
+        self._text: Optional[str] = None
+        self._hash: Optional[str] = None
+        self._doc: Optional[MarkdownDoc] = None
+
+    @classmethod
+    def from_markdown(cls, md: str, path: Optional[str] = None) -> "Artifact":
+        """Wrap legacy Markdown text; its front matter is kept verbatim until edited."""
+        doc = parse(md)
+        meta = doc.meta()
+        art = cls(meta if isinstance(meta, dict) else {}, doc.body, path)
+        art._front = doc.front_matter or ""
+        return art
+
+    @classmethod
+    def coerce(cls, value: Any) -> Optional["Artifact"]:
+        """``value`` as an Artifact (strings are wrapped), or None if it is neither."""
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, str):
+            return cls.from_markdown(value)
+        return None
+
+    # -- content -----------------------------------------------------------
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        """Front matter (read it freely; change it through ``update_meta``)."""
+        return self._meta
+
+    def update_meta(self, **fields: Any) -> None:
+        self._meta.update(fields)
+        self._front = None
+        self._invalidate()
+
+    @property
+    def body(self) -> str:
+        return self._body
+
+    @body.setter
+    def body(self, value: str) -> None:
+        if value != self._body:
+            self._body = value
+            self._invalidate()
+
+    def _invalidate(self) -> None:
+        self._text = self._hash = self._doc = None
+
+    # -- derived (lazy, cached until the next edit) --------------------------
+
+    @property
+    def doc(self) -> MarkdownDoc:
+        """Parsed body (sections, bullets, fences)."""
+        if self._doc is None:
+            self._doc = parse(self._body)
+        return self._doc
+
+    def render(self) -> str:
+        """Full Markdown text with the YAML front matter serialized."""
+        if self._text is None:
+            if self._front is None:
+                self._front = dump_front_matter(self._meta)
+            self._text = self._front + self._body
+        return self._text
+
+    @property
+    def hash(self) -> str:
+        """SHA-256 of the rendered text."""
+        if self._hash is None:
+            self._hash = hashlib.sha256(self.render().encode("utf-8")).hexdigest()
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"Artifact(path={self.path!r}, title={self._meta.get('title')!r}, body={len(self._body)} chars)"
+
+
+def body_of(value: Any) -> str:
+    """Body text of an Artifact, or the string itself (front matter included)."""
+    if isinstance(value, Artifact):
+        return value.body
+    return value if isinstance(value, str) else ""
@@ -0,0 +1,107 @@
+# engine/bundles.py
+"""Role- and feature-partitioned in-app guidance bundles.
+
+``tooltips.json`` stays the human-readable source of record. For the product
+client the tooltips are also cut into one bundle per (role, feature): each is
+minified JSON plus a pre-compressed ``.gz`` twin, named after its own content
+hash, so a bundle URL never changes meaning and can be cached forever.
+Tooltips past ``expires_on`` are left out.
+
+``index.json`` is the only file a client revalidates. It maps each role to
+its features' bundle files, sizes and hashes, so a client reads the index
+and then fetches only its role's bundles.
+"""
+from __future__ import annotations
+
+import datetime
+import gzip
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .state import slug
+
+log = logging.getLogger("bundles")
+
+INDEX = "index.json"
+INDEX_VERSION = 1
+ALL_ROLES = "all"          # bundle role for tooltips without role_visibility
+HASH_CHARS = 12
+
+
+def _minify(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _gzip(data: bytes) -> bytes:
+    # mtime=0 keeps the compressed bytes (and so the manifest hash) stable.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def expired(tooltip: Dict[str, Any], as_of: datetime.date) -> bool:
+    """True once ``as_of`` is past the tooltip's ``expires_on`` (YYYY-MM-DD)."""
+    raw = tooltip.get("expires_on")
+    if not raw:
+        return False
+    try:
+        return datetime.date.fromisoformat(str(raw)) < as_of
+    except ValueError:
+        log.warning("%s: unparsable expires_on %r; kept", tooltip.get("id"), raw)
+        return False
+
+
+@dataclass
+class BundleSet:
+    files: Dict[str, bytes] = field(default_factory=dict)     # file name -> bytes
+    index: Dict[str, Any] = field(default_factory=dict)
+    expired: List[str] = field(default_factory=list)
+    source_bytes: int = 0
+
+    def stats(self) -> Dict[str, int]:
+        json_bytes = sum(len(v) for k, v in self.files.items() if k.endswith(".json") and k != INDEX)
+        gz_bytes = sum(len(v) for k, v in self.files.items() if k.endswith(".json.gz") and k != INDEX + ".gz")
+        return {
+            "bundles": sum(len(f) for f in self.index.get("roles", {}).values()),
+            "json_bytes": json_bytes,
+            "gzip_bytes": gz_bytes,
+            "index_bytes": len(self.files.get(INDEX, b"")),
+            "source_bytes": self.source_bytes,
+            "expired": len(self.expired),
+        }
+
+
+def build_bundles(tooltips: List[Dict[str, Any]], as_of: datetime.date,
+                  source: Optional[str] = None) -> BundleSet:
+    """Partition live ``tooltips`` by role and feature into hashed, compressed bundles."""
+    out = BundleSet(source_bytes=len(source.encode("utf-8")) if source else 0)
+    parts: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for t in tooltips:
+        if expired(t, as_of):
+            out.expired.append(str(t.get("id")))
+            continue
+        feature = str(t.get("feature") or "general")
+        for role in t.get("role_visibility") or [ALL_ROLES]:
+            parts.setdefault((str(role), feature), []).append(t)
+
+    roles: Dict[str, Dict[str, Any]] = {}
+    for (role, feature), items in sorted(parts.items()):
+        data = _minify(items)
+        digest = hashlib.sha256(data).hexdigest()
+        name = f"{slug(role, 'general')}.{slug(feature, 'general')}.{digest[:HASH_CHARS]}.json"
+        packed = _gzip(data)
+        out.files[name] = data
+        out.files[name + ".gz"] = packed
+        roles.setdefault(role, {})[feature] = {
+            "file": name,
+            "sha256": digest,
+            "bytes": len(data),
+            "gzip_bytes": len(packed),
+            "tooltips": [t.get("id") for t in items],
+        }
+
+    out.index = {"version": INDEX_VERSION, "roles": roles, "expired": out.expired}
+    out.files[INDEX] = _minify(out.index)
+    out.files[INDEX + ".gz"] = _gzip(out.files[INDEX])
+    return out
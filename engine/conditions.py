@@ -0,0 +1,366 @@
+# engine/conditions.py
+"""Compiled ``when`` conditions for tooltips and walkthrough steps.
+
+A condition is a boolean expression over user-state flags::
+
+    firstLogin && !hasPolicy
+    hasBackup && (hasRestore || !firstLogin)
+
+``compile_when`` parses it once into a ``Condition`` that holds two compiled
+forms built from the same syntax tree:
+
+* ``cond(state)`` evaluates one user (a mapping of flag -> bool);
+* ``cond.vector(columns, ones)`` evaluates a whole population at once, where
+  each column holds one flag for every user. Columns are NumPy boolean
+  arrays when NumPy is installed and Python integers used as bitsets
+  (bit *i* = user *i*) otherwise; both only need ``&``, ``|`` and ``^``.
+
+The flags a condition may reference, and how often each is set, come from the
+``intake/inapp/user-states.yml`` fixture. ``simulate`` draws a synthetic
+population from it (deterministic per seed) and reports the audience reach
+of every tooltip and step, plus unreachable conditions and overlaps (two
+tooltips, or two steps of one flow, shown to the same user).
+"""
+from __future__ import annotations
+
+import random
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+try:  # optional: vectorized evaluation
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised where NumPy is absent
+    np = None
+
+from .registry import PolicyError, parse_policy
+
+BASE = Path(__file__).resolve().parents[1]
+USER_STATES = BASE / "intake/inapp/user-states.yml"
+
+_TOKEN = re.compile(r"\s*(?:(?P<op>&&|\|\||!|\(|\))|(?P<name>[A-Za-z_][A-Za-z0-9_]*)|(?P<bad>\S))")
+_CONSTANTS = {"true": True, "false": False}
+PROB_BITS = 16          # bitset backend: flag probabilities are exact to 2**-16
+
+
+class ConditionError(ValueError):
+    """A ``when`` expression that does not parse or names an unknown flag."""
+
+
+# --- parsing -------------------------------------------------------------------
+
+Node = Tuple[Any, ...]   # ("flag", name) | ("const", bool) | ("not", n) | ("and"|"or", a, b)
+
+
+class _Parser:
+    """Recursive descent; ``!`` binds tighter than ``&&``, which binds tighter than ``||``."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens: List[Tuple[str, str, int]] = []
+        for m in _TOKEN.finditer(text):
+            if m.group("bad"):
+                raise ConditionError(f"{text!r}: unexpected {m.group('bad')!r} at {m.start('bad')}")
+            kind = "op" if m.group("op") else "name"
+            self.tokens.append((kind, m.group(kind), m.start(kind)))
+        self.i = 0
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.i][1] if self.i < len(self.tokens) else None
+
+    def _fail(self, expected: str) -> ConditionError:
+        if self.i < len(self.tokens):
+            _, tok, pos = self.tokens[self.i]
+            return ConditionError(f"{self.text!r}: expected {expected}, got {tok!r} at {pos}")
+        return ConditionError(f"{self.text!r}: expected {expected} at end of expression")
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise ConditionError("empty condition")
+        node = self._or()
+        if self.i < len(self.tokens):
+            raise self._fail("'&&', '||' or end of expression")
+        return node
+
+    def _or(self) -> Node:
+        node = self._and()
+        while self._peek() == "||":
+            self.i += 1
+            node = ("or", node, self._and())
+        return node
+
+    def _and(self) -> Node:
+        node = self._not()
+        while self._peek() == "&&":
+            self.i += 1
+            node = ("and", node, self._not())
+        return node
+
+    def _not(self) -> Node:
+        if self._peek() == "!":
+            self.i += 1
+            return ("not", self._not())
+        return self._atom()
+
+    def _atom(self) -> Node:
+        if self.i >= len(self.tokens):
+            raise self._fail("a flag or '('")
+        kind, tok, _ = self.tokens[self.i]
+        if tok == "(":
+            self.i += 1
+            node = self._or()
+            if self._peek() != ")":
+                raise self._fail("')'")
+            self.i += 1
+            return node
+        if kind != "name":
+            raise self._fail("a flag or '('")
+        self.i += 1
+        if tok in _CONSTANTS:
+            return ("const", _CONSTANTS[tok])
+        return ("flag", tok)
+
+
+def _flags(node: Node) -> FrozenSet[str]:
+    if node[0] == "flag":
+        return frozenset([node[1]])
+    if node[0] == "const":
+        return frozenset()
+    return frozenset().union(*(_flags(n) for n in node[1:]))
+
+
+def _scalar_src(node: Node) -> str:
+    op = node[0]
+    if op == "flag":
+        return f"s.get({node[1]!r}, False)"
+    if op == "const":
+        return repr(node[1])
+    if op == "not":
+        return f"(not {_scalar_src(node[1])})"
+    return f"({_scalar_src(node[1])} {op} {_scalar_src(node[2])})"
+
+
+def _vector_src(node: Node) -> str:
+    op = node[0]
+    if op == "flag":
+        return f"c[{node[1]!r}]"
+    if op == "const":
+        return "ones" if node[1] else "(ones ^ ones)"
+    if op == "not":
+        return f"(ones ^ {_vector_src(node[1])})"
+    return f"({_vector_src(node[1])} {'&' if op == 'and' else '|'} {_vector_src(node[2])})"
+
+
+# --- compiled conditions -------------------------------------------------------
+
+@dataclass(frozen=True)
+class Condition:
+    source: str
+    flags: FrozenSet[str]
+    _scalar: Callable[[Mapping[str, bool]], bool] = field(repr=False, compare=False)
+    _vector: Callable[[Mapping[str, Any], Any], Any] = field(repr=False, compare=False)
+
+    def __call__(self, state: Mapping[str, bool]) -> bool:
+        """Evaluate for one user; missing flags count as false."""
+        return bool(self._scalar(state))
+
+    def vector(self, columns: Mapping[str, Any], ones: Any) -> Any:
+        """Evaluate for a population: one column per flag, ``ones`` = every user."""
+        return self._vector(columns, ones)
+
+    def check(self, known: Iterable[str]) -> None:
+        unknown = sorted(self.flags - set(known))
+        if unknown:
+            raise ConditionError(f"{self.source!r}: unknown flag(s) {', '.join(unknown)}")
+
+
+@lru_cache(maxsize=1024)
+def compile_when(text: str) -> Condition:
+    """Parse and compile ``text`` once (ConditionError if it does not parse)."""
+    tree = _Parser(text).parse()
+    # Names are restricted to identifiers by the tokenizer and emitted as
+    # string literals, so the generated source only ever indexes ``s``/``c``.
+    scalar = eval(compile(f"lambda s: {_scalar_src(tree)}", f"<when {text!r}>", "eval"), {"__builtins__": {}})
+    vector = eval(compile(f"lambda c, ones: {_vector_src(tree)}", f"<when {text!r}>", "eval"), {"__builtins__": {}})
+    return Condition(text.strip(), _flags(tree), scalar, vector)
+
+
+# --- populations ---------------------------------------------------------------
+
+@dataclass(frozen=True)
+class FlagSpec:
+    name: str
+    p: float
+    given: Optional[Condition] = None   # only users matching ``given`` may have the flag
+
+
+def load_flag_specs(path: Path = USER_STATES) -> Tuple[int, int, List[FlagSpec]]:
+    """``(users, seed, flags)`` from the fixture; each ``given`` may only use earlier flags."""
+    try:
+        raw = parse_policy(path, path.read_text(encoding="utf-8")) or {}
+    except PolicyError as e:
+        raise ConditionError(str(e)) from None
+    if not isinstance(raw, dict) or not isinstance(raw.get("flags"), dict):
+        raise ConditionError(f"{path}: expected a 'flags' mapping")
+    specs: List[FlagSpec] = []
+    for name, spec in raw["flags"].items():
+        spec = spec if isinstance(spec, dict) else {"p": spec}
+        p = spec.get("p")
+        if not isinstance(p, (int, float)) or isinstance(p, bool) or not 0.0 <= p <= 1.0:
+            raise ConditionError(f"{path}: flag {name!r} needs a probability 'p' between 0 and 1")
+        given = compile_when(spec["given"]) if spec.get("given") else None
+        if given is not None:
+            try:
+                given.check(s.name for s in specs)
+            except ConditionError as e:
+                raise ConditionError(f"{path}: flag {name!r}: {e} (flags may only depend on earlier flags)") from None
+        specs.append(FlagSpec(str(name), float(p), given))
+    return int(raw.get("users", 100_000)), int(raw.get("seed", 0)), specs
+
+
+class _NumpyColumns:
+    name = "numpy"
+
+    def __init__(self, n: int, seed: int):
+        self.rng = np.random.default_rng(seed)
+        self.n = n
+        self.ones = np.ones(n, dtype=bool)
+
+    def draw(self, p: float) -> Any:
+        return self.rng.random(self.n) < p
+
+    @staticmethod
+    def count(col: Any) -> int:
+        return int(np.count_nonzero(col))
+
+
+class _BitsetColumns:
+    """Columns as Python ints, one bit per user (no NumPy needed)."""
+
+    name = "bitset"
+
+    def __init__(self, n: int, seed: int):
+        self.rng = random.Random(seed)
+        self.n = n
+        self.ones = (1 << n) - 1
+
+    def draw(self, p: float) -> Any:
+        # Bernoulli(p) per bit from PROB_BITS fair bitsets: walk p's binary
+        # digits from the least significant, OR-ing for 1s and AND-ing for 0s.
+        q = round(p * (1 << PROB_BITS))
+        if q <= 0:
+            return 0
+        if q >= 1 << PROB_BITS:
+            return self.ones
+        out = 0
+        for i in range(PROB_BITS):
+            bits = self.rng.getrandbits(self.n)
+            out = (out | bits) if (q >> i) & 1 else (out & bits)
+        return out
+
+    @staticmethod
+    def count(col: Any) -> int:
+        return col.bit_count()
+
+
+@dataclass
+class Population:
+    size: int
+    backend: str
+    ones: Any
+    columns: Dict[str, Any]
+    count: Callable[[Any], int]
+
+    def reach(self, cond: Condition) -> int:
+        return self.count(cond.vector(self.columns, self.ones))
+
+
+def population(users: int, seed: int, specs: List[FlagSpec], vectorized: Optional[bool] = None) -> Population:
+    """Synthetic population of ``users`` (NumPy if available, else bitsets)."""
+    use_numpy = np is not None if vectorized is None else vectorized
+    cols = _NumpyColumns(users, seed) if use_numpy else _BitsetColumns(users, seed)
+    columns: Dict[str, Any] = {}
+    for spec in specs:
+        col = cols.draw(spec.p)
+        if spec.given is not None:
+            col = col & spec.given.vector(columns, cols.ones)
+        columns[spec.name] = col
+    return Population(users, cols.name, cols.ones, columns, cols.count)
+
+
+# --- reach report --------------------------------------------------------------
+
+@dataclass
+class ReachReport:
+    users: int
+    backend: str
+    reach: Dict[str, int] = field(default_factory=dict)        # item id -> users matched
+    conditions: Dict[str, str] = field(default_factory=dict)   # item id -> when
+    overlaps: List[Tuple[str, str, int]] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def unreachable(self) -> List[str]:
+        return [k for k, v in self.reach.items() if v == 0]
+
+    def share(self, item: str) -> float:
+        return self.reach[item] / self.users if self.users else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "users": self.users,
+            "backend": self.backend,
+            "reach": {k: {"when": self.conditions[k], "users": v, "share": round(self.share(k), 4)}
+                      for k, v in self.reach.items()},
+            "unreachable": self.unreachable,
+            "overlaps": [{"a": a, "b": b, "users": n} for a, b, n in self.overlaps],
+            "errors": list(self.errors),
+        }
+
+    def to_markdown(self) -> str:
+        lines = [
+            "# In-app audience reach",
+            "",
+            f"Simulated {self.users:,} users from `intake/inapp/user-states.yml` ({self.backend}).",
+            "",
+            "| Item | When | Users | Share |",
+            "|------|------|------:|------:|",
+        ]
+        for k, v in self.reach.items():
+            lines.append(f"| {k} | `{self.conditions[k]}` | {v:,} | {self.share(k):.1%} |")
+        lines += ["", "## Unreachable", ""]
+        lines += [f"- {k}: no simulated user matches `{self.conditions[k]}`" for k in self.unreachable] or ["- none"]
+        lines += ["", "## Overlaps", ""]
+        lines += [f"- {a} and {b}: {n:,} users ({n / self.users:.1%})" for a, b, n in self.overlaps] or ["- none"]
+        return "\n".join(lines) + "\n"
+
+
+def simulate(groups: Mapping[str, Mapping[str, str]], pop: Population, known: Iterable[str]) -> ReachReport:
+    """Reach of every item, and overlaps between items of the same group.
+
+    ``groups`` maps a group name (all tooltips, one walkthrough flow) to
+    ``{item id: when}``. Items whose condition does not compile or names an
+    unknown flag are reported in ``errors`` and left out of the simulation.
+    """
+    known = set(known)
+    report = ReachReport(pop.size, pop.backend)
+    for items in groups.values():
+        matched: Dict[str, Any] = {}
+        for item, when in items.items():
+            try:
+                cond = compile_when(when)
+                cond.check(known)
+            except ConditionError as e:
+                report.errors.append(f"{item}: {e}")
+                continue
+            matched[item] = col = cond.vector(pop.columns, pop.ones)
+            report.reach[item] = pop.count(col)
+            report.conditions[item] = cond.source
+        for a, b in combinations(matched, 2):
+            n = pop.count(matched[a] & matched[b])
+            if n:
+                report.overlaps.append((a, b, n))
+    return report
@@ -0,0 +1,262 @@
+# engine/experiments.py
+"""Sequential A/B analysis of tooltip variants.
+
+Each tooltip's conversion rows (see ``engine/usage.py``) are split into an
+incumbent, the ``variant`` the tooltip ships with, and challengers, the other
+variants seen in the events. Each challenger is compared with the incumbent
+on the lift in conversion rate (challenger − incumbent):
+
+* per-arm rates get a 95% Wilson interval;
+* the lift is tested with a mixture sequential probability ratio test
+  (mSPRT, normal mixture with scale ``TAU``). Its p-value and confidence
+  sequence stay valid however often the data is looked at, so a decision can
+  be taken on any nightly run without inflating the error rate.
+
+All comparisons are computed in one pass over arrays, with NumPy when it is
+installed and with ``math`` row by row otherwise; both use the same formulas.
+
+Decisions, evaluated on the running confidence sequence (intersected across
+looks):
+
+* ``challenger wins`` / ``incumbent wins``: the sequence excludes zero;
+* ``no difference``: the sequence lies within ±``EQUIVALENCE``;
+* ``continue``: neither yet; ``collecting`` while an arm has fewer than
+  ``MIN_EXPOSED`` users.
+
+A decided experiment no longer needs its losing copy (for ``no difference``,
+the challenger), so it is flagged for retirement ahead of the tooltip's
+``expires_on``; tooltips that have already expired are left out. Look history
+is kept in the cache: a look is counted only when the exposure changed, so
+re-running on the same exports is a no-op.
+"""
+from __future__ import annotations
+
+import datetime
+import math
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+try:  # optional: vectorized statistics
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised where NumPy is absent
+    np = None
+
+from .state import load_json, save_json
+
+HISTORY = "experiments.json"
+EXPERIMENTS_VERSION = 1
+ALPHA = 0.05
+TAU = 0.05              # mSPRT mixing scale: lifts of about 5 points are expected
+MIN_EXPOSED = 100       # users per arm before any decision
+EQUIVALENCE = 0.02      # lifts within ±2 points count as no difference
+Z95 = 1.959963984540054
+_MIN_VAR = 1e-12
+
+_MATH = SimpleNamespace(sqrt=math.sqrt, log=math.log, exp=math.exp, maximum=max, minimum=min)
+
+
+def _stats(na: Any, xa: Any, nb: Any, xb: Any, xp: Any) -> Dict[str, Any]:
+    """Rates, Wilson intervals, lift, mSPRT p-value and confidence sequence.
+
+    Works elementwise on NumPy arrays (``xp`` = numpy) or on floats
+    (``xp`` = ``_MATH``); only arithmetic and ``xp`` functions are used.
+    """
+    na, nb = xp.maximum(na, 1.0), xp.maximum(nb, 1.0)
+    pa, pb = xa / na, xb / nb
+    z2 = Z95 * Z95
+
+    def wilson(p: Any, n: Any):
+        center = (p + z2 / (2 * n)) / (1 + z2 / n)
+        half = Z95 * xp.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / (1 + z2 / n)
+        return center - half, center + half
+
+    a_lo, a_hi = wilson(pa, na)
+    b_lo, b_hi = wilson(pb, nb)
+    lift = pb - pa
+    var = xp.maximum(pa * (1 - pa) / na + pb * (1 - pb) / nb, _MIN_VAR)
+    t2 = TAU * TAU
+    log_lr = 0.5 * xp.log(var / (var + t2)) + lift * lift * t2 / (2 * var * (var + t2))
+    half = xp.sqrt(var * (var + t2) / t2 * (xp.log((var + t2) / var) + 2 * math.log(1 / ALPHA)))
+    return {"rate_a": pa, "a_lo": a_lo, "a_hi": a_hi, "rate_b": pb, "b_lo": b_lo, "b_hi": b_hi,
+            "lift": lift, "lo": lift - half, "hi": lift + half, "p": xp.exp(xp.minimum(0.0, -log_lr))}
+
+
+def compare(rows: Sequence[Sequence[int]], vectorized: Optional[bool] = None) -> List[Dict[str, float]]:
+    """Statistics for each ``(n_a, converted_a, n_b, converted_b)`` row."""
+    if not rows:
+        return []
+    if (np is not None) if vectorized is None else vectorized:
+        cols = np.asarray(rows, dtype=np.float64).T
+        out = _stats(cols[0], cols[1], cols[2], cols[3], np)
+        keys = list(out)
+        return [dict(zip(keys, vals)) for vals in zip(*(out[k].tolist() for k in keys))]
+    return [_stats(float(na), float(xa), float(nb), float(xb), _MATH) for na, xa, nb, xb in rows]
+
+
+@dataclass
+class Experiment:
+    tooltip: str
+    incumbent: str
+    challenger: str
+    exposed: List[int]          # incumbent, challenger
+    converted: List[int]
+    stats: Dict[str, float]
+    looks: int = 1
+    p: float = 1.0              # running (always-valid) p-value
+    lo: float = -1.0            # running confidence sequence for the lift
+    hi: float = 1.0
+    decision: str = "collecting"
+    decided_on: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.tooltip}:{self.incumbent}:{self.challenger}"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"tooltip": self.tooltip, "incumbent": self.incumbent, "challenger": self.challenger,
+                "exposed": self.exposed, "converted": self.converted,
+                "stats": {k: round(v, 6) for k, v in self.stats.items()},
+                "looks": self.looks, "p": round(self.p, 6), "lift_ci": [round(self.lo, 6), round(self.hi, 6)],
+                "decision": self.decision, "decided_on": self.decided_on}
+
+
+@dataclass
+class ExperimentReport:
+    experiments: List[Experiment] = field(default_factory=list)
+    retire: List[Dict[str, Any]] = field(default_factory=list)
+    backend: str = "math"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "experiments": [e.as_dict() for e in self.experiments],
+                "retire": self.retire}
+
+    def to_markdown(self) -> List[str]:
+        """Lines for the metrics page (empty when no tooltip has two arms)."""
+        if not self.experiments:
+            return []
+
+        def pct(x: float) -> str:
+            return f"{100.0 * x:.1f}%"
+
+        def pts(x: float) -> str:
+            return f"{100.0 * x:+.1f}"
+
+        out = ["## Tooltip experiments", "",
+               "| Tooltip | Arms | Incumbent rate (95% CI) | Challenger rate (95% CI) "
+               "| Lift, points (always-valid 95% CI) | p (always valid) | Looks | Decision |",
+               "|---------|------|-------------------------|--------------------------"
+               "|------------------------------------|------------------|-------|----------|"]
+        for e in self.experiments:
+            s = e.stats
+            decision = e.decision + (f" ({e.decided_on})" if e.decided_on else "")
+            out.append(f"| {e.tooltip} | {e.incumbent} vs {e.challenger} | "
+                       f"{pct(s['rate_a'])} ({pct(s['a_lo'])}–{pct(s['a_hi'])}) | "
+                       f"{pct(s['rate_b'])} ({pct(s['b_lo'])}–{pct(s['b_hi'])}) | "
+                       f"{pts(s['lift'])} ({pts(e.lo)} to {pts(e.hi)}) | {e.p:.4f} | {e.looks} | {decision} |")
+        out += ["", f"Lifts are challenger − incumbent (the tooltip's shipped variant). Tests are mSPRT "
+                    f"at α = {ALPHA}; no decision before {MIN_EXPOSED} users per arm; \"no difference\" "
+                    f"means the lift is within ±{100 * EQUIVALENCE:.0f} points.", ""]
+        if self.retire:
+            out += ["### Retire before expiry", "",
+                    "| Tooltip | Retire variant | Keep variant | Expires | Reason |",
+                    "|---------|----------------|--------------|---------|--------|"]
+            for r in self.retire:
+                expires = r["expires_on"] or "–"
+                if r["days_left"] is not None:
+                    expires += f" ({r['days_left']} days left)"
+                out.append(f"| {r['tooltip']} | {r['retire']} | {r['keep']} | {expires} | {r['reason']} |")
+            out.append("")
+        return out
+
+
+def _decide(e: Experiment) -> str:
+    if min(e.exposed) < MIN_EXPOSED:
+        return "collecting"
+    if e.lo > 0:
+        return "challenger wins"
+    if e.hi < 0:
+        return "incumbent wins"
+    if -EQUIVALENCE <= e.lo and e.hi <= EQUIVALENCE:
+        return "no difference"
+    return "continue"
+
+
+def analyze(conversion: Iterable[Mapping[str, Any]], tooltips: Iterable[Mapping[str, Any]],
+            as_of: datetime.date, vectorized: Optional[bool] = None,
+            history: Optional[Dict[str, Any]] = None) -> ExperimentReport:
+    """Compare every tooltip's challengers with its incumbent.
+
+    ``history`` (look count, running p-value and confidence sequence per
+    comparison) is updated in place; when None it is loaded from and saved to
+    the cache.
+    """
+    shipped = {str(t.get("id")): t for t in tooltips}
+    arms: Dict[str, Dict[str, List[int]]] = {}
+    for c in conversion:
+        arms.setdefault(str(c["tooltip"]), {})[str(c["variant"])] = [int(c["exposed"]), int(c["converted"])]
+
+    experiments: List[Experiment] = []
+    rows: List[List[int]] = []
+    for tid, by_variant in arms.items():
+        if len(by_variant) < 2:
+            continue
+        own = str((shipped.get(tid) or {}).get("variant") or "")
+        incumbent = own if own in by_variant else sorted(by_variant)[0]
+        for challenger in sorted(v for v in by_variant if v != incumbent):
+            (na, xa), (nb, xb) = by_variant[incumbent], by_variant[challenger]
+            experiments.append(Experiment(tid, incumbent, challenger, [na, nb], [xa, xb], {}))
+            rows.append([na, xa, nb, xb])
+
+    use_numpy = (np is not None) if vectorized is None else vectorized
+    report = ExperimentReport(backend="numpy" if use_numpy else "math")
+    persist = history is None
+    if persist:
+        cached = load_json(HISTORY, {}) or {}
+        history = cached.get("experiments", {}) if cached.get("version") == EXPERIMENTS_VERSION else {}
+    previous = dict(history)
+    history.clear()
+
+    for e, s in zip(experiments, compare(rows, use_numpy)):
+        e.stats = s
+        e.p, e.lo, e.hi = s["p"], s["lo"], s["hi"]
+        old = previous.get(e.key)
+        n = sum(e.exposed)
+        if isinstance(old, dict) and old.get("n") == n:
+            e.looks, e.p, e.lo, e.hi = old["looks"], old["p"], old["lo"], old["hi"]
+            e.decision, e.decided_on = old["decision"], old.get("decided_on")
+        else:
+            if isinstance(old, dict) and old.get("n", 0) < n:
+                # Another look at a growing sample: keep the running minimum
+                # p-value and the intersection of the confidence sequences.
+                e.looks = old["looks"] + 1
+                e.p = min(e.p, old["p"])
+                if max(e.lo, old["lo"]) <= min(e.hi, old["hi"]):
+                    e.lo, e.hi = max(e.lo, old["lo"]), min(e.hi, old["hi"])
+                if old.get("decided_on"):
+                    e.decision, e.decided_on = old["decision"], old["decided_on"]
+            if not e.decided_on:
+                e.decision = _decide(e)
+                if e.decision not in ("collecting", "continue"):
+                    e.decided_on = as_of.isoformat()
+        history[e.key] = {"n": n, "looks": e.looks, "p": e.p, "lo": e.lo, "hi": e.hi,
+                          "decision": e.decision, "decided_on": e.decided_on}
+        report.experiments.append(e)
+
+        if e.decided_on:
+            keep, drop = ((e.challenger, e.incumbent) if e.decision == "challenger wins"
+                          else (e.incumbent, e.challenger))
+            expires = str((shipped.get(e.tooltip) or {}).get("expires_on") or "")
+            try:
+                days_left: Optional[int] = (datetime.date.fromisoformat(expires) - as_of).days
+            except ValueError:
+                days_left = None
+            if days_left is not None and days_left < 0:
+                continue            # already expired: nothing left to retire early
+            report.retire.append({"tooltip": e.tooltip, "retire": drop, "keep": keep,
+                                  "expires_on": expires or None, "days_left": days_left,
+                                  "reason": e.decision, "decided_on": e.decided_on})
+
+    if persist and history != previous:
+        save_json(HISTORY, {"version": EXPERIMENTS_VERSION, "experiments": history})
+    return report
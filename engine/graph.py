@@ -1,14 +1,18 @@
 # engine/graph.py
 from __future__ import annotations
 
+import datetime
 import os
 import time
 from typing import Callable, List, Dict, Any, Tuple
 
+from . import ledger
+from .stream import ArtifactStream
+
 # Core roles (always present)
 from .roles import (
     intake_router, researcher, writer_tech, writer_support, writer_inapp,
-    editor_style, editor_factual, compliance_guard, publisher,
+    writer_metrics, editor_style, editor_factual, compliance_guard, publisher,
 )
 
 # Optional roles (present only if the files exist)
@@ -49,11 +53,11 @@ PACKETS: Dict[str, List[Role]] = {
         editor_style, editor_factual, compliance_guard, publisher,
     ],
     "inapp-update": [
-        intake_router, researcher, writer_inapp,
+        intake_router, researcher, writer_inapp, writer_metrics,
         editor_style, editor_factual, compliance_guard, publisher,
     ],
     "all": [
-        intake_router, researcher, writer_tech, writer_inapp, writer_support,
+        intake_router, researcher, writer_tech, writer_inapp, writer_metrics, writer_support,
         editor_style, editor_factual, compliance_guard, publisher,
     ],
 }
@@ -96,18 +100,37 @@ def _run_sequence(
     *,
     stop_on_error: bool = True,
     dry_run: bool = False,
+    diff: bool = False,
+    prune: bool = False,
     include_roles: List[str] | None = None,
     exclude_roles: List[str] | None = None,
+    packet: str | None = None,
+    ctx: Dict[str, Any] | None = None,
+    timings: List[Tuple[str, float]] | None = None,
 ) -> Tuple[Dict[str, Any], List[Tuple[str, float]]]:
     """
     Execute roles in order with timing and selective include/exclude.
 
     stop_on_error: if False, continue on role errors (logs only).
     dry_run: if True, skip publisher role (compute only).
+    diff: with dry_run, run the publisher in diff mode instead of skipping it
+          (reports added/changed/unchanged paths against the publish manifest).
+    prune: let the publisher delete orphaned KB articles (see publisher.run).
     include_roles / exclude_roles: lists of role names to keep/skip.
+    ctx / timings: filled in place when given, so the caller still has them
+                   when a role raises.
     """
-    ctx: Dict[str, Any] = {}
-    timings: List[Tuple[str, float]] = []
+    ctx = ctx if ctx is not None else {}
+    ctx.update({
+        "run_id": f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}",
+        "packet": packet,
+        "producers": {},      # context key -> role that first set it
+    })
+    if dry_run and diff:
+        ctx["publish_diff"] = True
+    if prune:
+        ctx["publish_prune"] = True
+    timings = timings if timings is not None else []
     include_roles = include_roles or []
     exclude_roles = exclude_roles or []
 
@@ -116,7 +139,7 @@ def _run_sequence(
         if _should_skip(name, include_roles, exclude_roles):
             timings.append((f"{name} (skipped)", 0.0))
             continue
-        if dry_run and name == "publisher":
+        if dry_run and not diff and name.rsplit(".", 1)[-1] == "publisher":
             timings.append(("publisher (dry-run skipped)", 0.0))
             continue
 
@@ -125,7 +148,13 @@ def _run_sequence(
             out = role.run(ctx)
             if not isinstance(out, dict):
                 raise TypeError(f"{name}.run() must return dict, got {type(out)}")
+            # Cache counters from several roles accumulate instead of overwriting.
+            stats = out.pop("cache_stats", None)
+            if isinstance(stats, dict):
+                ctx.setdefault("cache_stats", {}).update(stats)
             ctx.update(out)
+            for k in out:   # editors pass artifacts on; the first role to set a key produced it
+                ctx["producers"].setdefault(k, name.rsplit(".", 1)[-1])
         except Exception as e:
             # Structured error; either abort or continue
             timings.append((f"{name} (error: {e})", time.perf_counter() - start))
@@ -135,21 +164,73 @@ def _run_sequence(
         else:
             timings.append((name, time.perf_counter() - start))
 
+    # A streamed KB is normally pulled by the publisher; when it did not run
+    # (dry-run, excluded) drain it so articles are still built and validated.
+    stream = ctx.get("kb_stream")
+    if isinstance(stream, ArtifactStream) and not stream.consumed:
+        start = time.perf_counter()
+        try:
+            ctx["kb_files"] = stream.drain()
+        except Exception as e:
+            timings.append((f"kb_stream (error: {e})", time.perf_counter() - start))
+            if stop_on_error:
+                raise
+        else:
+            timings.append(("kb_stream (drained)", time.perf_counter() - start))
+
     return ctx, timings
 
 
+def ledger_enabled() -> bool:
+    return os.getenv("ECE_LEDGER", "1") != "0"
+
+
+def _ledger_entry(ctx: Dict[str, Any], timings: List[Tuple[str, float]], started: str,
+                  dry_run: bool, error: Exception | None) -> Dict[str, Any]:
+    cache = {}
+    for name, stats in (ctx.get("cache_stats") or {}).items():
+        hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+        cache[name] = {"hits": hits, "misses": misses,
+                       "rate": round(hits / (hits + misses), 4) if hits + misses else 0.0}
+    entry = {
+        "run_id": ctx.get("run_id"),
+        "ts": started,
+        "packet": ctx.get("packet"),
+        "status": "failed" if error is not None else "ok",
+        "dry_run": dry_run,
+        "timings": [[name, round(secs, 4)] for name, secs in timings],
+        "artifacts": ctx.get("artifact_hashes") or {},
+        "pruned": ctx.get("pruned_paths") or [],
+        "cache": cache,
+        "compliance_notes": ctx.get("compliance_notes") or [],
+    }
+    if error is not None:
+        entry["error"] = f"{type(error).__name__}: {error}"
+    return entry
+
+
 def run(mode: str, packet: str | None = None,
         *,
         stop_on_error: bool | None = None,
-        dry_run: bool | None = None) -> Dict[str, Any]:
+        dry_run: bool | None = None,
+        diff: bool = False,
+        prune: bool | None = None,
+        comms_batch: str | None = None) -> Dict[str, Any]:
     """
     Run a packet or 'all' with sane defaults and env overrides.
 
+    diff: list what the publisher would change; requires dry_run (or ECE_DRY_RUN=1).
+    comms_batch: directory of release notes for writer_comms' batch mode.
+
     Env overrides:
       ECE_INCLUDE_ROLES=role1,role2   # run only these roles (by name)
       ECE_EXCLUDE_ROLES=roleA,roleB   # skip these roles (by name)
       ECE_STOP_ON_ERROR=0|1           # default: 1
       ECE_DRY_RUN=0|1                  # default: 0
+      ECE_PRUNE=0|1                    # delete orphaned KB articles (default: 0)
+      ECE_STREAM_KB=0|1                # stream KB articles role-to-role (default: 0)
+      ECE_LEDGER=0|1                   # append the run to the run ledger (default: 1)
+      ECE_COMMS_BATCH=dir              # comms for every release note in dir (default: off)
     """
     # Resolve packet/sequence
     if mode == "all":
@@ -166,6 +247,12 @@ def run(mode: str, packet: str | None = None,
         stop_on_error = os.getenv("ECE_STOP_ON_ERROR", "1") != "0"
     if dry_run is None:
         dry_run = os.getenv("ECE_DRY_RUN", "0") == "1"
+    if diff and not dry_run:
+        raise ValueError("diff requires dry_run (it would otherwise publish for real)")
+    if prune is None:
+        prune = os.getenv("ECE_PRUNE", "0") == "1"
+    if comms_batch is None:
+        comms_batch = os.getenv("ECE_COMMS_BATCH", "").strip() or None
 
     include_roles = _env_list("ECE_INCLUDE_ROLES")
     exclude_roles = _env_list("ECE_EXCLUDE_ROLES")
@@ -177,20 +264,41 @@ def run(mode: str, packet: str | None = None,
     if exclude_roles:
         print(f"[graph] Exclude: {exclude_roles}")
 
-    # Execute
-    ctx, timings = _run_sequence(
-        sequence,
-        stop_on_error=stop_on_error,
-        dry_run=dry_run,
-        include_roles=include_roles,
-        exclude_roles=exclude_roles,
-    )
+    # Execute (every run, failed or not, gets one line in the run ledger)
+    ctx: Dict[str, Any] = {"comms_batch_dir": comms_batch} if comms_batch else {}
+    timings: List[Tuple[str, float]] = []
+    started = datetime.datetime.now().isoformat(timespec="seconds")
+    error: Exception | None = None
+    try:
+        _run_sequence(
+            sequence,
+            stop_on_error=stop_on_error,
+            dry_run=dry_run,
+            diff=diff,
+            prune=prune,
+            include_roles=include_roles,
+            exclude_roles=exclude_roles,
+            packet=selected,
+            ctx=ctx,
+            timings=timings,
+        )
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        if ledger_enabled():
+            ledger.append(_ledger_entry(ctx, timings, started, dry_run or diff, error),
+                          ledger.DRY_RUN_LEDGER if dry_run or diff else ledger.LEDGER)
 
     # Report timings
     total = sum(t for _, t in timings)
     print("[graph] Timings:")
     for name, secs in timings:
         print(f"  - {name:<30s} {secs:7.3f}s")
+    for name, stats in (ctx.get("cache_stats") or {}).items():
+        hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+        rate = 100.0 * hits / (hits + misses) if hits + misses else 0.0
+        print(f"  - cache {name:<24s} hits={hits} misses={misses} ({rate:0.1f}% hit)")
     print(f"[graph] Total: {total:0.3f}s")
 
     return ctx
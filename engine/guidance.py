@@ -0,0 +1,314 @@
+# engine/guidance.py
+"""In-app guidance generated from structured intake.
+
+Tooltips and walkthrough steps are described per feature in
+``intake/inapp/features.yml`` (plus ``intake/inapp/features/*.yml`` for
+further products) and inherit the feature's name, owner, version, roles and
+expiry. Walkthroughs are declared under ``flows:`` and collect their steps
+from the features that name them.
+
+Ids that are not written down are derived from a content hash of what the
+entry *is* (feature and measured event for a tooltip, flow and success
+criterion for a step), so rewording the text keeps the id while a tooltip
+that measures something else becomes a new one.
+
+Generation is incremental at two levels, using ``inapp-features.json`` in
+``CACHE_DIR``. A source file whose bytes are unchanged is not parsed at all,
+and in a changed file only the features whose definition changed are
+regenerated. Hints (``hints.md`` lines ``Label: text``) and endpoints are
+cross-checked on every run, since they come from other intake.
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from .registry import PolicyError, parse_policy
+from .state import digest, file_digest, load_json, save_json, slug
+
+BASE = Path(__file__).resolve().parents[1]
+FEATURE_PATHS = [BASE / "intake/inapp/features.yml"]
+FEATURE_DIR = BASE / "intake/inapp/features"
+CACHE = "inapp-features.json"
+GUIDANCE_VERSION = 1    # bump when generated entries change shape
+
+# Field order of generated tooltips (the cache stores JSON with sorted keys).
+TOOLTIP_KEYS = ("id", "version", "owner", "feature", "text", "placement", "role_visibility",
+                "when", "variant", "measure", "expires_on")
+MEASURE_KEYS = ("event", "success_criteria", "goal")
+
+_HINT_LINE = re.compile(r"^\s*([^:#\n][^:\n]*):\s*(.+?)\s*$")
+# Plain (unquoted) YAML scalars are limited to text that every loader reads
+# back as the same string: no leading digit (ints, floats, hex, octal, dates),
+# no ``:``/``#``/quotes/tabs, and none of the YAML 1.1 booleans or null.
+_PLAIN = re.compile(r"^[A-Za-z(][A-Za-z0-9 _.,;()!?&|/+=<>*-]*$")
+_YAML_TYPED = re.compile(r"(?i)^(?:y|n|true|false|yes|no|on|off|null)$")
+
+
+class GuidanceError(ValueError):
+    """Malformed guidance intake (bad feature, duplicate id, unknown flow)."""
+
+
+def feature_files() -> List[Path]:
+    files = [p for p in FEATURE_PATHS if p.is_file()]
+    if FEATURE_DIR.is_dir():
+        files += sorted(FEATURE_DIR.glob("*.yml"))
+    return files
+
+
+def _short(*parts: Any) -> str:
+    return digest(*parts)[:8]
+
+
+def parse_hints(text: str) -> Dict[str, List[str]]:
+    """``Label: text`` lines of ``hints.md`` (front matter skipped), by label."""
+    body = text
+    if body.startswith("---"):
+        end = body.find("\n---", 3)
+        body = body[end + 4:] if end >= 0 else ""
+    out: Dict[str, List[str]] = {}
+    for line in body.splitlines():
+        m = _HINT_LINE.match(line)
+        if m:
+            out.setdefault(m.group(1).strip(), []).append(m.group(2))
+    return out
+
+
+# --- generation ----------------------------------------------------------------
+
+def _ordered(entry: Mapping[str, Any], keys: Iterable[str]) -> Dict[str, Any]:
+    keys = list(keys)
+    out = {k: entry[k] for k in keys if k in entry}
+    out.update((k, entry[k]) for k in sorted(entry) if k not in out)
+    return out
+
+
+def _tooltip(fid: str, feature: Mapping[str, Any], tt: Mapping[str, Any]) -> Dict[str, Any]:
+    name = feature.get("name") or fid
+    measure = tt.get("measure") or {}
+    tid = tt.get("id") or f"tt-{slug(fid, 'feature')}-{_short('tooltip', fid, measure.get('event') or tt.get('text'))}"
+    entry: Dict[str, Any] = {
+        "id": tid,
+        "version": str(tt.get("version") or feature.get("version") or "1.0"),
+        "owner": tt.get("owner") or feature.get("owner") or "docs-team",
+        "feature": name,
+        "text": tt.get("text") or "",
+        "placement": tt.get("placement") or "auto",
+        "role_visibility": list(tt.get("roles") or feature.get("roles") or []),
+        "when": tt.get("when") or "true",
+        "variant": tt.get("variant") or "A",
+    }
+    if measure:
+        entry["measure"] = _ordered(measure, MEASURE_KEYS)
+    expires = tt.get("expires_on") or feature.get("expires_on")
+    if expires:
+        entry["expires_on"] = str(expires)
+    return entry
+
+
+def _step(fid: str, st: Mapping[str, Any]) -> Dict[str, Any]:
+    flow = st.get("flow")
+    order = st.get("order", 0)
+    if not isinstance(order, (int, float)) or isinstance(order, bool):
+        raise GuidanceError(f"feature {fid!r}: step 'order' must be a number, got {order!r}")
+    sid = st.get("id") or f"step-{_short('step', flow, st.get('success_criteria') or st.get('text'))}"
+    return {
+        "flow": flow,
+        "order": order,
+        "feature": fid,
+        "id": sid,
+        "text": st.get("text") or "",
+        "success_criteria": st.get("success_criteria") or "",
+        "when": st.get("when") or "true",
+    }
+
+
+def generate_feature(fid: str, feature: Mapping[str, Any]) -> Dict[str, Any]:
+    """Everything one feature contributes, in cacheable (JSON) form."""
+    if not isinstance(feature, Mapping):
+        raise GuidanceError(f"feature {fid!r}: expected a mapping")
+    for key in ("tooltips", "steps", "roles", "hints", "endpoints"):
+        if feature.get(key) is not None and not isinstance(feature[key], list):
+            raise GuidanceError(f"feature {fid!r}: '{key}' must be a list")
+    steps = []
+    for st in feature.get("steps") or []:
+        if not isinstance(st, Mapping) or not st.get("flow"):
+            raise GuidanceError(f"feature {fid!r}: every step needs a 'flow'")
+        steps.append(_step(fid, st))
+    return {
+        "tooltips": [_tooltip(fid, feature, tt) for tt in feature.get("tooltips") or []],
+        "steps": steps,
+        "hints": [str(h) for h in feature.get("hints") or []],
+        "endpoints": [str(e) for e in feature.get("endpoints") or []],
+    }
+
+
+# --- incremental build ---------------------------------------------------------
+
+@dataclass
+class Guidance:
+    tooltips: List[Dict[str, Any]] = field(default_factory=list)
+    flows: List[Dict[str, Any]] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    features: int = 0
+    regenerated: int = 0
+    files_parsed: int = 0
+    files: int = 0
+
+
+def _parse_file(path: Path, cached: Mapping[str, Any], stats: Guidance) -> Dict[str, Any]:
+    try:
+        raw = parse_policy(path, path.read_text(encoding="utf-8")) or {}
+    except PolicyError as e:
+        raise GuidanceError(str(e)) from None
+    if not isinstance(raw, dict):
+        raise GuidanceError(f"{path}: expected a mapping at the top level")
+    previous = cached.get("features", {}) if isinstance(cached, Mapping) else {}
+    features: Dict[str, Any] = {}
+    for fid, feature in (raw.get("features") or {}).items():
+        fid = str(fid)
+        fp = digest(GUIDANCE_VERSION, fid, feature)
+        old = previous.get(fid)
+        if isinstance(old, dict) and old.get("fp") == fp:
+            features[fid] = old
+            continue
+        try:
+            features[fid] = {"fp": fp, **generate_feature(fid, feature)}
+        except GuidanceError as e:
+            raise GuidanceError(f"{path}: {e}") from None
+        stats.regenerated += 1
+    flows = raw.get("flows") or {}
+    if not isinstance(flows, dict):
+        raise GuidanceError(f"{path}: 'flows' must be a mapping")
+    # Round-trip so dates and other YAML scalars are cached as plain JSON.
+    return {"order": list(features), "features": features,
+            "flow_order": [str(k) for k in flows], "flows": json.loads(json.dumps({str(k): v for k, v in flows.items()}, default=str))}
+
+
+def build(hints: Mapping[str, List[str]], endpoints: Iterable[Mapping[str, Any]],
+          files: Optional[List[Path]] = None, full: bool = False) -> Guidance:
+    """Tooltips and flows for every feature file, reusing unchanged work."""
+    files = feature_files() if files is None else files
+    cache = {} if full else load_json(CACHE, {}) or {}
+    if cache.get("version") != GUIDANCE_VERSION:
+        cache = {}
+    cached_files: Dict[str, Any] = cache.get("files", {})
+    out = Guidance(files=len(files))
+    by_file: Dict[str, Any] = {}
+    for path in files:
+        key = str(path.relative_to(BASE) if path.is_relative_to(BASE) else path)
+        h = file_digest(path)
+        entry = cached_files.get(key)
+        if isinstance(entry, dict) and entry.get("sha256") == h:
+            by_file[key] = entry
+            continue
+        parsed = _parse_file(path, entry or {}, out)
+        out.files_parsed += 1
+        by_file[key] = {"sha256": h, **parsed}
+    if by_file != cached_files or cache.get("version") != GUIDANCE_VERSION:
+        save_json(CACHE, {"version": GUIDANCE_VERSION, "files": by_file})
+
+    # Assemble (cheap: no parsing, just concatenation and checks).
+    flows: Dict[str, Dict[str, Any]] = {}
+    steps: Dict[str, List[Dict[str, Any]]] = {}
+    seen_ids: Dict[str, str] = {}
+    known_endpoints = {f"{e.get('method', '').upper()} {e.get('path', '')}" for e in endpoints}
+    answered = set()
+    for key, entry in by_file.items():
+        for flow_id in entry["flow_order"]:
+            spec = entry["flows"][flow_id]
+            if flow_id in flows:
+                raise GuidanceError(f"{key}: flow {flow_id!r} is already defined")
+            flows[flow_id] = spec if isinstance(spec, dict) else {}
+        for fid in entry["order"]:
+            feat = entry["features"][fid]
+            out.features += 1
+            for t in feat["tooltips"]:
+                t = _ordered(t, TOOLTIP_KEYS)
+                if "measure" in t:
+                    t["measure"] = _ordered(t["measure"], MEASURE_KEYS)
+                if t["id"] in seen_ids:
+                    raise GuidanceError(f"{key}: tooltip id {t['id']!r} also used by {seen_ids[t['id']]}")
+                seen_ids[t["id"]] = fid
+                out.tooltips.append(t)
+            for st in feat["steps"]:
+                steps.setdefault(st["flow"], []).append(st)
+            answered.update(feat["hints"])
+            if known_endpoints:
+                for ep in feat["endpoints"]:
+                    if ep not in known_endpoints:
+                        out.warnings.append(f"feature {fid}: endpoint {ep!r} is not in the API spec")
+    for flow_id, flow_steps in steps.items():
+        if flow_id not in flows:
+            raise GuidanceError(f"steps refer to undefined flow {flow_id!r} "
+                                f"(from {', '.join(sorted({s['feature'] for s in flow_steps}))})")
+    for label in hints:
+        if label not in answered:
+            out.warnings.append(f"hint {label!r} is not covered by any feature")
+    for flow_id, spec in flows.items():
+        ordered = sorted(steps.get(flow_id, []), key=lambda s: (s["order"], s["id"]))
+        out.flows.append({"flow_id": flow_id, **spec, "steps": ordered})
+    return out
+
+
+# --- rendering -----------------------------------------------------------------
+
+def tooltips_json(tooltips: List[Dict[str, Any]]) -> str:
+    return json.dumps(tooltips, indent=2, ensure_ascii=False)
+
+
+def _scalar(value: Any) -> str:
+    """``value`` as a YAML string: plain when unambiguous, else a JSON string."""
+    s = str(value)
+    if _PLAIN.match(s) and not _YAML_TYPED.match(s) and s == s.rstrip():
+        return s
+    return json.dumps(s, ensure_ascii=False)
+
+
+def _quoted(value: Any) -> str:
+    """``value`` as a single-quoted YAML string (``'`` doubled)."""
+    s = str(value)
+    if s.isprintable():
+        return "'" + s.replace("'", "''") + "'"
+    return json.dumps(s, ensure_ascii=False)
+
+
+def walkthrough_yaml(flows: List[Dict[str, Any]]) -> str:
+    """One YAML document per flow, in the layout the client reads.
+
+    With several flows the documents are separated by ``---``, so the file
+    must be read with a multi-document loader (``yaml.safe_load_all``).
+    """
+    docs = []
+    for flow in flows:
+        lines = [
+            f"flow_id: {_scalar(flow['flow_id'])}",
+            f"version: {_quoted(flow.get('version', '1.0'))}",
+            f"owner: {_scalar(flow.get('owner', 'docs-team'))}",
+            "audience:" if flow.get("audience") else "audience: []",
+            *[f"  - {_scalar(a)}" for a in flow.get("audience") or []],
+            f"when: {_scalar(flow.get('when') or 'true')}",
+            "steps:" if flow["steps"] else "steps: []",
+        ]
+        for st in flow["steps"]:
+            lines += [
+                f"  - id: {_scalar(st['id'])}",
+                f"    text: {_scalar(st['text'])}",
+                f"    success_criteria: {_scalar(st['success_criteria'])}",
+                f"    when: {_scalar(st['when'])}",
+            ]
+        metrics = flow.get("metrics") or {}
+        if metrics:
+            lines.append("metrics:")
+            if metrics.get("activation_goal"):
+                lines.append(f"  activation_goal: {_scalar(metrics['activation_goal'])}")
+            if metrics.get("success_events"):
+                lines.append("  success_events:")
+                lines += [f"    - {_scalar(e)}" for e in metrics["success_events"]]
+        if flow.get("source"):
+            lines.append(f"source: {_scalar(flow['source'])}")
+        docs.append("\n".join(lines) + "\n")
+    return "---\n".join(docs)
@@ -0,0 +1,137 @@
+# engine/ledger.py
+"""Append-only run ledger (``docs/evidence/run-ledger.jsonl``).
+
+``graph.run`` appends one JSON line per run: packet, status, per-role
+timings, published artifact hashes, cache hit rates and compliance notes.
+Dry runs publish nothing, so their lines go to ``DRY_RUN_LEDGER`` in
+``CACHE_DIR`` instead. The ledger is local state (gitignored); the committed
+record is ``decisions.md``.
+Each append is a single ``O_APPEND`` write followed by ``fsync``, so its cost
+does not depend on how long the history is.
+
+``decisions.md`` is rendered from a per-day index kept in ``CACHE_DIR``. The
+index remembers how many ledger bytes it has folded in, so each run only
+parses the lines appended since the last render. Dated lines that predate the
+ledger are imported from ``decisions.md`` the first time the index is built.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+from .state import BASE, CACHE_DIR, load_json, save_json
+
+LEDGER = BASE / "docs/evidence/run-ledger.jsonl"
+DRY_RUN_LEDGER = CACHE_DIR / "dry-run-ledger.jsonl"
+DECISIONS = BASE / "docs/evidence/decisions.md"
+INDEX = "ledger-index.json"
+INDEX_VERSION = 1
+
+_DAY_LINE = re.compile(r"^- (\d{4}-\d{2}-\d{2}): (.*)$")
+
+
+def append(entry: Mapping[str, Any], path: Path = LEDGER) -> None:
+    """Append ``entry`` as one JSON line and fsync it."""
+    line = (json.dumps(entry, sort_keys=True, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_preamble(path: Path = DECISIONS) -> str:
+    """Hand-written head of ``decisions.md``; reading stops at the first dated line."""
+    head: List[str] = []
+    if path.exists():
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                if _DAY_LINE.match(line.rstrip("\n")):
+                    break
+                head.append(line)
+    return "".join(head)
+
+
+def _legacy_days(path: Path) -> Dict[str, str]:
+    days: Dict[str, str] = {}
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            m = _DAY_LINE.match(line)
+            if m:
+                days[m.group(1)] = m.group(2)
+    return days
+
+
+def _fold(days: Dict[str, Dict[str, Any]], entry: Mapping[str, Any]) -> None:
+    day = str(entry.get("ts", ""))[:10]
+    if not day or entry.get("dry_run"):
+        return
+    d = days.setdefault(day, {"runs": 0, "failed": 0, "packets": []})
+    d["runs"] = d.get("runs", 0) + 1
+    if entry.get("status") != "ok":
+        d["failed"] = d.get("failed", 0) + 1
+    elif entry.get("packet") and entry["packet"] not in d.setdefault("packets", []):
+        d["packets"].append(entry["packet"])
+
+
+def day_index(path: Path = LEDGER, decisions: Path = DECISIONS) -> Dict[str, Dict[str, Any]]:
+    """Per-day summary of the ledger, updated from where the last call stopped."""
+    idx = load_json(INDEX, None)
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError:
+        size = 0
+    if (not isinstance(idx, dict) or idx.get("version") != INDEX_VERSION
+            or idx.get("ledger") != str(path) or idx.get("offset", 0) > size):
+        # First build (or the ledger was replaced): start over, keeping old dated lines.
+        idx = {"version": INDEX_VERSION, "ledger": str(path), "offset": 0,
+               "days": {day: {"runs": 0, "failed": 0, "packets": [], "text": text}
+                        for day, text in _legacy_days(decisions).items()}}
+        dirty = True
+    else:
+        dirty = False
+    if size > idx["offset"]:
+        with path.open("rb") as f:
+            f.seek(idx["offset"])
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break           # a torn last line is picked up once completed
+                idx["offset"] += len(raw)
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict):
+                    _fold(idx["days"], entry)
+        dirty = True
+    if dirty:
+        save_json(INDEX, idx)
+    return idx["days"]
+
+
+def render_decisions(preamble: str, days: Mapping[str, Mapping[str, Any]],
+                     today: Optional[str] = None, packet: Optional[str] = None) -> str:
+    """``decisions.md``: the hand-written head plus one line per day that ran.
+
+    ``today``/``packet`` describe the run in progress, which is only appended
+    to the ledger after the publisher has finished.
+    """
+    merged: Dict[str, Dict[str, Any]] = {k: dict(v) for k, v in days.items()}
+    if today:
+        d = merged.setdefault(today, {"packets": []})
+        if packet and packet not in d.get("packets", []):
+            d["packets"] = list(d.get("packets", [])) + [packet]
+    lines = []
+    for day in sorted(merged):
+        d = merged[day]
+        if d.get("packets"):
+            lines.append(f"- {day}: pipeline executed ({', '.join(sorted(d['packets']))})")
+        elif d.get("text"):
+            lines.append(f"- {day}: {d['text']}")
+    head = preamble if not preamble or preamble.endswith("\n") else preamble + "\n"
+    return head + "\n".join(lines) + ("\n" if lines else "")
@@ -0,0 +1,138 @@
+# engine/logscan.py
+"""Memory-mapped scan of (very) large support logs for error examples.
+
+Each log is mapped read-only and searched with the taxonomy's error patterns
+compiled as a bytes regex, so only matching lines are ever decoded. Lines are
+de-duplicated by a normalized signature (timestamps, UUIDs, hex and numeric
+IDs stripped). The scan stops as soon as enough distinct examples have been
+collected: the overall cap is reached, every taxonomy topic is full, or the
+last ``NOVELTY_WINDOW`` error lines added nothing new (for instance a log that
+only ever mentions one, already full, topic). Only kept lines are remembered,
+so memory stays bounded however many distinct lines the log holds. Multiple
+files are scanned on a process pool.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .taxonomy import load_taxonomy
+
+EXAMPLES_PER_TOPIC = int(os.getenv("ECE_LOG_EXAMPLES_PER_TOPIC", "20"))
+MAX_EXAMPLES = int(os.getenv("ECE_LOG_MAX_EXAMPLES", "60"))
+NOVELTY_WINDOW = int(os.getenv("ECE_LOG_NOVELTY_WINDOW", "10000"))
+DEFAULT_TOPIC = "restore"
+
+_SIGNATURE_SUBS = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[t ]\d{2}:\d{2}(?::\d{2})?(?:[.,]\d+)?(?:z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<ts>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"), "<id>"),
+    (re.compile(r"\b0x[0-9a-f]+\b|\b(?=[0-9a-f]*\d)(?=[0-9a-f]*[a-f])[0-9a-f]{8,}\b"), "<id>"),
+    (re.compile(r"\b\d{4,}\b"), "<n>"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def signature(line: str) -> str:
+    """Normalize a log line so repeats differing only by time/IDs collapse."""
+    s = line.lower()
+    for rx, repl in _SIGNATURE_SUBS:
+        s = rx.sub(repl, s)
+    return s.strip()
+
+
+@dataclass
+class LogExamples:
+    source: str
+    topics: Dict[str, List[str]] = field(default_factory=dict)  # first-seen order
+    scanned_bytes: int = 0
+    stopped_early: bool = False
+
+
+@lru_cache(maxsize=1)
+def _error_rx_bytes() -> "re.Pattern[bytes]":
+    parts = []
+    for entry in load_taxonomy().labels["errors"]:
+        if entry.startswith("re:"):
+            parts.append(entry[3:].encode("utf-8"))
+        else:
+            parts.append(rb"\b" + re.escape(entry.lower().encode("utf-8")) + rb"\b")
+    return re.compile(b"|".join(parts) or rb"(?!)", re.IGNORECASE)
+
+
+def scan_file(path: str, per_topic: int = EXAMPLES_PER_TOPIC,
+              max_examples: int = MAX_EXAMPLES,
+              novelty_window: int = NOVELTY_WINDOW) -> LogExamples:
+    """Collect distinct error lines from ``path`` grouped by topic."""
+    tax = load_taxonomy()
+    rx = _error_rx_bytes()
+    out = LogExamples(source=path)
+    untagged: List[str] = []
+    seen: set = set()       # signatures of kept lines only
+    total = 0
+    idle = 0                # error lines since the last kept one
+    full = 0                # taxonomy topics whose bucket is full
+    topics = len(tax.labels["topics"])
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return out
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = 0
+            while pos < size:
+                m = rx.search(mm, pos)
+                if m is None:
+                    out.scanned_bytes = size
+                    break
+                start = mm.rfind(b"\n", 0, m.start()) + 1
+                end = mm.find(b"\n", m.end())
+                end = size if end < 0 else end
+                pos = end + 1
+                out.scanned_bytes = pos
+                line = mm[start:end].decode("utf-8", errors="ignore").strip()
+                if not line:
+                    continue
+                topic = tax.infer_topic(line)
+                bucket = out.topics.setdefault(topic, []) if topic else untagged
+                sig = "" if len(bucket) >= per_topic else signature(line)
+                if not sig or sig in seen:
+                    idle += 1
+                    if idle >= novelty_window:
+                        out.stopped_early = pos < size
+                        break
+                    continue
+                seen.add(sig)
+                bucket.append(line)
+                idle = 0
+                total += 1
+                if topic and len(bucket) == per_topic:
+                    full += 1
+                if total >= max_examples or (topics and full >= topics):
+                    out.stopped_early = pos < size
+                    break
+
+    # Lines without a topic keyword follow the file's first topic (taxonomy order).
+    if untagged:
+        order = {t: i for i, t in enumerate(tax.labels["topics"])}
+        home = min(out.topics, key=lambda t: order.get(t, len(order)), default=DEFAULT_TOPIC)
+        bucket = out.topics.setdefault(home, [])
+        bucket.extend(untagged[:max(per_topic - len(bucket), 0)])
+    return out
+
+
+def scan_logs(paths: Sequence[Path], workers: Optional[int] = None) -> List[LogExamples]:
+    """Scan ``paths`` (in order) on a process pool; results keep input order."""
+    names = [str(p) for p in paths]
+    if workers is None:
+        workers = int(os.getenv("ECE_LOG_WORKERS", "0") or 0) or min(4, os.cpu_count() or 1)
+    if workers <= 1 or len(names) <= 1:
+        return [scan_file(n) for n in names]
+    with ProcessPoolExecutor(max_workers=min(workers, len(names))) as pool:
+        return list(pool.map(scan_file, names))
@@ -0,0 +1,170 @@
+# engine/markdown.py
+"""One-pass Markdown block parser shared by editors, compliance and comms.
+
+``parse(md)`` walks the text once and records the front matter, headings,
+bullets, code fences and line offsets. Results are cached by content, so
+roles that look at the same artifact reuse one parse. Because strings are
+immutable, an edited artifact is simply a new cache key.
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+FRONT_MATTER_RE = re.compile(r"(?s)^---\n(.*?)\n---\n")
+_HEADING_LINE = re.compile(r"^[ \t]*(#{1,6})[ \t]*(.*?)[ \t]*$")
+_BULLET_LINE = re.compile(r"^([ \t]*)([-*+])[ \t]+(.*)$")
+FENCE = "```"
+
+
+@dataclass(frozen=True)
+class Heading:
+    level: int
+    title: str
+    line: int          # index into MarkdownDoc.lines
+
+
+@dataclass(frozen=True)
+class Bullet:
+    marker: str
+    text: str
+    indent: int
+    line: int
+
+
+class MarkdownDoc:
+    """Parsed view of one Markdown artifact (body lines are split on ``\\n``)."""
+
+    __slots__ = ("text", "front_matter", "body", "lines", "offsets",
+                 "headings", "bullets", "fences", "_meta", "_spans")
+
+    def __init__(self, text: str):
+        self.text = text
+        m = FRONT_MATTER_RE.match(text)
+        self.front_matter: Optional[str] = m.group(0) if m else None
+        self.body = text[m.end():] if m else text
+        self.lines: List[str] = self.body.split("\n")
+        self.offsets: List[int] = []
+        self.headings: List[Heading] = []
+        self.bullets: List[Bullet] = []
+        self.fences: List[Tuple[int, int]] = []   # (open, close); close == -1 if unclosed
+        self._meta: Optional[Dict[str, Any]] = None
+        self._spans: Dict[int, Dict[str, Tuple[int, int]]] = {}
+
+        pos, fence_open = 0, -1
+        for i, line in enumerate(self.lines):
+            self.offsets.append(pos)
+            pos += len(line) + 1
+            if line.startswith(FENCE):
+                if fence_open < 0:
+                    fence_open = i
+                else:
+                    self.fences.append((fence_open, i))
+                    fence_open = -1
+                continue
+            if fence_open >= 0:
+                continue
+            if line.lstrip(" \t").startswith("#"):
+                hm = _HEADING_LINE.match(line)
+                if hm:
+                    self.headings.append(Heading(len(hm.group(1)), hm.group(2), i))
+                    continue
+            bm = _BULLET_LINE.match(line)
+            if bm:
+                self.bullets.append(Bullet(bm.group(2), bm.group(3), len(bm.group(1)), i))
+        if fence_open >= 0:
+            self.fences.append((fence_open, -1))
+
+    # -- front matter ------------------------------------------------------
+
+    def meta(self) -> Dict[str, Any]:
+        """Front matter as a dict ({} if none/bad); parsed once per document."""
+        if self._meta is None:
+            self._meta = _load_front_matter(self.front_matter[4:-5]) if self.front_matter else {}
+        return self._meta
+
+    # -- sections ----------------------------------------------------------
+
+    def sections(self, level: int = 2) -> Dict[str, Tuple[int, int]]:
+        """Lowercased title -> line range [start, end) of every ``level`` heading.
+
+        Built in one pass over the headings on first use; the first heading
+        wins when a title repeats.
+        """
+        spans = self._spans.get(level)
+        if spans is None:
+            spans = {}
+            same = [h for h in self.headings if h.level == level]
+            for h, nxt in zip(same, same[1:] + [None]):
+                spans.setdefault(h.title.lower(), (h.line + 1, nxt.line if nxt else len(self.lines)))
+            self._spans[level] = spans
+        return spans
+
+    def section_span(self, title: str, level: int = 2) -> Optional[Tuple[int, int]]:
+        """Line range [start, end) under the first heading ``title`` (case-insensitive)."""
+        return self.sections(level).get(title.strip().lower())
+
+    def section(self, title: str, level: int = 2) -> str:
+        """Text under ``title`` up to the next heading of the same level."""
+        span = self.section_span(title, level)
+        if span is None:
+            return ""
+        start, end = span
+        if start >= len(self.lines):
+            return ""
+        stop = self.offsets[end] if end < len(self.lines) else len(self.body)
+        return self.body[self.offsets[start]:stop]
+
+    def section_bullets(self, title: str, level: int = 2, marker: str = "-") -> List[Bullet]:
+        span = self.section_span(title, level)
+        if span is None:
+            return []
+        start, end = span
+        return [b for b in self.bullets if start <= b.line < end and b.marker == marker]
+
+    # -- lines / fences ----------------------------------------------------
+
+    @property
+    def last_line(self) -> str:
+        """Last non-blank line, as ``text.strip().splitlines()[-1]`` would give it."""
+        tail = self.text.strip()
+        return tail[tail.rfind("\n") + 1:]
+
+    def segments(self) -> List[Tuple[str, str]]:
+        """Split the body into alternating ("text", ...) and ("code", ...) parts.
+
+        A code part runs from its opening fence through the closing ``````
+        (the rest of the closing line stays with the following text part).
+        """
+        out: List[Tuple[str, str]] = []
+        pos = 0
+        for open_, close in self.fences:
+            start = self.offsets[open_]
+            out.append(("text", self.body[pos:start]))
+            if close < 0:
+                out.append(("code", self.body[start:]))
+                return out
+            pos = self.offsets[close] + len(FENCE)
+            out.append(("code", self.body[start:pos]))
+        out.append(("text", self.body[pos:]))
+        return out
+
+
+def _load_front_matter(raw: str) -> Dict[str, Any]:
+    try:
+        import yaml  # optional
+        return yaml.safe_load(raw) or {}
+    except Exception:
+        try:
+            return json.loads(raw)
+        except Exception:
+            return {}
+
+
+@lru_cache(maxsize=256)
+def parse(md: str) -> MarkdownDoc:
+    """Parse ``md`` (cached by content; an edit yields a fresh parse)."""
+    return MarkdownDoc(md or "")
@@ -0,0 +1,130 @@
+# engine/memo.py
+"""Persistent, LRU-bounded line memo (line -> transformed line).
+
+Keys are 16-byte BLAKE2b hashes of the line, keyed with the policy digest and
+the caller's version, so one table can hold results for several policies and
+an edited policy, or transform code whose version was bumped, simply stops
+hitting its old entries. The table is stored in ``CACHE_DIR`` as a small
+zlib-compressed binary file:
+
+    magic b"ECEMEMO1" | zlib( (key[16] | u32 length | utf-8 value)* )
+
+in least- to most-recently-used order. A length of 0xFFFFFFFF marks a line the
+transform left unchanged, so such lines cost 20 bytes on disk.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from .state import CACHE_DIR
+
+MAGIC = b"ECEMEMO1"
+_ENTRY = struct.Struct("<16sI")
+_SAME = 0xFFFFFFFF
+_MISSING = object()
+
+
+class LineMemo:
+    def __init__(self, name: str, policy: str, version: int, capacity: int):
+        self.path: Path = CACHE_DIR / name
+        self.capacity = capacity
+        self._key = hashlib.sha256(f"{version}:{policy}".encode("utf-8")).digest()
+        # hash -> transformed line, or None when the line came back unchanged
+        self._table: "OrderedDict[bytes, Optional[str]]" = OrderedDict()
+        self.fresh: Dict[bytes, Optional[str]] = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    # -- lookups -------------------------------------------------------------
+
+    def lookup(self, line: str, compute: Callable[[str], str]) -> str:
+        k = hashlib.blake2b(line.encode("utf-8", "surrogatepass"), digest_size=16, key=self._key).digest()
+        v = self._table.get(k, _MISSING)
+        if v is not _MISSING:
+            self._table.move_to_end(k)
+            self.stats["hits"] += 1
+            return line if v is None else v  # type: ignore[return-value]
+        out = compute(line)
+        v = None if out == line else out
+        self._table[k] = v
+        self.fresh[k] = v
+        self.stats["misses"] += 1
+        if len(self._table) > self.capacity:
+            self._table.popitem(last=False)
+        return out
+
+    def absorb(self, fresh: Dict[bytes, Optional[str]], hits: int, misses: int) -> None:
+        """Fold in entries and counters gathered by a worker's copy of this memo."""
+        for k, v in fresh.items():
+            self._table[k] = v
+            self._table.move_to_end(k)
+            self.fresh[k] = v
+        while len(self._table) > self.capacity:
+            self._table.popitem(last=False)
+        self.stats["hits"] += hits
+        self.stats["misses"] += misses
+
+    def fork(self) -> "LineMemo":
+        """Reset per-run bookkeeping (used in pool workers after unpickling)."""
+        self.fresh = {}
+        self.stats = {"hits": 0, "misses": 0}
+        return self
+
+    # -- persistence ---------------------------------------------------------
+
+    def load(self) -> "LineMemo":
+        try:
+            raw = self.path.read_bytes()
+        except OSError:
+            return self
+        if not raw.startswith(MAGIC):
+            return self
+        try:
+            data = zlib.decompress(raw[len(MAGIC):])
+        except zlib.error:
+            # A torn or foreign file only costs a cold run.
+            return self
+        table = self._table
+        pos, end = 0, len(data)
+        size = _ENTRY.size
+        while pos + size <= end:
+            k, n = _ENTRY.unpack_from(data, pos)
+            pos += size
+            if n == _SAME:
+                table[k] = None
+            else:
+                table[k] = data[pos:pos + n].decode("utf-8", "surrogatepass")
+                pos += n
+        while len(table) > self.capacity:
+            table.popitem(last=False)
+        return self
+
+    def save(self) -> None:
+        """Write the table if this run added entries (atomic replace)."""
+        if not self.fresh:
+            return
+        parts = []
+        pack = _ENTRY.pack
+        for k, v in self._table.items():
+            if v is None:
+                parts.append(pack(k, _SAME))
+            else:
+                b = v.encode("utf-8", "surrogatepass")
+                parts.append(pack(k, len(b)))
+                parts.append(b)
+        payload = MAGIC + zlib.compress(b"".join(parts), 1)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", delete=False, dir=str(self.path.parent)) as tf:
+            tf.write(payload)
+            tmp_name = tf.name
+        os.replace(tmp_name, self.path)
+        self.fresh = {}
+
+    def __len__(self) -> int:
+        return len(self._table)
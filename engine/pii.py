@@ -0,0 +1,145 @@
+# engine/pii.py
+"""Compiled PII scanner for the compliance ``pii_redact`` policy list.
+
+Every entry is either a built-in category (``email``, ``phone``) or a custom
+regex. Entries are compiled once per distinct list and a document is scanned in
+one left-to-right pass that merges the entries' matches: the leftmost match
+wins, ties go to the entry listed first, and scanning resumes after it. That is
+exactly what a single ``a|b|c`` alternation would report, but each entry keeps
+its own literal-prefix search, which CPython's ``re`` loses inside an
+alternation. Large texts are scanned in fixed windows with an overlap, so no
+match straddling a window boundary is lost or reported twice.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+log = logging.getLogger("pii")
+
+# The local part is possessive ('@' can never be inside it, so backtracking is
+# wasted work) and phone is gated on its first character; both match exactly
+# what the original expressions did, but fail fast on ordinary words.
+BUILTIN: Dict[str, str] = {
+    "email": r"\b[A-Za-z0-9._%+-]++@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b",
+    "phone": r"(?=[\d+(])\b(?:\+?\d{1,3}[-.\s]?)?(?:\(?\d{3}\)?[-.\s]?)?\d{3}[-.\s]?\d{4}\b",
+}
+
+CHUNK_CHARS = 1 << 20      # window size for large documents
+OVERLAP_CHARS = 4096       # must exceed the longest expected match
+
+
+@dataclass(frozen=True)
+class PiiHit:
+    category: str
+    start: int
+    end: int
+
+
+@dataclass
+class PiiReport:
+    hits: List[PiiHit] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.hits)
+
+    def add(self, hit: PiiHit) -> None:
+        self.hits.append(hit)
+        self.counts[hit.category] = self.counts.get(hit.category, 0) + 1
+
+    def summary(self, max_spans: int = 3) -> str:
+        """e.g. ``email=2 at 120-138, 560-577; phone=1 at 77-89``"""
+        parts = []
+        for cat, n in self.counts.items():
+            spans = [f"{h.start}-{h.end}" for h in self.hits if h.category == cat][:max_spans]
+            parts.append(f"{cat}={n} at {', '.join(spans)}" + (", …" if n > max_spans else ""))
+        return "; ".join(parts)
+
+
+class PiiScanner:
+    def __init__(self, entries: Sequence[str]):
+        self.categories: List[str] = []     # policy order: ranks findings, breaks ties
+        self.patterns: List["re.Pattern[str]"] = []
+        for entry in entries:
+            if not isinstance(entry, str):
+                continue
+            category = entry.lower() if entry.lower() in BUILTIN else entry
+            if category in self.categories:
+                continue
+            pattern = BUILTIN.get(category, entry)
+            try:
+                rx = re.compile(pattern)
+            except re.error as e:
+                log.warning("pii_redact entry %r is not a valid regex (%s); skipped", entry, e)
+                continue
+            self.patterns.append(rx)
+            self.categories.append(category)
+
+    @staticmethod
+    def _search(rx: "re.Pattern[str]", text: str, pos: int, endpos: int) -> Optional["re.Match[str]"]:
+        """Next non-empty match of ``rx`` in ``text[pos:endpos]``."""
+        while pos <= endpos:
+            m = rx.search(text, pos, endpos)
+            if m is None or m.end() > m.start():
+                return m
+            pos = m.start() + 1
+        return None
+
+    def _iter(self, text: str, chunk: int, overlap: int) -> Iterator[PiiHit]:
+        patterns, n = self.patterns, len(text)
+        pos = 0
+        while pos < n:
+            boundary = min(pos + chunk, n)
+            endpos = min(boundary + overlap, n)
+            pending = [self._search(rx, text, pos, endpos) for rx in patterns]
+            while True:
+                best = -1
+                for i, m in enumerate(pending):
+                    if m is not None and m.start() < pos:
+                        # Overlapped by the previous hit; look again after it.
+                        m = pending[i] = self._search(patterns[i], text, pos, endpos)
+                    if m is not None and (best < 0 or m.start() < pending[best].start()):
+                        best = i
+                if best < 0 or pending[best].start() >= boundary:
+                    break              # nothing left, or it belongs to the next window
+                m = pending[best]
+                yield PiiHit(self.categories[best], m.start(), m.end())
+                pos = m.end()
+            pos = max(pos, boundary)
+
+    def scan(self, text: str, chunk: int = CHUNK_CHARS, overlap: int = OVERLAP_CHARS) -> PiiReport:
+        """Every non-overlapping match in ``text``, with spans and per-category counts."""
+        report = PiiReport()
+        if not self.patterns or not text:
+            return report
+        for hit in self._iter(text, chunk, overlap):
+            report.add(hit)
+        return report
+
+    def first_category(self, report: PiiReport) -> Optional[str]:
+        """Highest-ranked (policy order) category present in ``report``."""
+        return next((c for c in self.categories if report.counts.get(c)), None)
+
+    def redact(self, text: str, report: Optional[PiiReport] = None) -> Tuple[str, PiiReport]:
+        """Replace each match with ``[REDACTED:<category>]`` (``[REDACTED]`` for custom regexes)."""
+        report = report if report is not None else self.scan(text)
+        if not report:
+            return text, report
+        out: List[str] = []
+        last = 0
+        for h in report.hits:
+            out.append(text[last:h.start])
+            out.append(f"[REDACTED:{h.category}]" if h.category in BUILTIN else "[REDACTED]")
+            last = h.end
+        out.append(text[last:])
+        return "".join(out), report
+
+
+@lru_cache(maxsize=8)
+def compile_scanner(entries: Tuple[str, ...]) -> PiiScanner:
+    """Scanner for a ``pii_redact`` list (compiled once per distinct list)."""
+    return PiiScanner(entries)
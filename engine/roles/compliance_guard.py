@@ -2,91 +2,39 @@
 from __future__ import annotations
 
 import logging
-import re
-import json
-from pathlib import Path
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any
+
+from ..artifact import Artifact
+from ..pii import PiiScanner
+from ..registry import compliance_policy, risk_policy
+from ..state import digest
+from ..stream import ArtifactStream
+from ..verdicts import VerdictCache, verdict_cache_enabled
 
 log = logging.getLogger("compliance_guard")
 
-BASE = Path(__file__).resolve().parents[2]
-COMPLIANCE_PATHS = [
-    BASE / "docs/governance/compliance.yml",
-    BASE / "engine/policies/compliance.yml",
-]
-RISK_PATHS = [
-    BASE / "docs/governance/risk.yml",
-    BASE / "engine/policies/risk.yml",
-]
-
-# --- loaders ---------------------------------------------------------------
-
-def _load_yaml_or_json(path: Path) -> Dict[str, Any]:
-    if not path.exists():
-        return {}
-    text = path.read_text(encoding="utf-8")
-    try:
-        import yaml  # optional
-        return yaml.safe_load(text) or {}
-    except Exception:
-        try:
-            return json.loads(text)
-        except Exception:
-            return {}
-
-def _load_first(paths) -> Dict[str, Any]:
-    for p in paths:
-        if p.exists():
-            return _load_yaml_or_json(p)
-    return {}
-
-def _load_configs() -> Tuple[Dict[str, Any], Dict[str, Any]]:
-    compliance = _load_first(COMPLIANCE_PATHS)
-    risk = _load_first(RISK_PATHS)
-    return compliance, risk
+# Bump whenever check() changes what it reports, to invalidate cached verdicts.
+VERDICT_VERSION = 1
+VERDICTS = "compliance-verdicts.json"
 
 # --- helpers ---------------------------------------------------------------
 
-FRONTMATTER_RE = re.compile(r"^---\n(.*?)\n---\n", re.S)
-
-def _parse_frontmatter(md: str) -> Dict[str, Any]:
-    """Extract YAML front-matter into a dict; return {} if none/bad."""
-    if not md:
-        return {}
-    m = FRONTMATTER_RE.match(md)
-    if not m:
-        return {}
-    raw = m.group(1)
-    try:
-        import yaml  # optional
-        return yaml.safe_load(raw) or {}
-    except Exception:
-        try:
-            return json.loads(raw)
-        except Exception:
-            return {}
-
-EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
-PHONE_RE = re.compile(
-    r"\b(?:\+?\d{1,3}[-.\s]?)?(?:\(?\d{3}\)?[-.\s]?)?\d{3}[-.\s]?\d{4}\b"
-)
-
-def _has_pii(text: str, checks: list[str]) -> Optional[str]:
-    if not text:
-        return None
-    for c in checks or []:
-        if c.lower() == "email" and EMAIL_RE.search(text):
-            return "email"
-        if c.lower() == "phone" and PHONE_RE.search(text):
-            return "phone"
-        # allow custom regex tokens if needed
-        try:
-            rx = re.compile(c)
-            if rx.search(text):
-                return c
-        except re.error:
-            pass
-    return None
+def _meta_text(meta: Any) -> str:
+    """Front-matter values flattened to text (for PII scanning)."""
+    if isinstance(meta, dict):
+        return "\n".join(_meta_text(v) for v in meta.values())
+    if isinstance(meta, (list, tuple)):
+        return "\n".join(_meta_text(v) for v in meta)
+    return "" if meta is None else str(meta)
+
+def _redact_meta(value: Any, scanner: PiiScanner) -> Any:
+    if isinstance(value, dict):
+        return {k: _redact_meta(v, scanner) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_redact_meta(v, scanner) for v in value]
+    if isinstance(value, str):
+        return scanner.redact(value)[0]
+    return value
 
 # --- main ------------------------------------------------------------------
 
@@ -98,41 +46,56 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
       - hard_fail_missing_source (bool)
       - hard_fail_missing_gates (bool)
       - hard_fail_pii (bool)
+      - redact_pii (bool)                  # rewrite PII spans instead of flagging
       - approvals_required: { api_and_release_notes: [...], kb_major_changes: [...] }
     Risk bands in risk.yml:
       risk_band:
         L1: [...]
         L2: ["public-docs", "release-notes", "api-reference", "in-app"]
     """
-    compliance, risk = _load_configs()
+    compliance, risk = compliance_policy(), risk_policy()
     notes: list[str] = []
     errors: list[str] = []
 
-    sources_required = bool(compliance.get("sources_required", True))
-    hard_fail_missing_source = bool(compliance.get("hard_fail_missing_source", False))
-    hard_fail_missing_gates = bool(compliance.get("hard_fail_missing_gates", False))
-    hard_fail_pii = bool(compliance.get("hard_fail_pii", False))
-
-    approvals_required = compliance.get("approvals_required", {})
-    l2_set = set((risk.get("risk_band", {}) or {}).get("L2", []))
-
-    # Collect governed texts
-    items: list[tuple[str, str]] = []
-    if isinstance(context.get("api_reference_md"), str):
-        items.append(("api-reference", context["api_reference_md"]))
-    if isinstance(context.get("user_guide_md"), str):
-        items.append(("user-guide", context["user_guide_md"]))
-    if isinstance(context.get("release_notes_md"), str):
-        items.append(("release-notes", context["release_notes_md"]))
+    sources_required = compliance.sources_required
+    hard_fail_missing_source = compliance.hard_fail_missing_source
+    hard_fail_missing_gates = compliance.hard_fail_missing_gates
+    hard_fail_pii = compliance.hard_fail_pii
+    redact_pii = compliance.redact_pii
+    scanner = compliance.scanner
+    findings: Dict[str, Dict[str, Any]] = {}
+
+    approvals_required = compliance.approvals_required
+    l2_set = risk.band("L2")
+
+    # Collect governed artifacts
+    items: list[tuple[str, Artifact]] = []
+    for name, key in (("api-reference", "api_reference_md"),
+                      ("user-guide", "user_guide_md"),
+                      ("release-notes", "release_notes_md")):
+        art = Artifact.coerce(context.get(key))
+        if art is not None:
+            context[key] = art  # redaction edits the artifact in place
+            items.append((name, art))
     kb = context.get("kb_files", {})
     if isinstance(kb, dict):
         for name, body in kb.items():
-            if isinstance(body, str):
+            art = Artifact.coerce(body)
+            if art is not None:
                 # treat all KB as "kb-article"
-                items.append((f"kb:{name}", body))
-
-    for name, text in items:
-        fm = _parse_frontmatter(text)
+                kb[name] = art
+                items.append((f"kb:{name}", art))
+    api_pages = context.get("api_pages", {})
+    if isinstance(api_pages, dict):
+        for name, body in api_pages.items():
+            art = Artifact.coerce(body)
+            if art is not None:
+                api_pages[name] = art
+                items.append((f"api-reference:{name}", art))
+
+    def check(name: str, art: Artifact, notes: list[str], errors: list[str]) -> None:
+        fm = art.meta
+        text = art.body
 
         # 1) Source presence (warn or fail; editor_factual normally inserts)
         if sources_required and "Source:" not in text:
@@ -142,14 +105,33 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
             else:
                 notes.append(msg)
 
-        # 2) PII detection
-        pii_hit = _has_pii(text, compliance.get("pii_redact", []))
-        if pii_hit:
-            msg = f"PII detected ({pii_hit}) in {name}"
-            if hard_fail_pii:
-                errors.append(msg)
+        # 2) PII detection (every span, one pass per text)
+        body_pii = scanner.scan(text)
+        meta_pii = scanner.scan(_meta_text(fm))
+        if body_pii or meta_pii:
+            where = "; ".join(filter(None, [
+                body_pii.summary(),
+                f"front matter: {meta_pii.summary()}" if meta_pii else "",
+            ]))
+            findings[name] = {
+                "counts": {c: body_pii.counts.get(c, 0) + meta_pii.counts.get(c, 0)
+                           for c in {**body_pii.counts, **meta_pii.counts}},
+                "spans": [[h.category, h.start, h.end] for h in body_pii.hits],
+                "redacted": redact_pii,
+            }
+            if redact_pii:
+                if body_pii:
+                    art.body = scanner.redact(text, body_pii)[0]
+                if meta_pii:
+                    art.update_meta(**_redact_meta(dict(fm), scanner))
+                notes.append(f"PII redacted in {name} ({where})")
             else:
-                notes.append(msg)
+                first = scanner.first_category(body_pii) or scanner.first_category(meta_pii)
+                msg = f"PII detected ({first}) in {name} ({where})"
+                if hard_fail_pii:
+                    errors.append(msg)
+                else:
+                    notes.append(msg)
 
         # 3) Risk band gates (front-matter aware)
         tags = set(fm.get("tags", []) or [])
@@ -167,7 +149,7 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
 
             # approvals for API & Release Notes (per policy)
             need = set(approvals_required.get("api_and_release_notes", []))
-            if name in ("api-reference", "release-notes") and need:
+            if name.split(":", 1)[0] in ("api-reference", "release-notes") and need:
                 have = {k for k, v in approvals.items() if v}
                 if not need.issubset(have):
                     msg = f"{name} missing approvals {sorted(need - have)}"
@@ -176,6 +158,49 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
                     else:
                         notes.append(msg)
 
+    verdicts = (VerdictCache(VERDICTS, digest(compliance.digest, risk.digest), VERDICT_VERSION).load()
+                if verdict_cache_enabled() else None)
+
+    def check_cached(name: str, art: Artifact, notes: list[str], errors: list[str]) -> None:
+        """check(), replayed from the verdict cache when the artifact is unchanged."""
+        if verdicts is None:
+            check(name, art, notes, errors)
+            return
+        key = verdicts.key(name, art.hash)
+        verdict = verdicts.get(key)
+        if verdict is None:
+            before = art.hash
+            verdict = {"notes": [], "errors": []}
+            check(name, art, verdict["notes"], verdict["errors"])
+            if name in findings:
+                verdict["pii"] = findings[name]
+            # A redacted artifact is re-scanned next run, so the edit is re-applied.
+            if art.hash == before:
+                verdicts.put(key, verdict)
+        elif "pii" in verdict:
+            findings[name] = verdict["pii"]
+        notes.extend(verdict["notes"])
+        errors.extend(verdict["errors"])
+
+    for name, art in items:
+        check_cached(name, art, notes, errors)
+
+    # Streamed KB articles are checked as the publisher pulls them; their
+    # findings accumulate on the stream and fail the run before commit.
+    stream = context.get("kb_stream")
+    if isinstance(stream, ArtifactStream):
+        def gate(name: str, text: Any) -> Any:
+            art = Artifact.coerce(text)
+            if art is None:
+                return text
+            check_cached(f"kb:{name}", art, stream.notes, stream.errors)
+            return art
+        stream.map("compliance_guard", gate)
+        if verdicts is not None:
+            stream.on_complete(verdicts.save)
+    elif verdicts is not None:
+        verdicts.save()
+
     # Log results
     for n in notes:
         log.info("compliance: %s", n)
@@ -185,4 +210,7 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
         raise ValueError("; ".join(errors))
 
     log.info("compliance passed")
-    return {"approved": True, "compliance_notes": notes}
+    out = {"approved": True, "compliance_notes": notes, "pii_findings": findings}
+    if verdicts is not None:
+        out["cache_stats"] = {"compliance_verdicts": verdicts.stats}
+    return out
@@ -1,41 +1,32 @@
 """Verify and normalize factual claims by enforcing Source lines."""
 from __future__ import annotations
 
-import json
 import logging
 import re
-from pathlib import Path
 from typing import Any, Dict
 
+from ..artifact import Artifact
+from ..markdown import parse
+from ..registry import compliance_policy
+from ..state import digest
+from ..stream import ArtifactStream
+from ..verdicts import VerdictCache, verdict_cache_enabled
+
 log = logging.getLogger("editor_factual")
 
-BASE = Path(__file__).resolve().parents[2]
-COMPLIANCE_PATHS = [
-    BASE / "docs/governance/compliance.yml",
-    BASE / "engine/policies/compliance.yml",
-]
-
-def _load_compliance() -> Dict[str, Any]:
-    """Load compliance policy (YAML or JSON)."""
-    text = ""
-    for p in COMPLIANCE_PATHS:
-        if p.exists():
-            text = p.read_text(encoding="utf-8")
-            break
-    if not text:
-        return {}
-    try:
-        import yaml  # optional
-        return yaml.safe_load(text)
-    except Exception:
-        # allow JSON-in-YAML files
-        return json.loads(text)
+# Bump whenever the Source check changes, to invalidate cached verdicts.
+VERDICT_VERSION = 1
+VERDICTS = "factual-verdicts.json"
 
 SOURCE_RE = re.compile(r"^Source:\s", flags=re.IGNORECASE)
 
+def _has_source(md: str) -> bool:
+    """True if the last non-empty line is a Source line."""
+    return bool(SOURCE_RE.search(parse(md).last_line))
+
 def _ensure_source(md: str, default_source: str) -> str:
     """Append a Source line if the last non-empty line is not a Source."""
-    if not md or SOURCE_RE.search(md.strip().splitlines()[-1] if md.strip().splitlines() else ""):
+    if not md or _has_source(md):
         return md
     # ensure trailing newline then add Source
     if not md.endswith("\n"):
@@ -50,13 +41,36 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
       - hard_fail_on_missing_source (bool)
     Updates context in-place with normalized content.
     """
-    policy = _load_compliance()
-    sources_required = bool(policy.get("sources_required", True))
-    hard_fail = bool(policy.get("hard_fail_on_missing_source", False))
+    policy = compliance_policy()
+    sources_required = policy.sources_required
+    hard_fail = policy.hard_fail_on_missing_source
     default_source = "intake/tech-docs/openapi.yaml"
 
     updated = 0
     missing = []
+    verdicts = (VerdictCache(VERDICTS, digest(policy.digest, default_source), VERDICT_VERSION).load()
+                if verdict_cache_enabled() else None)
+
+    def sourced(art: Artifact, label: str) -> bool:
+        """True if ``art`` needs no Source line (cached by content hash)."""
+        if verdicts is None:
+            return not art.body.strip() or _has_source(art.body)
+        key = verdicts.key(label, art.hash)
+        verdict = verdicts.get(key)
+        if verdict is None:
+            verdict = {"sourced": not art.body.strip() or _has_source(art.body)}
+            verdicts.put(key, verdict)
+        return verdict["sourced"]
+
+    def ensure(art: Artifact, label: str, errors: list) -> bool:
+        """Add a Source line to ``art`` (or record ``label``); True if edited."""
+        if sourced(art, label):
+            return False
+        if hard_fail:
+            errors.append(label)
+            return False
+        art.body = _ensure_source(art.body, default_source)
+        return True
 
     # Governed single docs
     governed_keys = [
@@ -64,28 +78,39 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
         "user_guide_md",
         "release_notes_md",
     ]
-    for k in governed_keys:
-        if k in context and isinstance(context[k], str) and context[k].strip():
-            text = context[k]
-            if sources_required and not SOURCE_RE.search(text.strip().splitlines()[-1] if text.strip().splitlines() else ""):
-                if hard_fail:
-                    missing.append(k)
-                else:
-                    context[k] = _ensure_source(text, default_source)
-                    updated += 1
-
-    # KB dict (if present)
-    kb = context.get("kb_files")
-    if isinstance(kb, dict):
-        for name, text in kb.items():
-            if isinstance(text, str) and text.strip():
-                if sources_required and not SOURCE_RE.search(text.strip().splitlines()[-1] if text.strip().splitlines() else ""):
-                    if hard_fail:
-                        missing.append(f"kb:{name}")
-                    else:
-                        kb[name] = _ensure_source(text, default_source)
-                        updated += 1
-        context["kb_files"] = kb  # write back
+    if sources_required:
+        for k in governed_keys:
+            art = Artifact.coerce(context.get(k))
+            if art is not None:
+                context[k] = art
+                updated += ensure(art, k, missing)
+
+    # KB / API tag page dicts (if present)
+    for key, prefix in (("kb_files", "kb"), ("api_pages", "api")):
+        pages = context.get(key)
+        if isinstance(pages, dict) and sources_required:
+            for name, text in pages.items():
+                art = Artifact.coerce(text)
+                if art is not None:
+                    pages[name] = art
+                    updated += ensure(art, f"{prefix}:{name}", missing)
+            context[key] = pages  # write back
+
+    stream = context.get("kb_stream")
+    if isinstance(stream, ArtifactStream) and sources_required:
+        def ensure_streamed(name: str, text: Any) -> Any:
+            art = Artifact.coerce(text)
+            if art is None:
+                return text
+            failed: list = []
+            ensure(art, f"kb:{name}", failed)
+            stream.errors.extend(f"Missing Source lines in: {f}" for f in failed)
+            return art
+        stream.map("editor_factual", ensure_streamed)
+        if verdicts is not None:
+            stream.on_complete(verdicts.save)
+    elif verdicts is not None:
+        verdicts.save()
 
     if missing:
         # Make the failure explicit and actionable
@@ -93,4 +118,4 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
 
     log.info("factual verification complete (normalized: %d)", updated)
     # no new keys; artifacts are edited in-place
-    return {}
+    return {"cache_stats": {"factual_verdicts": verdicts.stats}} if verdicts is not None else {}
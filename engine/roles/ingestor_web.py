@@ -137,6 +137,7 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
     notes = prompts_path.read_text(encoding="utf-8") if prompts_path.exists() else ""
 
     docs: List[Dict[str, Any]] = []
+    failed: List[str] = []
     for u in urls:
         try:
             html = _fetch(u)
@@ -152,7 +153,10 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
             logger.info("ingested: %s", u)
         except (HTTPError, URLError) as e:
             logger.info("failed ingest %s: %s", u, e)
+            failed.append(u)
         except Exception as e:
             logger.info("failed ingest %s: %s", u, e)
+            failed.append(u)
 
-    return {"web_docs": docs}
+    # Failed URLs keep their previously published KB articles safe from --prune.
+    return {"web_docs": docs, "web_failed": failed}
@@ -2,15 +2,29 @@
 """Write artifacts to the docs folder (atomic, idempotent, complete)."""
 from __future__ import annotations
 
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
 import hashlib
+import json
+import os
 import tempfile
+import threading
 import datetime
 
 from . import get_logger
+from .. import ledger, search
+from ..artifact import Artifact
+from ..state import COMMS_FINGERPRINTS, KB_FINGERPRINTS, save_json
+from ..stream import ArtifactStream
 
 BASE = Path(__file__).resolve().parents[2]
+MANIFEST = BASE / "docs/.publish-manifest"
+KB_DIR = BASE / "docs/samples/kb-articles"
+BUNDLE_DIR = BASE / "docs/samples/in-app-guidance/bundles"
+BUNDLE_GROUP = "inapp-bundles"
+API_TAGS_DIR = BASE / "docs/samples/api-reference/tags"
+API_TAGS_GROUP = "api-pages"
 
 # ---------- helpers ---------------------------------------------------------
 
@@ -20,56 +34,385 @@ def _rel(p: Path) -> str:
     except Exception:
         return str(p)
 
-def _sha256(s: str) -> str:
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+def _sha256(s: str | bytes) -> str:
+    return hashlib.sha256(s if isinstance(s, bytes) else s.encode("utf-8")).hexdigest()
 
-def _read_text(p: Path) -> str:
-    if not p.exists():
-        return ""
-    return p.read_text(encoding="utf-8", errors="replace")
+class Manifest:
+    """``docs/.publish-manifest``: path -> size, mtime and hash of what was last published.
 
-def _atomic_write(path: Path, content: str) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    h = _sha256(content)
-    # Skip write if content unchanged (noise-free commits)
-    if path.exists() and _sha256(_read_text(path)) == h:
-        return
-    # Atomic replace
-    with tempfile.NamedTemporaryFile("w", encoding="utf-8", delete=False, dir=str(path.parent)) as tf:
-        tf.write(content)
-        tmp_name = tf.name
-    Path(tmp_name).replace(path)
+    An unchanged artifact is recognised by comparing its new hash with the
+    entry, without reading the file back. The file is only read (and the entry
+    refreshed) when its stat data disagrees, e.g. after a hand edit or a fresh
+    checkout. ``--dry-run --diff`` is answered from the manifest alone.
 
-def _write_if_string(target: Path, content: Any, written: List[str]) -> None:
-    if isinstance(content, str) and content.strip():
-        _atomic_write(target, content)
-        written.append(_rel(target))
+    Entries also record ownership: the ``run`` that last wrote the file, the
+    ``role`` that produced it and, for KB articles, the claim ``group`` it
+    belongs to. Pruning works from these entries, never from a tree walk.
+    """
 
-# ---------- role ------------------------------------------------------------
+    VERSION = 1
 
-def run(context: Dict[str, Any]) -> Dict[str, Any]:
+    def __init__(self, path: Path = MANIFEST):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        self.new = True        # no usable manifest on disk yet
+
+    def load(self) -> "Manifest":
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return self   # missing or torn: every file is verified once
+        if isinstance(data, dict) and data.get("version") == self.VERSION:
+            self.files = dict(data.get("files") or {})
+            self.new = False
+        return self
+
+    def seed(self, dirs: List[Path]) -> None:
+        """Index files already in ``dirs`` (stat only) so outputs from before the
+        manifest existed can be claimed or pruned later. Run once, on creation."""
+        for d in dirs:
+            try:
+                entries = list(os.scandir(d))
+            except OSError:
+                continue
+            for e in entries:
+                if e.is_file() and not e.name.startswith("."):
+                    st = e.stat()
+                    self.files.setdefault(_rel(Path(e.path)), {
+                        "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": None,
+                        "run": None, "role": None,
+                    })
+                    self.dirty = True
+
+    def status(self, path: Path, h: str) -> str:
+        """"added", "changed" or "unchanged" relative to the manifest (no disk access)."""
+        entry = self.files.get(_rel(path))
+        if entry is None:
+            return "added"
+        return "unchanged" if entry.get("sha256") == h else "changed"
+
+    def is_current(self, path: Path, h: str, size: int) -> bool:
+        """True if ``path`` already holds content hashing to ``h`` (``size`` bytes)."""
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return False
+        if st.st_size != size:
+            return False
+        entry = self.files.get(_rel(path))
+        if (entry and entry.get("sha256") and entry.get("size") == st.st_size
+                and entry.get("mtime_ns") == st.st_mtime_ns):
+            return entry.get("sha256") == h
+        # Stat data disagrees (or no entry yet): hash the bytes once and remember them.
+        actual = hashlib.sha256(path.read_bytes()).hexdigest()
+        self._set(path, st, actual)
+        return actual == h
+
+    def record(self, path: Path, h: str, **owner: Any) -> None:
+        self._set(path, path.stat(), h)
+        self.own(path, **owner)
+
+    def own(self, path: Path, **owner: Any) -> None:
+        """Set ownership fields (``run``, ``role``, ``group``) on an existing entry."""
+        entry = self.files.get(_rel(path))
+        if entry is None:
+            return
+        for k, v in owner.items():
+            if entry.get(k) != v:
+                entry[k] = v
+                self.dirty = True
+
+    def drop(self, path: Path) -> None:
+        if self.files.pop(_rel(path), None) is not None:
+            self.dirty = True
+
+    def _set(self, path: Path, st: os.stat_result, h: str) -> None:
+        self.files.setdefault(_rel(path), {}).update(size=st.st_size, mtime_ns=st.st_mtime_ns, sha256=h)
+        self.dirty = True
+
+    def orphans(self, directory: Path, claims: Dict[str, Optional[List[str]]]) -> List[Path]:
+        """Entries in ``directory`` that no complete claim group accounts for.
+
+        ``claims`` maps every group publishing into ``directory`` to the file
+        names it produced this run, or None when that group's output is not
+        fully known (e.g. a web fetch failed), which keeps its files safe. An
+        entry of a complete group is orphaned when its name is not claimed; an
+        entry without a group (predating ownership) only when every group is
+        complete and none claims it.
+        """
+        prefix = _rel(directory) + "/"
+        claimed = {n for names in claims.values() if names for n in names}
+        all_known = all(names is not None for names in claims.values())
+        out: List[Path] = []
+        for rel, entry in self.files.items():
+            if not rel.startswith(prefix) or "/" in rel[len(prefix):]:
+                continue
+            name = rel[len(prefix):]
+            if name in claimed:
+                continue
+            group = entry.get("group")
+            if (group in claims and claims[group] is not None) or (group is None and all_known):
+                out.append(BASE / rel)
+        return sorted(out)
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", delete=False, dir=str(self.path.parent)) as tf:
+            json.dump({"version": self.VERSION, "files": self.files}, tf, indent=1, sort_keys=True)
+            tmp_name = tf.name
+        Path(tmp_name).replace(self.path)
+        self.dirty = False
+
+# Staging is I/O bound (write + fsync), so it runs on threads.
+PUBLISH_WORKERS = int(os.getenv("ECE_PUBLISH_WORKERS", "0")) or min(32, (os.cpu_count() or 1) + 4)
+FSYNC_BATCH = 32    # files staged and fsynced per pool task
+
+def _fsync_dir(path: Path) -> None:
+    """Persist renames in ``path`` (no-op where directories cannot be opened)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class PublishTransaction:
+    """All-or-nothing publication of many files.
+
+    ``add`` queues content; full batches are staged on a thread pool as
+    hidden temp files next to their targets, each written and fsynced. On
+    ``commit`` every staged file is renamed over its target (existing targets
+    are hard-linked aside first), files queued with ``remove`` are renamed
+    aside, and each touched directory is fsynced once. Any failure, including
+    one reported before ``commit``, removes the temp files and restores
+    already-replaced or removed targets from their backups. Content the
+    manifest already knows is current is never staged.
     """
-    Writes:
-      - Core docs (API ref, User guide, Release notes)
-      - In-app artifacts (tooltips.json, walkthrough.yaml)
-      - KB articles from context['kb_files'] dict
-      - Evidence (metrics.md)
-      - Decisions log (append unique entry per day)
-      - Internal comms drafts (announcement.md, exec-brief.md)
-      - Optional extras from context['extra_artifacts']: List[Tuple[path, content]]
+
+    def __init__(self, manifest: Manifest, workers: int = PUBLISH_WORKERS, batch: int = FSYNC_BATCH):
+        self.manifest = manifest
+        self.batch = max(1, batch)
+        self._workers = max(1, workers)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._queued: List[Tuple[Path, str | bytes, str]] = []
+        self._futures: List[Future] = []
+        self._staged: List[Tuple[Path, Path, str]] = []     # (tmp, target, hash)
+        self._removals: List[Path] = []
+        self._owners: Dict[Path, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.removed: List[Path] = []
+
+    def add(self, target: Path, text: str | bytes, h: Optional[str] = None, **owner: Any) -> None:
+        """Queue ``text`` for ``target``; ``owner`` fields go into its manifest entry."""
+        self._queued.append((target, text, h or _sha256(text)))
+        self._owners[target] = owner
+        if len(self._queued) >= self.batch:
+            self._submit()
+
+    def remove(self, target: Path) -> None:
+        """Delete ``target`` as part of the commit (and drop its manifest entry)."""
+        self._removals.append(target)
+
+    def _submit(self) -> None:
+        if not self._queued:
+            return
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="publish")
+        batch, self._queued = self._queued, []
+        self._futures.append(self._pool.submit(self._stage_batch, batch))
+
+    def _stage_batch(self, batch: List[Tuple[Path, str | bytes, str]]) -> None:
+        for target, text, h in batch:
+            data = text if isinstance(text, bytes) else text.encode("utf-8")
+            if self.manifest.is_current(target, h, len(data)):
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            fd, name = tempfile.mkstemp(dir=str(target.parent), prefix=f".{target.name}.", suffix=".tmp")
+            tmp = Path(name)
+            with self._lock:
+                self._staged.append((tmp, target, h))   # registered first, so rollback finds it
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _wait(self) -> None:
+        self._submit()
+        error: Optional[BaseException] = None
+        for fut in self._futures:
+            try:
+                fut.result()
+            except BaseException as e:   # keep waiting so no writer is still running
+                error = error or e
+        self._futures = []
+        if error is not None:
+            raise error
+
+    def commit(self) -> List[Path]:
+        """Make every staged file visible and durable; returns the targets that changed."""
+        try:
+            self._wait()
+        except BaseException:
+            self.rollback()
+            raise
+        # A target added twice keeps its last content.
+        latest: Dict[Path, Tuple[Path, str]] = {}
+        for tmp, target, h in self._staged:
+            if target in latest:
+                latest[target][0].unlink(missing_ok=True)
+            latest[target] = (tmp, h)
+        removals = [t for t in dict.fromkeys(self._removals) if t not in self._owners]
+        done: List[Tuple[Path, Optional[Path]]] = []        # (target, backup)
+        try:
+            for target, (tmp, _) in latest.items():
+                backup = None
+                if target.exists():
+                    backup = tmp.with_suffix(".bak")
+                    os.link(target, backup)
+                done.append((target, backup))
+                tmp.replace(target)
+            for target in removals:
+                if target.exists():
+                    backup = target.with_name(f".{target.name}.prune.bak")
+                    target.replace(backup)
+                    done.append((target, backup))
+            for d in {t.parent for t in latest} | {t.parent for t in removals}:
+                _fsync_dir(d)
+        except BaseException:
+            for target, backup in reversed(done):
+                if backup is not None:
+                    backup.replace(target)
+                else:
+                    target.unlink(missing_ok=True)
+            for d in {t.parent for t, _ in done}:
+                _fsync_dir(d)
+            self.rollback()
+            raise
+        finally:
+            self._shutdown()
+        for target, backup in done:
+            if backup is not None:
+                backup.unlink(missing_ok=True)
+        for target, (_, h) in latest.items():
+            self.manifest.record(target, h, **self._owners.get(target, {}))
+        for target, owner in self._owners.items():
+            if target not in latest:
+                self.manifest.own(target, **{k: v for k, v in owner.items() if k != "run"})
+        for target in removals:
+            self.manifest.drop(target)
+        self.removed = removals
+        self._staged = []
+        self._removals = []
+        return list(latest)
+
+    def rollback(self) -> None:
+        """Discard everything staged so far (targets are left untouched)."""
+        self._queued = []
+        self._removals = []
+        try:
+            self._wait()
+        except BaseException:
+            pass
+        for tmp, _, _ in self._staged:
+            tmp.unlink(missing_ok=True)
+        self._staged = []
+        self._shutdown()
+
+    def _shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+class _Publication:
+    """Where one publisher run sends rendered artifacts: a transaction, or (diff) only a plan."""
+
+    def __init__(self, manifest: Manifest, context: Dict[str, Any], groups: Dict[str, str]):
+        self.manifest = manifest
+        self.diff = bool(context.get("publish_diff"))
+        self.run_id = context.get("run_id")
+        self.producers: Dict[str, str] = context.get("producers") or {}
+        self.groups = groups            # manifest path -> claim group (KB, in-app bundles)
+        self.txn = PublishTransaction(manifest)
+        self.written: List[str] = []
+        self.hashes: Dict[str, str] = {}    # published path -> sha256 (for the run ledger)
+        self.changes: Dict[str, List[str]] = {"added": [], "changed": [], "unchanged": []}
+
+    def put(self, target: Path, text: str | bytes, h: Optional[str], key: str) -> None:
+        """Publish ``text`` at ``target``; ``key`` is the context key it came from."""
+        if self.diff:
+            self.changes[self.manifest.status(target, h or _sha256(text))].append(_rel(target))
+            return
+        self.hashes[_rel(target)] = h = h or _sha256(text)
+        owner = {"run": self.run_id, "role": self.producers.get(key, "publisher")}
+        group = self.groups.get(_rel(target))
+        if group:
+            owner["group"] = group
+        self.txn.add(target, text, h, **owner)
+        self.written.append(_rel(target))
+
+    def prune(self, orphans: List[Path]) -> None:
+        if self.diff:
+            self.changes["removed"] = [_rel(p) for p in orphans]
+            return
+        for p in orphans:
+            self.txn.remove(p)
+
+def _publish_stream(stream: ArtifactStream, kb_dir: Path, pub: _Publication, logger) -> None:
+    """Pull streamed KB articles through every stage, staging each as it lands.
+
+    Nothing is renamed into place until the publisher commits; an aggregated
+    stream error propagates and the transaction discards what was staged.
     """
-    logger = get_logger("publisher")
-    written: List[str] = []
+    for name, content in stream:
+        if not isinstance(name, str):
+            continue
+        text, h = _render(content)
+        if text.strip():
+            pub.put(_target(content, kb_dir / name), text, h, "kb_stream")
+    stream.raise_errors()
+    for n in stream.notes:
+        logger.info("compliance (stream): %s", n)
+    logger.info("kb stream staged (%d articles via %s)", stream.count, " → ".join(stream.stages))
+
+def _render(content: Any) -> Tuple[str | bytes, str | None]:
+    """(text, sha256 or None) for an Artifact, string or bytes; front matter is serialized here."""
+    if isinstance(content, Artifact):
+        return content.render(), content.hash
+    return (content, None) if isinstance(content, (str, bytes)) else ("", None)
+
+def _target(content: Any, default: Path) -> Path:
+    path = content.path if isinstance(content, Artifact) else None
+    return BASE / path if path else default
 
-    # 1) KB articles (dict name -> content)
+def _write_content(target: Path, content: Any, pub: _Publication, key: str = "") -> None:
+    text, h = _render(content)
+    if text.strip():
+        pub.put(_target(content, target), text, h, key)
+
+# ---------- role ------------------------------------------------------------
+
+def _queue_all(context: Dict[str, Any], pub: _Publication, logger) -> None:
+    """Hand every artifact in ``context`` to the publication (steps 1-6 of ``run``)."""
+    # 1) KB articles (dict name -> content, or a stream pulled here first so
+    #    its compliance errors abort the run before anything is committed)
+    kb_dir = KB_DIR
+    stream = context.get("kb_stream")
+    if isinstance(stream, ArtifactStream) and not stream.consumed:
+        _publish_stream(stream, kb_dir, pub, logger)
     kb_files = context.get("kb_files", {})
     if isinstance(kb_files, dict):
-        kb_dir = BASE / "docs/samples/kb-articles"
         for name, content in kb_files.items():
             if not isinstance(name, str):
                 continue
             target = kb_dir / name
-            _write_if_string(target, content, written)
+            _write_content(target, content, pub, "kb_files")
 
     # 2) Core mapping
     mapping = {
@@ -80,32 +423,41 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
         "walkthrough_yaml": BASE / "docs/samples/in-app-guidance/walkthrough.yaml",
     }
     for key, target in mapping.items():
-        _write_if_string(target, context.get(key), written)
+        _write_content(target, context.get(key), pub, key)
+    bundles = context.get("inapp_bundles")
+    if isinstance(bundles, dict):
+        for name, data in sorted(bundles.items()):
+            _write_content(BUNDLE_DIR / name, data, pub, "inapp_bundles")
+    api_pages = context.get("api_pages")
+    if isinstance(api_pages, dict):
+        for name, content in api_pages.items():
+            _write_content(API_TAGS_DIR / name, content, pub, "api_pages")
 
-    # 3) Evidence (metrics)
+    # 3) Evidence (metrics, in-app reach)
     metrics = context.get("metrics_md")
     if isinstance(metrics, str) and metrics.strip():
-        _write_if_string(BASE / "docs/evidence/metrics.md", metrics, written)
+        _write_content(BASE / "docs/evidence/metrics.md", metrics, pub, "metrics_md")
+    _write_content(BASE / "docs/evidence/inapp-reach.md", context.get("inapp_reach_md"), pub, "inapp_reach_md")
 
-    # 4) Decisions log (append once per day)
-    decisions_path = BASE / "docs/evidence/decisions.md"
-    today_entry = f"- {datetime.date.today()}: pipeline executed"
-    existing = _read_text(decisions_path)
-    if today_entry not in existing:
-        content = (existing + ("\n" if existing and not existing.endswith("\n") else "") + today_entry + "\n") if existing else today_entry + "\n"
-        _atomic_write(decisions_path, content)
-        written.append(_rel(decisions_path))
+    # 4) Decisions log, rendered from the run ledger's day index (this run
+    #    is appended to the ledger by graph.run once every role finished)
+    days = ledger.day_index(decisions=ledger.DECISIONS)
+    decisions = ledger.render_decisions(ledger.read_preamble(ledger.DECISIONS), days,
+                                        today=str(datetime.date.today()), packet=context.get("packet"))
+    _write_content(ledger.DECISIONS, decisions, pub, "decisions")
 
     # 5) Internal comms
-    _write_if_string(
+    _write_content(
         BASE / "docs/samples/internal-comms/announcement.md",
         context.get("comms_announce_md"),
-        written,
+        pub,
+        "comms_announce_md",
     )
-    _write_if_string(
+    _write_content(
         BASE / "docs/samples/internal-comms/exec-brief.md",
         context.get("comms_exec_brief_md"),
-        written,
+        pub,
+        "comms_exec_brief_md",
     )
 
     # 6) Optional extras: List[Tuple[str|Path, str]]
@@ -115,17 +467,117 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
             try:
                 raw_path, content = item
                 target = BASE / Path(str(raw_path))
-                _write_if_string(target, content, written)
+                _write_content(target, content, pub, "extra_artifacts")
             except Exception:
                 # ignore malformed entries; keep publisher robust
                 continue
 
+
+def run(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Writes:
+      - Core docs (API ref index + per-tag pages, User guide, Release notes)
+      - In-app artifacts (tooltips.json, walkthrough.yaml, client bundles)
+      - KB articles from context['kb_files'] dict or context['kb_stream']
+      - Evidence (metrics.md, inapp-reach.md)
+      - Decisions log (rendered from the run ledger, one line per day)
+      - Internal comms drafts (announcement.md, exec-brief.md)
+      - Optional extras from context['extra_artifacts']: List[Tuple[path, content]]
+      - KB fingerprints (engine/cache) so unchanged articles are carried forward,
+        and comms batch fingerprints so unchanged releases are skipped
+      - docs/.publish-manifest (size, mtime, hash of every published file)
+      - docs/.search/ full-text index of the published Markdown (see engine/search.py)
+
+    With context['publish_diff'] (``--dry-run --diff``) nothing is written:
+    the would-be output is compared with the manifest and reported as
+    added / changed / unchanged.
+
+    With context['publish_prune'] (``--prune``) KB articles that the manifest
+    lists but no complete writer_support claim group produced this run are
+    deleted in the same transaction (``removed`` in a diff), as are in-app
+    bundles this run did not produce (superseded content hashes) and API tag
+    pages for tags the spec no longer has.
+    """
+    logger = get_logger("publisher")
+    kb_dir = KB_DIR
+    manifest = Manifest().load()
+    if manifest.new:
+        manifest.seed([kb_dir])
+    # writer_support's claim groups: group -> every article name it owns this
+    # run (rendered or carried), or None when that group's output is unknown.
+    claims = context.get("kb_claims") if isinstance(context.get("kb_claims"), dict) else {}
+    groups = {_rel(kb_dir / n): g for g, names in claims.items() for n in (names or [])}
+    # Every in-app bundle is rebuilt each run, so the set is always complete.
+    bundles = context.get("inapp_bundles")
+    bundle_claims = {BUNDLE_GROUP: sorted(bundles)} if isinstance(bundles, dict) else {}
+    # Likewise every API tag page is rendered from the full spec each run.
+    api_pages = context.get("api_pages")
+    api_claims = {API_TAGS_GROUP: sorted(api_pages)} if isinstance(api_pages, dict) else {}
+    owners = dict(groups)
+    owners.update({_rel(BUNDLE_DIR / n): BUNDLE_GROUP for n in bundle_claims.get(BUNDLE_GROUP, [])})
+    owners.update({_rel(API_TAGS_DIR / n): API_TAGS_GROUP for n in api_claims.get(API_TAGS_GROUP, [])})
+    pub = _Publication(manifest, context, owners)
+
+    try:
+        _queue_all(context, pub, logger)
+        if context.get("publish_prune"):
+            writing = {BASE / p for p in pub.written}
+            orphans = manifest.orphans(kb_dir, claims) if claims else []
+            if bundle_claims:
+                orphans += manifest.orphans(BUNDLE_DIR, bundle_claims)
+            if api_claims:
+                orphans += manifest.orphans(API_TAGS_DIR, api_claims)
+            pub.prune([p for p in orphans if p not in writing])
+    except BaseException:
+        pub.txn.rollback()
+        raise
+
+    if pub.diff:
+        for status, sign in (("added", "+"), ("changed", "~"), ("unchanged", "="), ("removed", "-")):
+            for p in sorted(set(pub.changes.get(status, []))):
+                logger.info("%s %s", sign, p)
+        summary = "diff: " + ", ".join(f"{len(v)} {k}" for k, v in pub.changes.items())
+        logger.info(summary)
+        return {"written_paths": [], "publish_diff": pub.changes, "summary": summary}
+
+    changed = pub.txn.commit()
+    logger.info("committed %d changed files (%d unchanged)", len(changed), len(set(pub.written)) - len(changed))
+    for p in pub.txn.removed:
+        logger.info("pruned %s", _rel(p))
+    # Carried-forward articles were not rewritten but are still claimed.
+    claimant = pub.producers.get("kb_claims", "writer_support")
+    for rel, group in groups.items():
+        manifest.own(BASE / rel, role=claimant, group=group)
+
+    # 7) Incremental KB / comms batch state: only recorded once the files are on disk
+    fingerprints = context.get("kb_fingerprints")
+    if isinstance(fingerprints, dict):
+        save_json(KB_FINGERPRINTS, fingerprints)
+    comms = context.get("comms_fingerprints")
+    if isinstance(comms, dict):
+        save_json(COMMS_FINGERPRINTS, comms)
+    pub.manifest.save()
+
+    # 8) Search index over the published Markdown: only changed documents are re-read
+    cache_stats: Dict[str, Dict[str, int]] = {}
+    if os.getenv("ECE_SEARCH_INDEX", "1") != "0":
+        stats = search.update(search.published_markdown(manifest.files),
+                              full=os.getenv("ECE_SEARCH_FULL", "0") == "1")
+        logger.info("search index: %d indexed, %d removed, %d unchanged; %d segments%s in %.1f ms",
+                    stats.indexed, stats.removed, stats.unchanged, stats.segments,
+                    " (rebuilt)" if stats.compacted else f" ({stats.merged} merged)" if stats.merged else "",
+                    1000 * stats.seconds)
+        cache_stats["search_docs"] = {"hits": stats.unchanged, "misses": stats.indexed}
+
     # Deduplicate and sort for deterministic summaries
-    written = sorted(dict.fromkeys(written))
+    written = sorted(dict.fromkeys(pub.written))
+
+    pruned = sorted(_rel(p) for p in pub.txn.removed)
 
-    summary = f"{len(written)} artifacts written"
+    summary = f"{len(written)} artifacts written" + (f", {len(pruned)} pruned" if pruned else "")
     for p in written:
         logger.info(p)
     logger.info(summary)
 
-    return {"written_paths": written, "summary": summary}
+    return {"written_paths": written, "pruned_paths": pruned, "artifact_hashes": pub.hashes, "summary": summary,
+            "cache_stats": cache_stats}
@@ -1,25 +1,45 @@
 # engine/roles/writer_comms.py
-"""Generate internal comms (announcement + exec brief) from Release Notes, robust & deterministic."""
+"""Generate internal comms (announcement + exec brief) from Release Notes, robust & deterministic.
+
+Batch mode (``--comms-batch DIR`` / ``ECE_COMMS_BATCH``) renders the same four
+variants for every ``*.md`` release in DIR into
+``docs/samples/internal-comms/releases/<release>/``. Releases are rendered in
+parallel, and a release whose text is unchanged since the last publish is skipped.
+"""
 from __future__ import annotations
 
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
-from typing import Dict, Any, List, Tuple
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
 from . import get_logger
+from ..artifact import Artifact, body_of
+from ..markdown import parse
+from ..state import BASE, COMMS_FINGERPRINTS, digest, load_json
 
 
 # -------- helpers --------
 
-def _extract_section(md: str, heading: str) -> str:
-    """
-    Return block under '## <heading>' up to the next '## ' or EOF.
-    Case-insensitive; requires a newline after the heading to avoid bleed.
+class _Sections:
+    """Release notes parsed once; every derivation reads sections from this index.
+
+    Lookups are case-insensitive, so "Known issues" and "Known Issues" are the
+    same section.
     """
-    if not md:
-        return ""
-    pat = rf"(?ims)^\s*##\s*{re.escape(heading)}\s*\n(.*?)(?=^\s*##\s|\Z)"
-    m = re.search(pat, md)
-    return m.group(1) if m else ""
+    __slots__ = ("doc",)
+
+    def __init__(self, md: str):
+        self.doc = parse(md or "")
+
+    def block(self, heading: str) -> str:
+        """Text under '## <heading>' up to the next '## ' or EOF."""
+        return self.doc.section(heading)
+
+    def bullets(self, heading: str) -> List[str]:
+        """Raw text of the '-' bullets under '## <heading>' (code fences skipped)."""
+        return [b.text for b in self.doc.section_bullets(heading)]
 
 
 # Strip inline callout fragments appended in bullets by formatters (Impact/Actions/Workaround/Notes).
@@ -48,11 +68,8 @@ def _is_code_bullet(s: str) -> bool:
         return True
     return False
 
-def _bullets(block: str, limit: int | None = None) -> List[str]:
-    """Extract '-' bullets, sanitize, and drop code-only bullets."""
-    if not block:
-        return []
-    raw = re.findall(r"^\s*-\s+(.*)$", block, flags=re.M)
+def _bullets(raw: List[str], limit: int | None = None) -> List[str]:
+    """Sanitize bullet texts and drop code-only bullets."""
     items: List[str] = []
     for item in raw:
         if _is_code_bullet(item):
@@ -68,11 +85,13 @@ def _first_sentence(s: str) -> str:
     m = re.search(r"(.+?[.!?])(\s|$)", s)
     return m.group(1) if m else s.strip()
 
-def _links() -> List[str]:
+RELEASE_NOTES = "docs/samples/release-notes/2025-08.md"
+
+def _links(source: str = RELEASE_NOTES) -> List[str]:
     return [
         "API Reference: docs/samples/api-reference/reference.md",
         "User Guide: docs/samples/user-guide/tenant-admin.md",
-        "Release Notes: docs/samples/release-notes/2025-08.md",
+        f"Release Notes: {source}",
     ]
 
 
@@ -85,18 +104,15 @@ _IMPACT_LINE = re.compile(
 
 # -------- derivation --------
 
-def _derive_highlights(ctx: Dict[str, Any]) -> List[str]:
-    rn = ctx.get("release_notes_md", "") or ""
+_ISSUE_SECTIONS = ("Known issues", "Issues")
 
+def _derive_highlights(rn: _Sections) -> List[str]:
     # Prefer actual Highlights bullets
-    hl = _bullets(_extract_section(rn, "Highlights"), limit=6)
+    hl = _bullets(rn.bullets("Highlights"), limit=6)
 
     # Helper: fetch first "real" bullet from a section (not labels)
     def _first_real_bullet(section_name: str) -> str | None:
-        block = _extract_section(rn, section_name)
-        if not block:
-            return None
-        for line in re.findall(r"^\s*-\s+(.*)$", block, flags=re.M):
+        for line in rn.bullets(section_name):
             text = line.strip()
             # Skip label bullets (Impact/Actions/Workaround/Notes)
             if re.match(r"^\*?\*?(Impact|Actions?|Workaround|Notes?)\*?\*?:\s*", text, flags=re.I):
@@ -118,22 +134,19 @@ def _derive_highlights(ctx: Dict[str, Any]) -> List[str]:
     if combined:
         return combined[:4]
 
-    # Fallback: Known Issues / Known issues / Issues first bullet, else safe generic
-    for sec in ("Known issues", "Known Issues", "Issues"):
-        ki_block = _extract_section(rn, sec)
-        if ki_block:
-            ki = re.findall(r"^\s*-\s+(.*)$", ki_block, flags=re.M)
-            if ki:
-                return [_first_sentence(_sanitize_highlight(ki[0]))]
+    # Fallback: Known issues / Issues first bullet, else safe generic
+    for sec in _ISSUE_SECTIONS:
+        ki = rn.bullets(sec)
+        if ki:
+            return [_first_sentence(_sanitize_highlight(ki[0]))]
     return ["Backup list & Restore APIs simplify tenant management."]
 
-def _derive_impact(ctx: Dict[str, Any]) -> List[str]:
+def _derive_impact(rn: _Sections, highlights: Optional[List[str]] = None) -> List[str]:
     """Extract Impact lines across Enhancements/Fixes/Known issues; fallback to TL;DR fragments."""
-    rn = ctx.get("release_notes_md", "") or ""
     out: List[str] = []
 
-    for sec in ("Enhancements", "Fixes", "Known issues", "Known Issues", "Issues"):
-        block = _extract_section(rn, sec)
+    for sec in ("Enhancements", "Fixes", *_ISSUE_SECTIONS):
+        block = rn.block(sec)
         if not block:
             continue
         for m in _IMPACT_LINE.finditer(block):
@@ -152,7 +165,15 @@ def _derive_impact(ctx: Dict[str, Any]) -> List[str]:
         return uniq[:4]
 
     # Fallback: derive from enriched TL;DR
-    return [_first_sentence(h) for h in _derive_highlights(ctx)[:2]]
+    if highlights is None:
+        highlights = _derive_highlights(rn)
+    return [_first_sentence(h) for h in highlights[:2]]
+
+def _derive(md: str) -> Tuple[List[str], List[str]]:
+    """(highlights, impact) from one pass over the release notes body."""
+    rn = _Sections(md)
+    highlights = _derive_highlights(rn)
+    return highlights, _derive_impact(rn, highlights)
 
 def _derive_default_actions() -> List[str]:
     return [
@@ -164,15 +185,19 @@ def _derive_default_actions() -> List[str]:
 
 # -------- renderers --------
 
-def _mk_announcement_md(today: str, highlights: List[str], impact: List[str]) -> str:
-    return (
-        "---\n"
-        f"title: Internal Announcement — {today}\n"
-        "owner: comms\n"
-        "status: draft\n"
-        "tags: [internal-comms, announcement]\n"
-        f"last_reviewed: {today}\n"
-        "---\n"
+def _comms_meta(title: str, kind: str, today: str, reviewed: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "title": f"{title} — {today}",
+        "owner": "comms",
+        "status": "draft",
+        "tags": ["internal-comms", kind],
+        "last_reviewed": reviewed or today,
+    }
+
+def _mk_announcement_md(today: str, highlights: List[str], impact: List[str],
+                        source: str = RELEASE_NOTES, reviewed: Optional[str] = None,
+                        path: Optional[str] = None) -> Artifact:
+    return Artifact(_comms_meta("Internal Announcement", "announcement", today, reviewed), (
         "## Audience\n"
         "- Product, Engineering, Support, Sales, CS\n\n"
         "## Summary (TL;DR)\n"
@@ -182,19 +207,14 @@ def _mk_announcement_md(today: str, highlights: List[str], impact: List[str]) ->
         "## Actions\n"
         + "\n".join(f"- {a}" for a in _derive_default_actions()) + "\n\n"
         "## Links\n"
-        + "\n".join(f"- {l}" for l in _links()) + "\n\n"
-        "Source: docs/samples/release-notes/2025-08.md\n"
-    )
-
-def _mk_exec_brief_md(today: str, highlights: List[str], impact: List[str]) -> str:
-    return (
-        "---\n"
-        f"title: Executive Brief — {today}\n"
-        "owner: comms\n"
-        "status: draft\n"
-        "tags: [internal-comms, exec]\n"
-        f"last_reviewed: {today}\n"
-        "---\n"
+        + "\n".join(f"- {l}" for l in _links(source)) + "\n\n"
+        f"Source: {source}\n"
+    ), path or "docs/samples/internal-comms/announcement.md")
+
+def _mk_exec_brief_md(today: str, highlights: List[str], impact: List[str],
+                      source: str = RELEASE_NOTES, reviewed: Optional[str] = None,
+                      path: Optional[str] = None) -> Artifact:
+    return Artifact(_comms_meta("Executive Brief", "exec", today, reviewed), (
         "## What Shipped\n"
         + "\n".join(f"- {h}" for h in highlights) + "\n\n"
         "## Why It Matters\n"
@@ -206,22 +226,23 @@ def _mk_exec_brief_md(today: str, highlights: List[str], impact: List[str]) -> s
         "- Time-to-first-policy after onboarding\n"
         "- KB deflection on policy conflicts\n\n"
         "## References\n"
-        + "\n".join(f"- {l}" for l in _links()) + "\n\n"
-        "Source: docs/samples/release-notes/2025-08.md\n"
-    )
+        + "\n".join(f"- {l}" for l in _links(source)) + "\n\n"
+        f"Source: {source}\n"
+    ), path or "docs/samples/internal-comms/exec-brief.md")
 
-def _mk_slack_text(today: str, highlights: List[str]) -> str:
+def _mk_slack_text(today: str, highlights: List[str], source: str = RELEASE_NOTES) -> str:
     lines = [
         f"*Release update — {today}*",
         "*TL;DR:*",
         *(f"• {h}" for h in highlights[:4]),
         "",
         "Links:",
-        *(f"- {l}" for l in _links()),
+        *(f"- {l}" for l in _links(source)),
     ]
     return "\n".join(lines) + "\n"
 
-def _mk_email_text(today: str, highlights: List[str], impact: List[str]) -> str:
+def _mk_email_text(today: str, highlights: List[str], impact: List[str],
+                   source: str = RELEASE_NOTES) -> str:
     lines = [
         f"Subject: Release Update — {today}",
         "",
@@ -232,13 +253,82 @@ def _mk_email_text(today: str, highlights: List[str], impact: List[str]) -> str:
         *(f"- {i}" for i in impact[:4]),
         "",
         "Links:",
-        *(f"- {l}" for l in _links()),
+        *(f"- {l}" for l in _links(source)),
         "",
-        "Source: docs/samples/release-notes/2025-08.md",
+        f"Source: {source}",
     ]
     return "\n".join(lines) + "\n"
 
 
+# -------- batch mode --------
+
+COMMS_VERSION = 1   # bump when the derivations or the templates change
+BATCH_DIR = "docs/samples/internal-comms/releases"
+BATCH_FILES = ("announcement.md", "exec-brief.md", "announcement-slack.txt", "announcement-email.txt")
+PARALLEL_MIN_RELEASES = 64   # below this the pool start-up costs more than it saves
+CHUNKS_PER_WORKER = 4
+
+def _comms_workers(n_releases: int) -> int:
+    raw = os.getenv("ECE_COMMS_WORKERS", "").strip()
+    if raw:
+        return max(int(raw), 1)
+    return (os.cpu_count() or 1) if n_releases >= PARALLEL_MIN_RELEASES else 1
+
+def _rel(path: Path) -> str:
+    try:
+        return str(path.resolve().relative_to(BASE))
+    except ValueError:
+        return str(path)
+
+def _render_release(job: Tuple[str, str, str]) -> List[Tuple[str, str]]:
+    """All four comms variants for one release file: [(path, text)]."""
+    source, text, out_dir = job
+    doc = parse(text)
+    meta = doc.meta()
+    label = str(meta.get("version") or Path(source).stem)
+    reviewed = str(meta["last_reviewed"]) if meta.get("last_reviewed") else None
+    highlights, impact = _derive(doc.body)
+    announce = _mk_announcement_md(label, highlights, impact, source, reviewed)
+    brief = _mk_exec_brief_md(label, highlights, impact, source, reviewed)
+    texts = (
+        announce.render(),
+        brief.render(),
+        _mk_slack_text(label, highlights, source),
+        _mk_email_text(label, highlights, impact, source),
+    )
+    return [(f"{out_dir}/{name}", t) for name, t in zip(BATCH_FILES, texts)]
+
+def _run_batch(src_dir: Path, log) -> Dict[str, Any]:
+    """Render every release in ``src_dir`` whose text changed since the last publish."""
+    previous = load_json(COMMS_FINGERPRINTS, {}) or {}
+    fingerprints: Dict[str, str] = {}
+    jobs: List[Tuple[str, str, str]] = []
+    for path in sorted(src_dir.glob("*.md")):
+        text = path.read_text(encoding="utf-8")
+        source = _rel(path)
+        out_dir = f"{BATCH_DIR}/{path.stem}"
+        fp = digest("comms", COMMS_VERSION, source, text)
+        fingerprints[source] = fp
+        if previous.get(source) == fp and all((BASE / out_dir / n).exists() for n in BATCH_FILES):
+            continue
+        jobs.append((source, text, out_dir))
+
+    workers = _comms_workers(len(jobs))
+    if workers <= 1 or len(jobs) <= 1:
+        rendered = [_render_release(j) for j in jobs]
+    else:
+        chunksize = max(len(jobs) // (workers * CHUNKS_PER_WORKER), 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = list(pool.map(_render_release, jobs, chunksize=chunksize))
+    log.info("comms batch %s: releases=%d rendered=%d skipped=%d workers=%d",
+             _rel(src_dir), len(fingerprints), len(jobs), len(fingerprints) - len(jobs), workers)
+    return {
+        "extras": [item for files in rendered for item in files],
+        "comms_fingerprints": {**previous, **fingerprints},
+        "cache_stats": {"comms_releases": {"hits": len(fingerprints) - len(jobs), "misses": len(jobs)}},
+    }
+
+
 # -------- role entry (with diagnostics) --------
 
 def run(context: Dict[str, Any]) -> Dict[str, Any]:
@@ -246,12 +336,11 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
     today = date.today().isoformat()
 
     # DIAG 1: show the start of RN the comms writer actually sees (from context, not disk)
-    rn_head = (context.get("release_notes_md", "") or "")[:320].replace("\n", " ↵ ")
+    rn_head = body_of(context.get("release_notes_md"))[:320].replace("\n", " ↵ ")
     log.info("RN head (first 320 chars): %s", rn_head)
 
     # Extract from Release Notes (robust to missing sections)
-    highlights = _derive_highlights(context)
-    impact = _derive_impact(context)
+    highlights, impact = _derive(body_of(context.get("release_notes_md")))
 
     # DIAG 2: show counts and a sample
     log.info(
@@ -273,9 +362,19 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
         ("docs/samples/internal-comms/announcement-email.txt", email_txt),
     ]
 
-    log.info("internal comms drafts created")
-    return {
+    out: Dict[str, Any] = {
         "comms_announce_md": announce_md,
         "comms_exec_brief_md": exec_brief_md,
-        "extra_artifacts": extras,
     }
+    batch = context.get("comms_batch_dir")
+    if batch:
+        src_dir = Path(batch) if Path(batch).is_absolute() else BASE / batch
+        if not src_dir.is_dir():
+            raise ValueError(f"comms batch: {batch} is not a directory")
+        result = _run_batch(src_dir, log)
+        extras.extend(result.pop("extras"))
+        out.update(result)
+
+    log.info("internal comms drafts created")
+    out["extra_artifacts"] = extras
+    return out
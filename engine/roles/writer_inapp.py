@@ -1,121 +1,81 @@
 # engine/roles/writer_inapp.py
 from __future__ import annotations
-import json
-from typing import Dict, Any
+import datetime
+import os
+import time
+from typing import Dict, Any, List
 from . import get_logger
+from ..bundles import build_bundles
+from ..conditions import ReachReport, load_flag_specs, population, simulate
+from ..guidance import build, parse_hints, tooltips_json, walkthrough_yaml
+
+
+def _reach(tooltips: List[Dict[str, Any]], flows: List[Dict[str, Any]], logger) -> ReachReport:
+    """Simulate every tooltip and walkthrough step against the synthetic users."""
+    users, seed, specs = load_flag_specs()
+    users = int(os.getenv("ECE_REACH_USERS", users))
+    pop = population(users, seed, specs)
+    # Overlaps are reported within a group: tooltips of one feature (same
+    # screen), the flows themselves, and the steps of each flow.
+    groups: Dict[str, Dict[str, str]] = {}
+    for t in tooltips:
+        groups.setdefault(f"feature:{t['feature']}", {})[t["id"]] = t["when"]
+    groups["flows"] = {f["flow_id"]: f.get("when") or "true" for f in flows}
+    for f in flows:
+        groups[f["flow_id"]] = {f"{f['flow_id']}/{st['id']}": st["when"] for st in f["steps"]}
+    report = simulate(groups, pop, (s.name for s in specs))
+    if report.errors:
+        raise ValueError("in-app conditions: " + "; ".join(report.errors))
+    for item in report.unreachable:
+        logger.warning("%s is unreachable: no simulated user matches %r", item, report.conditions[item])
+    for a, b, n in report.overlaps:
+        logger.warning("%s and %s overlap for %.1f%% of users", a, b, 100.0 * n / report.users)
+    logger.info("reach simulated for %d conditions over %d users (%s)", len(report.reach), users, pop.backend)
+    return report
 
 
 def run(context: Dict[str, Any]) -> Dict[str, Any]:
     logger = get_logger("writer_inapp")
 
-    # --- Tooltips (JSON) ---
-    tooltips = [
-        {
-            "id": "tt-policy-create",
-            "version": "1.0",
-            "owner": "docs-team",
-            "feature": "Backup Policy",
-            "text": "Create your first backup policy—set retention and schedule.",
-            "placement": "right",
-            "role_visibility": ["TenantAdmin"],
-            "when": "firstLogin && !hasPolicy",
-            "variant": "A",
-            "measure": {
-                "event": "policyCreated",
-                "success_criteria": "policySaved",
-                "goal": "firstPolicyCreated"
-            },
-            "expires_on": "2025-10-15"
-        },
-        {
-            "id": "tt-restore-start",
-            "version": "1.0",
-            "owner": "docs-team",
-            "feature": "Restore",
-            "text": "Restore a file from your latest backup. Use an alternate path to verify integrity.",
-            "placement": "bottom",
-            "role_visibility": ["TenantAdmin", "Support"],
-            "when": "hasBackups && !hasRestore",
-            "variant": "A",
-            "measure": {
-                "event": "restoreStarted",
-                "success_criteria": "restoreCompleted",
-                "goal": "firstRestoreCompleted"
-            },
-            "expires_on": "2025-10-15"
-        },
-        {
-            "id": "tt-backup-run-now",
-            "version": "1.0",
-            "owner": "docs-team",
-            "feature": "Backup",
-            "text": "Run your first backup now to validate the policy.",
-            "placement": "top",
-            "role_visibility": ["TenantAdmin"],
-            "when": "hasPolicy && !hasBackup",
-            "variant": "A",
-            "measure": {
-                "event": "backupStarted",
-                "success_criteria": "backupSucceeded",
-                "goal": "firstBackupSucceeded"
-            },
-            "expires_on": "2025-10-15"
-        },
-        {
-            "id": "tt-policy-verify",
-            "version": "1.0",
-            "owner": "docs-team",
-            "feature": "Backup Policy",
-            "text": "Verify next run time and retention in Policy Summary.",
-            "placement": "right",
-            "role_visibility": ["TenantAdmin"],
-            "when": "hasPolicy && hasBackup",
-            "variant": "B",
-            "measure": {
-                "event": "policyViewed",
-                "success_criteria": "summaryViewed",
-                "goal": "policyVerified"
-            },
-            "expires_on": "2025-10-15"
-        }
-    ]
+    # --- Tooltips and walkthroughs from intake/inapp/features*.yml ---
+    sources = context.get("sources", {})
+    guidance = build(parse_hints(sources.get("hints") or ""), context.get("endpoints") or [],
+                     full=os.getenv("ECE_INAPP_FULL", "0") == "1")
+    for w in guidance.warnings:
+        logger.warning(w)
+    logger.info("features: %d (regenerated %d; parsed %d of %d files)",
+                guidance.features, guidance.regenerated, guidance.files_parsed, guidance.files)
+    tooltips = guidance.tooltips
+    walkthrough = walkthrough_yaml(guidance.flows)
+
+    # --- Audience reach of every `when` (fails the build on unknown flags) ---
+    reach = _reach(tooltips, guidance.flows, logger)
+
+    tooltips_text = tooltips_json(tooltips)
 
-    # --- Walkthrough (YAML) ---
-    walkthrough_yaml = (
-        "flow_id: first-policy-setup\n"
-        "version: '1.0'\n"
-        "owner: docs-team\n"
-        "audience:\n"
-        "  - TenantAdmin\n"
-        "when: firstLogin && !hasPolicy\n"
-        "steps:\n"
-        "  - id: step-1\n"
-        "    text: Open Backup Policies and select Create Policy.\n"
-        "    success_criteria: policyFormOpened\n"
-        "    when: firstLogin && !hasPolicy\n"
-        "  - id: step-2\n"
-        "    text: Set retention and schedule, then save.\n"
-        "    success_criteria: policySaved\n"
-        "    when: policyFormOpened\n"
-        "  - id: step-3\n"
-        "    text: Run your first backup to validate the policy.\n"
-        "    success_criteria: backupSucceeded\n"
-        "    when: hasPolicy && !hasBackup\n"
-        "  - id: step-4\n"
-        "    text: Restore a file to an alternate path to verify data.\n"
-        "    success_criteria: restoreCompleted\n"
-        "    when: hasBackup\n"
-        "metrics:\n"
-        "  activation_goal: firstPolicyCreated\n"
-        "  success_events:\n"
-        "    - policySaved\n"
-        "    - backupSucceeded\n"
-        "    - restoreCompleted\n"
-        "source: intake/tech-docs/brief.md\n"
-    )
+    # --- Client bundles: per role and feature, minified + gzip, hashed names ---
+    as_of = os.getenv("ECE_INAPP_AS_OF")
+    start = time.perf_counter()
+    bundles = build_bundles(tooltips, datetime.date.fromisoformat(as_of) if as_of else datetime.date.today(),
+                            source=tooltips_text)
+    stats = bundles.stats()
+    if bundles.expired:
+        logger.warning("%d of %d tooltips expired and left out of bundles: %s",
+                       len(bundles.expired), len(tooltips), ", ".join(bundles.expired))
+    logger.info("bundles: %d (%d B json, %d B gzip, index %d B) from %d B tooltips.json in %.1f ms",
+                stats["bundles"], stats["json_bytes"], stats["gzip_bytes"], stats["index_bytes"],
+                stats["source_bytes"], 1000 * (time.perf_counter() - start))
 
     logger.info("in-app guidance created")
     return {
-        "tooltips_json": json.dumps(tooltips, indent=2, ensure_ascii=False),
-        "walkthrough_yaml": walkthrough_yaml,
+        "tooltips_json": tooltips_text,
+        "inapp_bundles": bundles.files,
+        "inapp_bundle_stats": stats,
+        "walkthrough_yaml": walkthrough,
+        "inapp_tooltips": tooltips,
+        "inapp_flows": guidance.flows,
+        "inapp_reach": reach.as_dict(),
+        "inapp_reach_md": reach.to_markdown(),
+        "cache_stats": {"inapp_features": {"hits": guidance.features - guidance.regenerated,
+                                           "misses": guidance.regenerated}},
     }
@@ -0,0 +1,42 @@
+# engine/roles/writer_metrics.py
+"""Render docs/evidence/metrics.md from product usage exports (see engine/usage.py)."""
+from __future__ import annotations
+
+import datetime
+import os
+import time
+from typing import Any, Dict
+
+from . import get_logger
+from ..experiments import analyze
+from ..usage import Plan, aggregate, event_files
+
+
+def run(context: Dict[str, Any]) -> Dict[str, Any]:
+    logger = get_logger("writer_metrics")
+    feedback = context.get("sources", {}).get("feedback") or []
+    tooltips = context.get("inapp_tooltips") or []
+    plan = Plan.from_guidance(tooltips, context.get("inapp_flows") or [], feedback)
+    files = event_files()
+
+    start = time.perf_counter()
+    report = aggregate(files, plan, incremental=os.getenv("ECE_USAGE_FULL", "0") != "1")
+    secs = time.perf_counter() - start
+    logger.info("usage: %d events (%d tracked, %d users) from %d exports (%d reused) in %.2fs (%s)",
+                report.events, report.tracked, report.users, len(files), report.reused, secs, report.backend)
+
+    # --- Tooltip A/B experiments over the same conversion counts ---
+    as_of = os.getenv("ECE_INAPP_AS_OF")
+    experiments = analyze(report.conversion, tooltips,
+                          datetime.date.fromisoformat(as_of) if as_of else datetime.date.today())
+    for r in experiments.retire:
+        logger.warning("%s: retire variant %s (%s on %s; expires %s)",
+                       r["tooltip"], r["retire"], r["reason"], r["decided_on"], r["expires_on"] or "never")
+
+    top = (context.get("support_insights") or {}).get("top_queries") or feedback
+    return {
+        "metrics_md": report.to_markdown(datetime.date.today().isoformat(), top, experiments.to_markdown()),
+        "usage_metrics": report.as_dict(),
+        "tooltip_experiments": experiments.as_dict(),
+        "cache_stats": {"usage_shards": {"hits": report.reused, "misses": len(files) - report.reused}},
+    }
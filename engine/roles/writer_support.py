@@ -4,14 +4,22 @@ from __future__ import annotations
 import csv
 import io
 import json
+import os
 import re
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from datetime import date
+from functools import partial, reduce
 from pathlib import Path
-from typing import Dict, Any, List, Iterable, Tuple, Optional
+from typing import Callable, Dict, Any, List, Iterable, Iterator, NamedTuple, Tuple, Optional
 
 from . import get_logger
+from ..artifact import Artifact
+from ..logscan import LogExamples, scan_logs
+from ..state import KB_FINGERPRINTS, digest, load_json, policy_digest
+from ..stream import ArtifactStream, streaming_enabled
+from ..taxonomy import load_taxonomy
 
 BASE = Path(__file__).resolve().parents[2]
 TODAY = date.today().isoformat()
@@ -53,28 +61,47 @@ def _read_feedback_csv(path: Path) -> Iterable[Signal]:
             out.append(Signal(topic=tag, text=query, source=str(path), weight=max(freq, 1)))
     return out
 
-def _read_markdown_folder(folder: Path, default_topic: str) -> Iterable[Signal]:
-    out = []
-    if not folder.exists():
-        return out
-    for p in sorted(folder.glob("*.md")):
-        txt = p.read_text(encoding="utf-8")
-        topic = _infer_topic(txt) or default_topic
-        out.append(Signal(topic=topic, text=txt, source=str(p), weight=1))
-    return out
-
-def _read_logs_folder(folder: Path) -> Iterable[Signal]:
-    out = []
-    if not folder.exists():
-        return out
-    for p in sorted(folder.glob("*.txt")):
-        txt = p.read_text(encoding="utf-8", errors="ignore")
-        lines = [ln.strip() for ln in txt.splitlines() if _looks_like_error(ln)]
-        if not lines:
-            continue
-        topic = _infer_topic("\n".join(lines)) or "restore"
-        out.append(Signal(topic=topic, text="\n".join(lines[:20]), source=str(p), weight=1))
-    return out
+def _read_markdown_file(path: Path, default_topic: str) -> Signal:
+    txt = path.read_text(encoding="utf-8")
+    topic = _infer_topic(txt) or default_topic
+    return Signal(topic=topic, text=txt, source=str(path), weight=1)
+
+def _log_signals(found: LogExamples) -> List[Signal]:
+    return [
+        Signal(topic=topic, text="\n".join(lines), source=found.source, weight=1)
+        for topic, lines in found.topics.items() if lines
+    ]
+
+class _Task(NamedTuple):
+    """One intake file to turn into signals (cheap to pickle)."""
+    kind: str                   # "csv" | "md" | "log"
+    path: str
+    default_topic: str = ""
+
+def _intake_tasks() -> List[_Task]:
+    """Intake files in the order their signals are bundled."""
+    tasks = [_Task("csv", str(BASE / "intake/support/feedback.csv"))]
+    for folder, default in (("intake/support/incidents", "restore"), ("intake/support/notes", "policy")):
+        d = BASE / folder
+        if d.exists():
+            tasks += [_Task("md", str(p), default) for p in sorted(d.glob("*.md"))]
+    logs = BASE / "intake/logs"
+    if logs.exists():
+        tasks += [_Task("log", str(p)) for p in sorted(logs.glob("*.txt"))]
+    brief = BASE / "intake/tech-docs/brief.md"
+    if brief.exists():
+        tasks.append(_Task("md", str(brief), "backup"))
+    return tasks
+
+def _read_tasks(tasks: List[_Task], log_workers: Optional[int] = None) -> Iterator[Signal]:
+    scanned = iter(scan_logs([t.path for t in tasks if t.kind == "log"], workers=log_workers))
+    for t in tasks:
+        if t.kind == "csv":
+            yield from _read_feedback_csv(Path(t.path))
+        elif t.kind == "md":
+            yield _read_markdown_file(Path(t.path), t.default_topic)
+        else:
+            yield from _log_signals(next(scanned))
 
 def _read_openapi_title(path: Path) -> Optional[str]:
     if not path.exists():
@@ -93,80 +120,26 @@ def _read_openapi_title(path: Path) -> Optional[str]:
 
 # ---------------------------- heuristics ----------------------------------
 
-TOPIC_KEYWORDS = {
-    "restore": [r"\brestore\b", r"\balternate path\b", r"\btargetPath\b", r"\b500\b"],
-    "policy":  [r"\bpolicy\b", r"\bretention\b", r"\bschedule\b", r"\bconflict\b"],
-    "backup":  [r"\bbackup\b", r"\bRPO\b", r"\bthroughput\b"],
-}
-
-ERROR_PATTERNS = [
-    r"\b(4\d{2}|5\d{2})\b",
-    r"\bpermission denied\b",
-    r"\bnot writable\b",
-    r"\bpath (does not exist|missing)\b",
-    r"\btimeout\b",
-]
-
-CAUSE_HINTS = [
-    r"\bpermission(s)?\b",
-    r"\bnot writable\b",
-    r"\bmissing path\b",
-    r"\bconflict\b",
-    r"\bendpoint protection|antivirus\b",
-]
-
-RESOLUTION_HINTS = [
-    r"\bcreate\b|\bmkdir\b",
-    r"\bgrant\b|\bchmod\b|\bchown\b|\badmin\b",
-    r"\bdisable\b.*(av|antivirus|endpoint)",
-    r"\bretry\b|\bre-run\b",
-    r"\bverify\b",
-]
+# Topic, error, cause and resolution vocabularies live in policies/topics.yml
+# and are compiled once into a combined scanner (see engine/taxonomy.py).
 
 def _infer_topic(text: str) -> Optional[str]:
-    t = text.lower()
-    for topic, patterns in TOPIC_KEYWORDS.items():
-        for pat in patterns:
-            if re.search(pat, t):
-                return topic
-    return None
-
-def _looks_like_error(line: str) -> bool:
-    if not line.strip():
-        return False
-    l = line.lower()
-    return any(re.search(p, l) for p in ERROR_PATTERNS)
+    return load_taxonomy().infer_topic(text)
 
 def _extract_bullets(text: str) -> Tuple[List[str], List[str], List[str]]:
-    t = text.lower()
-    symptoms, causes, resolutions = [], [], []
-    for ln in text.splitlines():
-        if _looks_like_error(ln) or "fails" in ln.lower() or "error" in ln.lower():
+    tax = load_taxonomy()
+    hits = tax.scan(text)
+    error_lines = hits.error_lines()
+    symptoms = []
+    for i, ln in enumerate(text.splitlines()):
+        low = ln.lower()
+        if (i in error_lines and ln.strip()) or "fails" in low or "error" in low:
             s = _clean_bullet(ln)
             if s: symptoms.append(s)
-    for pat in CAUSE_HINTS:
-        if re.search(pat, t):
-            causes.append(_phrase_from_hint(pat))
-    for pat in RESOLUTION_HINTS:
-        if re.search(pat, t):
-            resolutions.append(_phrase_from_hint(pat))
+    causes = tax.label_list("causes", hits.causes)
+    resolutions = tax.label_list("resolutions", hits.resolutions)
     return _dedup(symptoms), _dedup(causes), _dedup(resolutions)
 
-def _phrase_from_hint(pattern: str) -> str:
-    mapping = {
-        r"\bpermission(s)?\b": "Insufficient permissions on destination.",
-        r"\bnot writable\b": "Destination path is not writable.",
-        r"\bmissing path\b": "Destination path does not exist.",
-        r"\bconflict\b": "Policy conflict during schedule/path override.",
-        r"\bendpoint protection|antivirus\b": "Endpoint protection/antivirus blocked writes.",
-        r"\bcreate\b|\bmkdir\b": "Create the destination path before restore.",
-        r"\bgrant\b|\bchmod\b|\bchown\b|\badmin\b": "Run restore with admin rights or grant write permissions.",
-        r"\bdisable\b.*(av|antivirus|endpoint)": "Temporarily disable endpoint protection and re-try.",
-        r"\bretry\b|\bre-run\b": "Re-run the job after applying fixes.",
-        r"\bverify\b": "Verify success with file presence/integrity checks.",
-    }
-    return mapping.get(pattern, "Follow documented resolution steps.")
-
 def _clean_bullet(s: str) -> str:
     s = s.strip().lstrip("-•*").strip()
     s = re.sub(r"\s{2,}", " ", s)
@@ -191,20 +164,44 @@ def _slugify(text: str) -> str:
 
 # ---------------------------- synthesis -----------------------------------
 
-def _bundle_signals(signals: Iterable[Signal]) -> Dict[str, TopicBundle]:
+# Only the first BUNDLE_CAP raw entries of each list reach the article, so
+# partial bundles are truncated as they are built and merged.
+BUNDLE_CAP = 8
+
+def _extend_capped(dst: List[str], items: List[str], times: int) -> None:
+    for _ in range(max(1, times)):
+        if not items or len(dst) >= BUNDLE_CAP:
+            return
+        dst.extend(items[:BUNDLE_CAP - len(dst)])
+
+def _map_signals(signals: Iterable[Signal]) -> Dict[str, TopicBundle]:
+    """Fold signals into partial (raw, capped) bundles, in signal order."""
     bundles: Dict[str, TopicBundle] = {}
     for s in signals:
         b = bundles.setdefault(s.topic, TopicBundle(topic=s.topic))
-        sym, cau, res = _extract_bullets(s.text)
-        for _ in range(max(1, s.weight)):
-            b.symptoms.extend(sym)
-            b.causes.extend(cau)
-            b.resolutions.extend(res)
+        if min(len(b.symptoms), len(b.causes), len(b.resolutions)) < BUNDLE_CAP:
+            sym, cau, res = _extract_bullets(s.text)
+            _extend_capped(b.symptoms, sym, s.weight)
+            _extend_capped(b.causes, cau, s.weight)
+            _extend_capped(b.resolutions, res, s.weight)
         b.sources.append(s.source)
+    return bundles
+
+def _merge_bundles(left: Dict[str, TopicBundle], right: Dict[str, TopicBundle]) -> Dict[str, TopicBundle]:
+    """Associative merge of partial bundles; ``left`` holds the earlier signals."""
+    for topic, rb in right.items():
+        lb = left.setdefault(topic, TopicBundle(topic=topic))
+        _extend_capped(lb.symptoms, rb.symptoms, 1)
+        _extend_capped(lb.causes, rb.causes, 1)
+        _extend_capped(lb.resolutions, rb.resolutions, 1)
+        lb.sources.extend(rb.sources)
+    return left
+
+def _finalize_bundles(bundles: Dict[str, TopicBundle]) -> Dict[str, TopicBundle]:
     for b in bundles.values():
-        b.symptoms = _dedup(b.symptoms[:8])
-        b.causes = _dedup(b.causes[:8])
-        b.resolutions = _dedup(b.resolutions[:8])
+        b.symptoms = _dedup(b.symptoms)
+        b.causes = _dedup(b.causes)
+        b.resolutions = _dedup(b.resolutions)
         ver = []
         if any("permissions" in r.lower() or "admin" in r.lower() for r in b.resolutions):
             ver.append("Attempt restore as admin; confirm files created at destination.")
@@ -229,7 +226,51 @@ def _bundle_signals(signals: Iterable[Signal]) -> Dict[str, TopicBundle]:
         b.preventions = _dedup(prev)
     return bundles
 
-def _render_kb(topic: str, b: TopicBundle, api_title: Optional[str]) -> str:
+def _bundle_signals(signals: Iterable[Signal]) -> Dict[str, TopicBundle]:
+    return _finalize_bundles(_map_signals(signals))
+
+# ---------------------------- map/reduce ----------------------------------
+
+PARALLEL_MIN_TASKS = 64      # below this the pool start-up costs more than it saves
+CHUNKS_PER_WORKER = 4
+
+def _support_workers(n_tasks: int) -> int:
+    raw = os.getenv("ECE_SUPPORT_WORKERS", "").strip()
+    if raw:
+        return max(int(raw), 1)
+    return (os.cpu_count() or 1) if n_tasks >= PARALLEL_MIN_TASKS else 1
+
+def _chunk_tasks(tasks: List[_Task], parts: int) -> List[List[_Task]]:
+    """Split into contiguous, roughly byte-balanced chunks (order is preserved)."""
+    sizes = [os.path.getsize(t.path) if os.path.exists(t.path) else 0 for t in tasks]
+    target = max(sum(sizes) / max(parts, 1), 1)
+    chunks: List[List[_Task]] = [[]]
+    acc = 0
+    for t, size in zip(tasks, sizes):
+        if chunks[-1] and acc + size > target and len(chunks) < parts:
+            chunks.append([])
+            acc = 0
+        chunks[-1].append(t)
+        acc += size
+    return chunks
+
+def _map_chunk(tasks: List[_Task]) -> Dict[str, TopicBundle]:
+    # Workers already run in parallel; scan their logs inline.
+    return _map_signals(_read_tasks(tasks, log_workers=1))
+
+def _extract_bundles(tasks: List[_Task], workers: int) -> Dict[str, TopicBundle]:
+    """Map intake files to partial bundles and reduce them in file order."""
+    if workers <= 1 or len(tasks) <= 1:
+        return _finalize_bundles(_map_signals(_read_tasks(tasks)))
+    chunks = _chunk_tasks(tasks, workers * CHUNKS_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        partials = list(pool.map(_map_chunk, chunks))
+    return _finalize_bundles(reduce(_merge_bundles, partials, {}))
+
+def _kb_meta(title: str, tags: List[str], status: str = "active") -> Dict[str, Any]:
+    return {"title": title, "owner": "support", "status": status, "tags": tags, "last_reviewed": TODAY}
+
+def _render_kb(topic: str, b: TopicBundle, api_title: Optional[str]) -> Artifact:
     title_map = {
         "restore": "Restore — Alternate Path Failures",
         "policy": "Backup Policy — Conflict Resolution",
@@ -244,16 +285,7 @@ def _render_kb(topic: str, b: TopicBundle, api_title: Optional[str]) -> str:
     def bullets(name: str, items: List[str]) -> str:
         if not items: return f"## {name}\n- (none)\n\n"
         return "## " + name + "\n" + "\n".join(f"- {i}" for i in items) + "\n\n"
-    md = (
-        f"---\n"
-        f"title: {title}\n"
-        f"owner: support\n"
-        f"status: active\n"
-        f"tags: [kb, {topic}]\n"
-        f"last_reviewed: {TODAY}\n"
-        f"---\n"
-    )
-    md += bullets("Symptoms", b.symptoms)
+    md = bullets("Symptoms", b.symptoms)
     md += bullets("Possible Causes", b.causes)
     steps = []
     for r in b.resolutions:
@@ -267,42 +299,85 @@ def _render_kb(topic: str, b: TopicBundle, api_title: Optional[str]) -> str:
     md += "## References\n" + "\n".join(f"- {ref}" for ref in _dedup(refs)) + "\n\n"
     src = ", ".join(sorted(set(b.sources))) if b.sources else "intake/support/feedback.csv"
     md += f"Source: {src}\n"
-    return md
+    return Artifact(_kb_meta(title, ["kb", topic]), md)
+
+def _render_placeholder() -> Artifact:
+    return Artifact(_kb_meta("Troubleshooting — Getting Started", ["kb"]), (
+        "## Symptoms\n- (none)\n\n"
+        "## Possible Causes\n- (none)\n\n"
+        "## Resolution\n- Ensure intake/support/feedback.csv is populated.\n\n"
+        "## Verification\n- Run a test restore and confirm file presence.\n\n"
+        "## Prevention\n- Add feedback exports to the intake folder regularly.\n\n"
+        "## References\n- [Tenant Admin Guide](../user-guide/tenant-admin.md)\n\n"
+        "Source: intake/support\n"
+    ))
+
+def _render_web_doc(doc: Dict[str, Any]) -> Artifact:
+    meta = _kb_meta(str(doc.get("title") or doc.get("url")), ["kb", "external"], status="draft")
+    return Artifact(meta, f"""
+## Summary
+{doc.get("summary")}
+
+## Why it matters
+Provides external insights relevant to enterprise AI adoption.
+
+## Guidance
+{doc.get("notes") or "Review carefully before applying in production."}
+
+Source: {doc.get("url")}
+""")
+
+# ---------------------------- incremental state ---------------------------
+
+KB_DIR = BASE / "docs/samples/kb-articles"
+RENDER_VERSION = 1   # bump when _render_kb or the article templates change
+
+def _placed(name: str, art: Artifact) -> Artifact:
+    art.path = str((KB_DIR / name).relative_to(BASE))
+    return art
+
+def _bundle_fingerprint(topic: str, b: TopicBundle, api_title: Optional[str], policies: str) -> str:
+    return digest(
+        "kb", RENDER_VERSION, topic, b.symptoms, b.causes, b.resolutions,
+        b.verifications, b.preventions, sorted(set(b.sources)), api_title, policies,
+    )
 
 # ---------------------------- role entry ----------------------------------
 
 def run(context: Dict[str, Any]) -> Dict[str, Any]:
     logger = get_logger("writer_support")
-    signals: List[Signal] = []
-    signals += list(_read_feedback_csv(BASE / "intake/support/feedback.csv"))
-    signals += list(_read_markdown_folder(BASE / "intake/support/incidents", default_topic="restore"))
-    signals += list(_read_markdown_folder(BASE / "intake/support/notes", default_topic="policy"))
-    signals += list(_read_logs_folder(BASE / "intake/logs"))
-    brief = BASE / "intake/tech-docs/brief.md"
-    if brief.exists():
-        signals.append(Signal(topic=_infer_topic(brief.read_text(encoding='utf-8')) or "backup",
-                              text=brief.read_text(encoding='utf-8'),
-                              source=str(brief), weight=1))
-    bundles = _bundle_signals(signals)
-    kb_files: Dict[str, str] = {}
+    tasks = _intake_tasks()
+    workers = _support_workers(len(tasks))
+    bundles = _extract_bundles(tasks, workers)
+    logger.info("signals extracted (files=%d, workers=%d, topics=%d)", len(tasks), workers, len(bundles))
+
+    # Articles whose inputs are unchanged since the last publish are carried
+    # forward as-is; only the rest flow through editors/compliance/publisher.
+    policies = policy_digest()
+    previous = {} if os.getenv("ECE_KB_FULL", "0") == "1" else load_json(KB_FINGERPRINTS, {}) or {}
+    fingerprints: Dict[str, str] = {}
+    carried: List[str] = []
+    # Claim groups for the publisher's --prune: every article this run owns,
+    # rendered or carried. Web articles are only fully known when the web
+    # ingestor ran in this packet and fetched every URL.
+    web_known = "web_docs" in context and not context.get("web_failed")
+    claims: Dict[str, Optional[List[str]]] = {"kb": [], "kb-web": [] if web_known else None}
+
+    def stale(name: str, fp: str, group: str = "kb") -> bool:
+        fingerprints[name] = fp
+        if claims[group] is not None:
+            claims[group].append(name)
+        if previous.get(name) == fp and (KB_DIR / name).exists():
+            carried.append(name)
+            return False
+        return True
+
+    # (name, render) pairs; rendering is deferred so streaming stays lazy.
+    pending: List[Tuple[str, Callable[[], Artifact]]] = []
     if not bundles:
         logger.info("no signals found; producing minimal placeholder KB")
-        kb_files["getting-started.md"] = (
-            "---\n"
-            "title: Troubleshooting — Getting Started\n"
-            "owner: support\n"
-            "status: active\n"
-            "tags: [kb]\n"
-            f"last_reviewed: {TODAY}\n"
-            "---\n"
-            "## Symptoms\n- (none)\n\n"
-            "## Possible Causes\n- (none)\n\n"
-            "## Resolution\n- Ensure intake/support/feedback.csv is populated.\n\n"
-            "## Verification\n- Run a test restore and confirm file presence.\n\n"
-            "## Prevention\n- Add feedback exports to the intake folder regularly.\n\n"
-            "## References\n- [Tenant Admin Guide](../user-guide/tenant-admin.md)\n\n"
-            "Source: intake/support\n"
-        )
+        if stale("getting-started.md", digest("kb-placeholder", RENDER_VERSION, policies)):
+            pending.append(("getting-started.md", _render_placeholder))
     else:
         api_title = _read_openapi_title(BASE / "intake/tech-docs/openapi.yaml")
         for topic, bundle in bundles.items():
@@ -310,32 +385,26 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
                 "restore": "restore-errors.md",
                 "policy": "policy-conflicts.md",
             }[topic]
-            kb_files[name] = _render_kb(topic, bundle, api_title)
+            if stale(name, _bundle_fingerprint(topic, bundle, api_title, policies)):
+                pending.append((name, partial(_render_kb, topic, bundle, api_title)))
     # integrate ingested web docs
     for doc in context.get("web_docs", []):
         try:
             slug = _slugify(doc.get("title") or doc.get("url"))
             name = f"{slug}.md"
-            kb_files[name] = f"""---
-title: {doc.get("title") or doc.get("url")}
-owner: support
-status: draft
-tags: [kb, external]
-last_reviewed: {TODAY}
----
-
-## Summary
-{doc.get("summary")}
-
-## Why it matters
-Provides external insights relevant to enterprise AI adoption.
-
-## Guidance
-{doc.get("notes") or "Review carefully before applying in production."}
-
-Source: {doc.get("url")}
-"""
+            fp = digest("kb-web", RENDER_VERSION, doc.get("title"), doc.get("url"),
+                        doc.get("summary"), doc.get("notes"), policies)
+            if stale(name, fp, "kb-web"):
+                pending.append((name, partial(_render_web_doc, doc)))
         except Exception as e:
             logger.info("failed to convert web doc: %s", e)
-    logger.info("kb articles created (total=%d)", len(kb_files))
-    return {"kb_files": kb_files}
+
+    out: Dict[str, Any] = {"kb_fingerprints": fingerprints, "kb_carried": carried, "kb_claims": claims}
+    if streaming_enabled():
+        logger.info("kb articles streaming (pending=%d, carried=%d)", len(pending), len(carried))
+        out["kb_stream"] = ArtifactStream((name, _placed(name, render())) for name, render in pending)
+        return out
+    kb_files = {name: _placed(name, render()) for name, render in pending}
+    logger.info("kb articles created (rendered=%d, carried=%d)", len(kb_files), len(carried))
+    out["kb_files"] = kb_files
+    return out
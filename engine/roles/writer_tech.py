@@ -2,9 +2,12 @@
 """Generate technical documentation (Druva-aligned, structure-safe)."""
 from __future__ import annotations
 
+import os
 from typing import Dict, Any, List
 from datetime import date
 from . import get_logger
+from .. import apiref
+from ..artifact import Artifact
 
 
 def _api_changes_block(endpoints: List[Dict[str, Any]]) -> str:
@@ -20,63 +23,43 @@ def _api_changes_block(endpoints: List[Dict[str, Any]]) -> str:
     return ("\n".join(lines) + "\n") if lines else "No API changes this release.\n"
 
 
+def _front_matter(title: str, tags: List[str], today: str, **extra: Any) -> Dict[str, Any]:
+    """Governed-doc front matter (L2, PM + engineering approved)."""
+    meta: Dict[str, Any] = {
+        "title": title,
+        "owner": "docs-team",
+        "status": "active",
+        "tags": tags,
+        "last_reviewed": today,
+    }
+    meta.update(extra)
+    meta["risk_band"] = "L2"
+    meta["approvals"] = {"pm": True, "engineering": True}
+    return meta
+
+
 def run(context: Dict[str, Any]) -> Dict[str, Any]:
-    """Create API reference, user guide, and release notes."""
+    """Create API reference (index + one page per tag), user guide, and release notes."""
     logger = get_logger("writer_tech")
     endpoints: List[Dict[str, Any]] = context.get("endpoints", [])  # optional
 
     today = date.today().isoformat()
 
     # ---------- API REFERENCE ----------
-    api_reference_md = (
-        "---\n"
-        "title: Backup & Restore API Reference\n"
-        "owner: docs-team\n"
-        "status: active\n"
-        "tags: [api-reference, public-docs]\n"
-        f"last_reviewed: {today}\n"
-        "risk_band: L2\n"
-        "approvals:\n"
-        "  pm: true\n"
-        "  engineering: true\n"
-        "---\n"
-        "## Overview\n"
-        "Authentication uses bearer tokens. Pagination uses `limit` and `offset`.\n"
-        "\n"
-        "### List backups\n"
-        "\n"
-        "```bash\n"
-        "curl -H \"Authorization: Bearer TOKEN\" \\\n"
-        "  \"https://api.example.com/v1/backups?tenantId=123\"\n"
-        "```\n"
-        "\n"
-        "### Start restore\n"
-        "\n"
-        "```bash\n"
-        "curl -X POST -H \"Authorization: Bearer TOKEN\" \\\n"
-        "  -H \"Content-Type: application/json\" \\\n"
-        "  -d '{\"backupId\":\"b1\",\"targetPath\":\"/tmp\"}' \\\n"
-        "  \"https://api.example.com/v1/restores\"\n"
-        "```\n"
-        "\n"
-        "Notes: For `tenantId`, use the GUID of the managed tenant. `targetPath` must be writable.\n"
-        "\n"
-        "Source: intake/tech-docs/openapi.yaml\n"
-    )
-
+    spec = context.get("sources", {}).get("openapi") or {}
+    ref = apiref.build(spec, full=os.getenv("ECE_APIREF_FULL", "0") == "1")
+    logger.info("api reference: %d tag pages (operations rendered=%d, cached=%d)",
+                len(ref.pages), ref.misses, ref.hits)
+    api_pages = {
+        name: Artifact(
+            _front_matter(f"API Reference — {ref.titles[name]}", ["api-reference", "public-docs"], today),
+            body,
+            f"{apiref.TAGS_DIR}/{name}",
+        )
+        for name, body in ref.pages.items()
+    }
     # ---------- USER GUIDE ----------
-    user_guide_md = (
-        "---\n"
-        "title: Tenant Admin Guide\n"
-        "owner: docs-team\n"
-        "status: active\n"
-        "tags: [user-guide, public-docs]\n"
-        f"last_reviewed: {today}\n"
-        "risk_band: L2\n"
-        "approvals:\n"
-        "  pm: true\n"
-        "  engineering: true\n"
-        "---\n"
+    user_guide_body = (
         "## Configure backup policy\n"
         "1. Open **Policies**.\n"
         "2. Define scope and schedule (set retention days and window).\n"
@@ -101,23 +84,7 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
     )
 
     # ---------- RELEASE NOTES ----------
-    rn_frontmatter = (
-        "---\n"
-        "title: August 2025 Release Notes\n"
-        "owner: docs-team\n"
-        "status: active\n"
-        "tags: [release-notes, public-docs]\n"
-        f"last_reviewed: {today}\n"
-        "version: 2025.08\n"
-        "risk_band: L2\n"
-        "approvals:\n"
-        "  pm: true\n"
-        "  engineering: true\n"
-        "---\n"
-    )
-
-    release_notes_md = (
-        f"{rn_frontmatter}"
+    release_notes_body = (
         "## Highlights\n"
         "- **Backup list & Restore APIs** simplify tenant management and reduce recovery steps.\n"
         "\n"
@@ -147,7 +114,22 @@ def run(context: Dict[str, Any]) -> Dict[str, Any]:
 
     logger.info("technical docs created")
     return {
-        "api_reference_md": api_reference_md,
-        "user_guide_md": user_guide_md,
-        "release_notes_md": release_notes_md,
+        "api_reference_md": Artifact(
+            _front_matter("Backup & Restore API Reference", ["api-reference", "public-docs"], today),
+            ref.index,
+            "docs/samples/api-reference/reference.md",
+        ),
+        "user_guide_md": Artifact(
+            _front_matter("Tenant Admin Guide", ["user-guide", "public-docs"], today),
+            user_guide_body,
+            "docs/samples/user-guide/tenant-admin.md",
+        ),
+        "release_notes_md": Artifact(
+            _front_matter("August 2025 Release Notes", ["release-notes", "public-docs"], today,
+                          version="2025.08"),
+            release_notes_body,
+            "docs/samples/release-notes/2025-08.md",
+        ),
+        "api_pages": api_pages,
+        "cache_stats": {"api_fragments": {"hits": ref.hits, "misses": ref.misses}},
     }
@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import argparse
 import logging
+import os
 import sys
 from typing import Any, Dict, List
 
@@ -36,6 +37,8 @@ def _print_summary(ctx: Dict[str, Any]) -> None:
     if written:
         for p in written:
             log.info("  - %s", p)
+    for p in ctx.get("pruned_paths") or []:
+        log.info("  x %s (pruned)", p)
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run agentic documentation pipeline")
@@ -43,9 +46,18 @@ def main() -> None:
     parser.add_argument("--update", action="store_true", help="recompute outputs (same as --all)")
     parser.add_argument("--packet", help="run a specific packet", default=None)
     parser.add_argument("--list", action="store_true", help="list available packets and exit")
+    parser.add_argument("--dry-run", action="store_true", help="compute everything but publish nothing")
+    parser.add_argument("--diff", action="store_true",
+                        help="with --dry-run: list added/changed/unchanged outputs from docs/.publish-manifest")
+    parser.add_argument("--prune", action="store_true",
+                        help="delete KB articles no writer claims any more (recorded in docs/.publish-manifest)")
+    parser.add_argument("--comms-batch", nargs="?", const="docs/samples/release-notes", default=None,
+                        metavar="DIR", help="with comms-update: also draft comms for every release note in DIR")
     parser.add_argument("-v", "--verbose", action="count", default=0, help="increase log verbosity")
 
     args = parser.parse_args()
+    if args.diff and not args.dry_run and os.getenv("ECE_DRY_RUN", "0") != "1":
+        parser.error("--diff requires --dry-run")
     _setup_logging(args.verbose)
     log = logging.getLogger("run")
 
@@ -63,10 +75,14 @@ def main() -> None:
             print(f"  - {p}")
         sys.exit(0)
 
+    # --dry-run forces a dry run; otherwise ECE_DRY_RUN decides
+    dry_run = True if args.dry_run else None
+    prune = True if args.prune else None
     try:
         if args.all or args.update:
             log.info("Running full pipeline: all")
-            ctx = graph.run("all")
+            ctx = graph.run("all", dry_run=dry_run, diff=args.diff, prune=prune,
+                            comms_batch=args.comms_batch)
         elif args.packet:
             # Validate packet name early for clearer errors
             packets = list(getattr(graph, "PACKETS", {}).keys())
@@ -74,7 +90,8 @@ def main() -> None:
                 log.error("Unknown packet '%s'. Try one of: %s", args.packet, ", ".join(packets))
                 sys.exit(2)
             log.info("Running packet: %s", args.packet)
-            ctx = graph.run("packet", args.packet)
+            ctx = graph.run("packet", args.packet, dry_run=dry_run, diff=args.diff, prune=prune,
+                            comms_batch=args.comms_batch)
         else:
             parser.print_help()
             sys.exit(0)
@@ -0,0 +1,724 @@
+# engine/search.py
+"""Full-text search over the published Markdown (``docs/.search/``).
+
+After every commit the publisher hands this module the Markdown entries of
+the publish manifest (path -> content hash). Only documents whose hash
+changed are read and tokenized:
+
+* tokens are lowercased ASCII words, folded from Unicode, minus a short
+  stopword list, and reduced by a light English stemmer;
+* every token keeps its position, so quoted phrases can be matched.
+
+The index is a list of immutable segments plus ``segments.json``. Each run
+that changes documents writes one new segment holding only those documents,
+and marks their previous copies as dead in the older segments. At
+``MAX_SEGMENTS`` segments, the small ones are folded into the new segment and
+the largest is left alone. Once dead documents make up over ``MAX_DEAD`` of
+the indexed ones, everything is rebuilt into a single segment.
+
+A segment file is a small header followed by fixed-width little-endian
+``uint32`` arrays and two UTF-8 blobs (``_SECTIONS``):
+
+* per document: its length in tokens and an offset into ``path\\ttitle``;
+* per term, sorted by UTF-8 bytes: an offset into the term blob and the
+  start of its postings and positions;
+* per posting: document id and term frequency; then all positions.
+
+``Searcher`` maps the files read-only and views the arrays in place with
+``memoryview.cast``, so opening an index costs no parsing. A term is found by
+binary search, and its postings are sliced out without copying. Ranking is
+BM25 (``K1``, ``B``), with exact document frequencies over live documents.
+
+``python -m engine.search "restore path"`` queries from the shell.
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+try:  # optional: vectorized segment building and scoring
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised where NumPy is absent
+    np = None
+
+from .markdown import FRONT_MATTER_RE
+
+BASE = Path(__file__).resolve().parents[1]
+INDEX_DIR = BASE / "docs/.search"
+SEGMENTS = "segments.json"     # segment files and their dead document ids
+DOCS = "docs.json"             # path -> content hash, segment and id (updates only)
+SEARCH_VERSION = 1
+MAGIC = b"ECESRCH1"
+MAX_SEGMENTS = 8
+BATCH_DOCS = 4096       # documents sorted together while a segment is built
+MAX_DEAD = 0.25
+K1 = 1.2
+B = 0.75
+
+# magic, version, docs, terms, postings, positions; then the section offsets
+_HEADER = struct.Struct("<8s5I11Q")
+_SECTIONS = ("doc_len", "doc_off", "doc_blob", "term_off", "term_blob",
+             "term_post", "term_pos", "post_doc", "post_tf", "positions", "end")
+
+_SEPARATORS = bytes(c if chr(c).isascii() and (chr(c).islower() or chr(c).isdigit()) else 32 for c in range(256))
+_TITLE = re.compile(r"(?m)^title:[ \t]*['\"]?(.*?)['\"]?[ \t]*$")
+_H1 = re.compile(r"(?m)^#[ \t]+(.+?)[ \t]*$")
+_PHRASE = re.compile(r'"([^"]*)"')
+_VOWEL = re.compile(r"[aeiouy]")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have if in into is it its of on or so such that the "
+    "their then there these they this to was were will with".split())
+STEM_CACHE = 1 << 18     # distinct words remembered by tokenize
+_STEMS: Dict[bytes, Optional[str]] = {}  # word -> term (None for stopwords)
+
+
+# ---------- text ------------------------------------------------------------
+
+def stem(word: str) -> str:
+    """Light suffix stripping (plurals, -ing, -ed, -ly, final e); not a full Porter stemmer."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith(("sses", "xes", "zes", "ches", "shes")):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and _VOWEL.search(word[:-len(suffix)]):
+            word = word[:-len(suffix)]
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            break
+    if word.endswith("ly") and len(word) > 5:
+        word = word[:-2]
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+Tokens = Tuple[List[str], List[int]]     # terms, and the position of each
+
+
+def tokenize(text: str) -> Tokens:
+    """Terms and their positions; stopwords are dropped but keep their position slot."""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+    # Bytes, so splitting on everything but [a-z0-9] is one translate + split in C.
+    words = text.encode("ascii", "ignore").lower().translate(_SEPARATORS).split()
+    # Only words never seen before are stemmed in Python; every occurrence is then mapped in C.
+    if len(_STEMS) > STEM_CACHE:
+        _STEMS.clear()
+    for w in set(words).difference(_STEMS):
+        word = w.decode("ascii")
+        _STEMS[w] = None if word in STOPWORDS else stem(word)
+    terms = list(map(_STEMS.__getitem__, words))
+    positions = [i for i, t in enumerate(terms) if t is not None]
+    return ([t for t in terms if t is not None] if len(positions) < len(terms) else terms), positions
+
+
+def title_of(text: str, path: str) -> str:
+    m = FRONT_MATTER_RE.match(text)
+    t = _TITLE.search(m.group(1)) if m else None
+    if t and t.group(1).strip():
+        return t.group(1).strip()
+    h = _H1.search(text, m.end() if m else 0)
+    return h.group(1) if h else Path(path).stem
+
+
+def _document(text: str, path: str) -> Tuple[str, Tokens]:
+    """(title, tokens): the body without front matter, preceded by the title."""
+    title = title_of(text, path)
+    m = FRONT_MATTER_RE.match(text)
+    return title, tokenize(title + "\n" + (text[m.end():] if m else text))
+
+
+# ---------- segments --------------------------------------------------------
+
+def _u32(values: Iterable[int]) -> array:
+    if np is not None and isinstance(values, np.ndarray):
+        out = array("I")
+        out.frombytes(values.astype(np.uint32).tobytes())
+        return out
+    return array("I", values)
+
+
+def _le(arr: array) -> bytes:
+    if sys.byteorder == "big":
+        arr = array("I", arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+@dataclass
+class _Run:
+    """Postings of one batch of documents, sorted by term."""
+    terms: Dict[str, int]       # term -> index into term_post/term_pos
+    term_post: array
+    term_pos: array
+    post_doc: array
+    post_tf: array
+    positions: array
+
+
+def _run(batch: List[Tokens], first_doc: int) -> _Run:
+    """Sort one batch's tokens into postings (documents numbered from ``first_doc``)."""
+    vocab: set = set()
+    flat_terms: List[str] = []
+    flat_pos: List[int] = []
+    flat_doc: List[int] = []
+    for doc_id, (terms, positions) in enumerate(batch, first_doc):
+        vocab.update(terms)
+        flat_terms.extend(terms)
+        flat_pos.extend(positions)
+        flat_doc.extend([doc_id] * len(terms))
+    terms = sorted(vocab)
+    tid = {t: i for i, t in enumerate(terms)}
+    flat_tid = list(map(tid.__getitem__, flat_terms))
+    del flat_terms
+
+    # One sortable int per token: (term, document, position) packed into bit
+    # fields, so a single sort orders postings and positions at once.
+    pos_bits = max(flat_pos, default=0).bit_length()
+    doc_bits = max(flat_doc, default=0).bit_length()
+    if np is not None and flat_tid and pos_bits + doc_bits + len(terms).bit_length() <= 63:
+        keys = (np.asarray(flat_tid, dtype=np.int64) << (pos_bits + doc_bits)) \
+            | (np.asarray(flat_doc, dtype=np.int64) << pos_bits) | np.asarray(flat_pos, dtype=np.int64)
+        keys.sort()
+        positions: Any = keys & ((1 << pos_bits) - 1)
+        pairs = keys >> pos_bits                            # (term, document) per token
+        starts = np.flatnonzero(np.r_[True, pairs[1:] != pairs[:-1]])
+        post_doc: Any = pairs[starts] & ((1 << doc_bits) - 1)
+        post_tf: Any = np.diff(np.r_[starts, len(pairs)])
+        post_term = pairs[starts] >> doc_bits
+        term_post: Any = np.r_[np.flatnonzero(np.r_[True, post_term[1:] != post_term[:-1]]), len(post_term)]
+        term_pos: Any = np.r_[starts, len(pairs)][term_post]
+    else:
+        keys = [t << (pos_bits + doc_bits) | d << pos_bits | p for t, d, p in zip(flat_tid, flat_doc, flat_pos)]
+        keys.sort()
+        positions = [k & ((1 << pos_bits) - 1) for k in keys]
+        pairs = [k >> pos_bits for k in keys]
+        del keys
+        starts = [i for i in range(len(pairs)) if not i or pairs[i] != pairs[i - 1]]
+        post_doc = [pairs[i] & ((1 << doc_bits) - 1) for i in starts]
+        post_tf = [b - a for a, b in zip(starts, starts[1:] + [len(pairs)])]
+        post_term = [pairs[i] >> doc_bits for i in starts]
+        # Each term has at least one posting, so its first posting marks its range.
+        term_post = [i for i in range(len(post_term)) if not i or post_term[i] != post_term[i - 1]]
+        term_post.append(len(post_term))
+        bounds = starts + [len(pairs)]
+        term_pos = [bounds[i] for i in term_post]
+    return _Run(tid, _u32(term_post), _u32(term_pos), _u32(post_doc), _u32(post_tf), _u32(positions))
+
+
+def write_segment(path: Path, docs: Iterable[Tuple[str, str, Tokens]]) -> List[str]:
+    """Write ``docs`` ((path, title, tokens) each) as one segment; returns the paths in id order.
+
+    Documents are consumed ``BATCH_DOCS`` at a time and each batch is sorted
+    into a run of compact arrays, so memory stays near the size of the file.
+    The runs are then concatenated term by term.
+    """
+    paths: List[str] = []
+    lengths = array("I")
+    doc_blob, doc_off = bytearray(), array("I", [0])
+    runs: List[_Run] = []
+    batch: List[Tokens] = []
+    for rel, title, tokens in docs:
+        paths.append(rel)
+        lengths.append(len(tokens[0]))
+        doc_blob += f"{rel}\t{title}".replace("\n", " ").encode("utf-8")
+        doc_off.append(len(doc_blob))
+        batch.append(tokens)
+        if len(batch) >= BATCH_DOCS:
+            runs.append(_run(batch, len(paths) - len(batch)))
+            batch = []
+    if batch:
+        runs.append(_run(batch, len(paths) - len(batch)))
+    del batch
+
+    terms = sorted(set().union(*(r.terms for r in runs)), key=lambda t: t.encode("utf-8"))
+    term_blob, term_off = bytearray(), array("I", [0])
+    term_post, term_pos = array("I", [0]), array("I", [0])
+    post_doc, post_tf, positions = array("I"), array("I"), array("I")
+    for term in terms:
+        term_blob += term.encode("utf-8")
+        term_off.append(len(term_blob))
+        for r in runs:
+            i = r.terms.get(term)
+            if i is None:
+                continue
+            a, b = r.term_post[i], r.term_post[i + 1]
+            post_doc += r.post_doc[a:b]
+            post_tf += r.post_tf[a:b]
+            positions += r.positions[r.term_pos[i]:r.term_pos[i + 1]]
+        term_post.append(len(post_doc))
+        term_pos.append(len(positions))
+
+    def pad(b: bytes) -> bytes:
+        return b + b"\0" * (-len(b) % 8)
+
+    parts = [pad(_le(lengths)), pad(_le(doc_off)), pad(bytes(doc_blob)), pad(_le(term_off)), pad(bytes(term_blob)),
+             pad(_le(term_post)), pad(_le(term_pos)), pad(_le(post_doc)), pad(_le(post_tf)), pad(_le(positions))]
+    offsets, at = [], _HEADER.size
+    for p in parts:
+        offsets.append(at)
+        at += len(p)
+    offsets.append(at)
+    header = _HEADER.pack(MAGIC, SEARCH_VERSION, len(paths), len(terms), len(post_doc), len(positions), *offsets)
+    _atomic_write(path, b"".join([header, *parts]))
+    return paths
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    Path(name).replace(path)
+
+
+class Segment:
+    """One segment file, mapped read-only; arrays are views into the mapping."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open("rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        head = _HEADER.unpack_from(self._mm)
+        if head[0] != MAGIC or head[1] != SEARCH_VERSION:
+            raise ValueError(f"{path}: not a search segment (version {SEARCH_VERSION})")
+        self.n_docs, self.n_terms = head[2], head[3]
+        off = dict(zip(_SECTIONS, head[6:]))
+        mv = self._mv = memoryview(self._mm)
+        names = list(_SECTIONS)
+
+        def section(name: str, count: Optional[int] = None) -> memoryview:
+            start, end = off[name], off[names[names.index(name) + 1]]
+            if count is None:
+                return mv[start:end]
+            view = mv[start:start + 4 * count]
+            if sys.byteorder == "big":      # files are little-endian; swap a copy
+                arr = array("I", view.tobytes())
+                arr.byteswap()
+                return memoryview(arr)
+            return view.cast("I")
+
+        self.doc_len = section("doc_len", self.n_docs)
+        self.doc_off = section("doc_off", self.n_docs + 1)
+        self.doc_blob = section("doc_blob")
+        self.term_off = section("term_off", self.n_terms + 1)
+        self.term_blob = section("term_blob")
+        self.term_post = section("term_post", self.n_terms + 1)
+        self.term_pos = section("term_pos", self.n_terms + 1)
+        self.post_doc = section("post_doc", head[4])
+        self.post_tf = section("post_tf", head[4])
+        self.positions = section("positions", head[5])
+
+    def doc(self, doc_id: int) -> Tuple[str, str]:
+        """(path, title) of ``doc_id``."""
+        raw = bytes(self.doc_blob[self.doc_off[doc_id]:self.doc_off[doc_id + 1]]).decode("utf-8")
+        path, _, title = raw.partition("\t")
+        return path, title
+
+    def find(self, term: str) -> int:
+        """Index of ``term`` in the sorted term table, or -1."""
+        key = term.encode("utf-8")
+        lo, hi = 0, self.n_terms
+        blob, off = self.term_blob, self.term_off
+        while lo < hi:
+            mid = (lo + hi) // 2
+            cur = blob[off[mid]:off[mid + 1]].tobytes()
+            if cur < key:
+                lo = mid + 1
+            elif cur > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def postings(self, t: int) -> Tuple[List[int], List[int]]:
+        """(document ids, term frequencies) of term index ``t``."""
+        a, b = self.term_post[t], self.term_post[t + 1]
+        return self.post_doc[a:b].tolist(), self.post_tf[a:b].tolist()
+
+    def positions_of(self, t: int) -> Dict[int, List[int]]:
+        """Document id -> positions of term index ``t``."""
+        docs, tfs = self.postings(t)
+        flat = self.positions[self.term_pos[t]:self.term_pos[t + 1]].tolist()
+        out, at = {}, 0
+        for d, tf in zip(docs, tfs):
+            out[d] = flat[at:at + tf]
+            at += tf
+        return out
+
+    def close(self) -> None:
+        for name in ("doc_len", "doc_off", "doc_blob", "term_off", "term_blob", "term_post",
+                     "term_pos", "post_doc", "post_tf", "positions"):
+            view = getattr(self, name)
+            if isinstance(view, memoryview):
+                view.release()
+        self._mv.release()
+        self._mm.close()
+
+
+# ---------- index maintenance -----------------------------------------------
+
+@dataclass
+class UpdateStats:
+    indexed: int = 0        # documents read and tokenized
+    removed: int = 0
+    unchanged: int = 0
+    segments: int = 0
+    merged: int = 0         # small segments folded into this run's segment
+    compacted: bool = False     # everything rebuilt into one segment
+    seconds: float = 0.0
+
+
+def _load_state(index_dir: Path, with_docs: bool = True) -> Dict[str, Any]:
+    """``segments.json`` (plus the ``docs.json`` path map); an empty index if either is unusable."""
+    empty = {"version": SEARCH_VERSION, "next": 0, "segments": [], "docs": {}}
+    try:
+        state = json.loads((index_dir / SEGMENTS).read_text(encoding="utf-8"))
+        if with_docs:
+            docs = json.loads((index_dir / DOCS).read_text(encoding="utf-8"))
+            # Written after segments.json: a run that died in between is rebuilt.
+            if not isinstance(docs, dict) or docs.get("next") != state.get("next"):
+                return empty
+            state["docs"] = docs.get("docs") or {}
+    except (OSError, ValueError, AttributeError):
+        return empty
+    if not isinstance(state, dict) or state.get("version") != SEARCH_VERSION:
+        return empty
+    return state
+
+
+def _read_docs(paths: Iterable[str], root: Path) -> Iterator[Tuple[str, str, Tokens]]:
+    for rel in paths:
+        try:
+            text = (root / rel).read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            continue
+        title, tokens = _document(text, rel)
+        yield rel, title, tokens
+
+
+def update(published: Mapping[str, Optional[str]], root: Path = BASE, index_dir: Path = INDEX_DIR,
+           full: bool = False) -> UpdateStats:
+    """Bring the index in line with ``published`` (relative path -> content hash).
+
+    Documents whose hash is unchanged are not read. When the segment limit
+    is reached, the live documents of every segment but the largest are
+    re-read into this run's segment; when too many are dead (or ``full``),
+    everything is rebuilt into one segment.
+    """
+    start = time.perf_counter()
+    stats = UpdateStats()
+    state = _load_state(index_dir)
+    docs: Dict[str, Dict[str, Any]] = state["docs"]
+    segments: List[Dict[str, Any]] = state["segments"]
+    by_file = {s["file"]: s for s in segments}
+
+    def kill(rel: str) -> None:
+        entry = docs.pop(rel, None)
+        seg = by_file.get(entry["seg"]) if entry else None
+        if seg is not None:
+            seg["dead"].append(entry["id"])
+
+    changed = {p for p, h in published.items() if docs.get(p, {}).get("hash") != h or h is None}
+    removed = sorted(p for p in docs if p not in published)
+    stats.unchanged = len(published) - len(changed)
+    for rel in removed + sorted(changed):
+        kill(rel)
+    stats.removed = len(removed)
+
+    indexed = sum(s["docs"] for s in segments)
+    dead = sum(len(s["dead"]) for s in segments)
+    if full or (indexed and dead / indexed > MAX_DEAD):
+        stats.compacted = True
+        changed = set(published)
+        docs.clear()
+        segments.clear()
+    elif len(segments) + bool(changed) > MAX_SEGMENTS:
+        base = max(segments, key=lambda s: s["docs"] - len(s["dead"]))
+        small = {s["file"] for s in segments if s is not base}
+        moved = [rel for rel, entry in docs.items() if entry["seg"] in small]
+        for rel in moved:
+            kill(rel)
+        changed.update(moved)
+        stats.merged = len(small)
+    if changed:
+        name = f"seg-{state['next']:06d}.idx"
+        written = write_segment(index_dir / name, _read_docs(sorted(changed), root))
+        segments.append({"file": name, "docs": len(written), "dead": []})
+        for i, rel in enumerate(written):
+            docs[rel] = {"hash": published[rel], "seg": name, "id": i}
+        stats.indexed = len(written)
+    # A segment whose documents are all dead is dropped.
+    segments[:] = [s for s in segments if len(s["dead"]) < s["docs"]]
+    if changed or removed or not (index_dir / SEGMENTS).exists():
+        state["next"] += 1
+        index_dir.mkdir(parents=True, exist_ok=True)
+        _atomic_write(index_dir / SEGMENTS, json.dumps(
+            {"version": SEARCH_VERSION, "next": state["next"], "segments": segments}, sort_keys=True).encode("utf-8"))
+        _atomic_write(index_dir / DOCS, json.dumps(
+            {"next": state["next"], "docs": docs}, sort_keys=True).encode("utf-8"))
+        keep = {s["file"] for s in segments}
+        for p in index_dir.glob("seg-*.idx"):
+            if p.name not in keep:
+                p.unlink(missing_ok=True)
+    stats.segments = len(segments)
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+# ---------- queries ---------------------------------------------------------
+
+@dataclass
+class Hit:
+    path: str
+    title: str
+    score: float
+
+
+@dataclass
+class _Query:
+    terms: List[str] = field(default_factory=list)              # scored, deduplicated
+    phrases: List[List[Tuple[str, int]]] = field(default_factory=list)   # (term, offset) each
+
+
+def parse_query(text: str) -> _Query:
+    """Bare words are ranked; every ``"quoted phrase"`` must also appear as written."""
+    q = _Query()
+    for phrase in _PHRASE.findall(text):
+        terms, positions = tokenize(phrase)
+        if terms:
+            q.phrases.append([(t, p - positions[0]) for t, p in zip(terms, positions)])
+    words = tokenize(_PHRASE.sub(" ", text))[0]
+    q.terms = list(dict.fromkeys(words + [t for ph in q.phrases for t, _ in ph]))
+    return q
+
+
+class Searcher:
+    """Ranked lookups over every live document of an index directory.
+
+    Scores are accumulated per segment, with NumPy arrays over the mapped
+    postings when it is installed and a dict otherwise.
+    """
+
+    def __init__(self, index_dir: Path = INDEX_DIR, vectorized: Optional[bool] = None):
+        state = _load_state(index_dir, with_docs=False)
+        self.vectorized = (np is not None) if vectorized is None else vectorized
+        self.segments: List[Segment] = []
+        self.dead: List[List[int]] = []     # sorted dead ids per segment
+        for s in state["segments"]:
+            try:
+                seg = Segment(index_dir / s["file"])
+            except (OSError, ValueError):
+                continue
+            self.segments.append(seg)
+            self.dead.append(sorted(set(s["dead"])))
+        self.docs = sum(seg.n_docs - len(d) for seg, d in zip(self.segments, self.dead))
+        total = sum(sum(seg.doc_len.tolist()) - sum(seg.doc_len[i] for i in d)
+                    for seg, d in zip(self.segments, self.dead))
+        self.avgdl = total / self.docs if self.docs else 0.0
+        self._norms: List[Any] = [None] * len(self.segments)
+
+    def __enter__(self) -> "Searcher":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._norms = [None] * len(self.segments)
+        for seg in self.segments:
+            seg.close()
+        self.segments = []
+
+    def _norm(self, i: int) -> Any:
+        """K1 * (1 - B + B * length / avgdl) per document of segment ``i``."""
+        norms = self._norms[i]
+        if norms is None:
+            scale = B / self.avgdl if self.avgdl else 0.0
+            if self.vectorized:
+                lengths = np.frombuffer(self.segments[i].doc_len, dtype=np.uint32)
+                norms = K1 * (1 - B + scale * lengths.astype(np.float64))
+            else:
+                norms = [K1 * (1 - B + scale * n) for n in self.segments[i].doc_len.tolist()]
+            self._norms[i] = norms
+        return norms
+
+    def _live_postings(self, i: int, t: int) -> int:
+        """Postings of term ``t`` in segment ``i`` that belong to live documents."""
+        seg, dead = self.segments[i], self.dead[i]
+        a, b = seg.term_post[t], seg.term_post[t + 1]
+        if not dead:
+            return b - a
+        ids = seg.post_doc          # sorted within a term
+        return b - a - sum(1 for d in dead if (j := bisect_left(ids, d, a, b)) < b and ids[j] == d)
+
+    def _phrase_docs(self, i: int, phrase: List[Tuple[str, int]]) -> set:
+        seg = self.segments[i]
+        found = []
+        for term, offset in phrase:
+            t = seg.find(term)
+            if t < 0:
+                return set()
+            found.append((seg.term_post[t + 1] - seg.term_post[t], t, offset))
+        found.sort()        # rarest term first narrows the candidates fastest
+        maps = [(seg.positions_of(t), offset) for _, t, offset in found]
+        candidates = set(maps[0][0])
+        for m, _ in maps[1:]:
+            candidates &= m.keys()
+        out = set()
+        for d in candidates:
+            first, off0 = maps[0]
+            starts = {p - off0 for p in first[d]}
+            for m, off in maps[1:]:
+                starts &= {p - off for p in m[d]}
+                if not starts:
+                    break
+            if starts:
+                out.add(d)
+        return out
+
+    def _top(self, i: int, terms: List[Tuple[float, int]], k: int,
+             allowed: Optional[set]) -> List[Tuple[int, float]]:
+        """(document, score) of segment ``i``'s best ``k`` live documents, plus ties at the cut."""
+        seg, norm, dead = self.segments[i], self._norm(i), self.dead[i]
+        if self.vectorized:
+            acc = np.zeros(seg.n_docs)
+            for w, t in terms:
+                a, b = seg.term_post[t], seg.term_post[t + 1]
+                docs = np.frombuffer(seg.post_doc[a:b], dtype=np.uint32)
+                tf = np.frombuffer(seg.post_tf[a:b], dtype=np.uint32).astype(np.float64)
+                acc[docs] += w * tf / (tf + norm[docs])     # ids are unique within a term
+            if dead:
+                acc[dead] = 0.0
+            if allowed is not None:
+                keep = np.zeros(seg.n_docs, dtype=bool)
+                keep[list(allowed)] = True
+                acc[~keep] = 0.0
+            matched = np.flatnonzero(acc > 0)
+            if len(matched) > k:
+                cut = np.partition(acc[matched], len(matched) - k)[len(matched) - k]
+                matched = matched[acc[matched] >= cut]
+            return list(zip(matched.tolist(), acc[matched].tolist()))
+        scores: Dict[int, float] = {}
+        get = scores.get
+        for w, t in terms:
+            docs, tfs = seg.postings(t)
+            for d, tf in zip(docs, tfs):
+                scores[d] = get(d, 0.0) + w * tf / (tf + norm[d])
+        for d in dead:
+            scores.pop(d, None)
+        if allowed is not None:
+            scores = {d: v for d, v in scores.items() if d in allowed}
+        if len(scores) > k:
+            cut = heapq.nlargest(k, scores.values())[-1]
+            return [(d, v) for d, v in scores.items() if v >= cut]
+        return list(scores.items())
+
+    def search(self, query: str, k: int = 10) -> List[Hit]:
+        """Top ``k`` documents by BM25 for ``query`` (see ``parse_query``)."""
+        q = parse_query(query)
+        if not q.terms or not self.docs or k <= 0:
+            return []
+        allowed: List[Optional[set]] = [None] * len(self.segments)
+        if q.phrases:
+            for i in range(len(self.segments)):
+                docs = None
+                for phrase in q.phrases:
+                    found = self._phrase_docs(i, phrase)
+                    docs = found if docs is None else docs & found
+                allowed[i] = docs or set()
+
+        # Document frequencies span every segment; the weights then apply per segment.
+        weights: List[List[Tuple[float, int]]] = [[] for _ in self.segments]
+        for term in q.terms:
+            found, df = [], 0
+            for i, seg in enumerate(self.segments):
+                t = seg.find(term)
+                if t >= 0:
+                    df += self._live_postings(i, t)
+                    found.append((i, t))
+            if df:
+                w = math.log(1 + (self.docs - df + 0.5) / (df + 0.5)) * (K1 + 1)
+                for i, t in found:
+                    weights[i].append((w, t))
+        ranked = []
+        for i, terms in enumerate(weights):
+            if terms and (allowed[i] is None or allowed[i]):
+                ranked += [(-score, *self.segments[i].doc(d)) for d, score in self._top(i, terms, k, allowed[i])]
+        # Ties at the cut are broken by path, so the order does not depend on segment layout.
+        ranked.sort()
+        return [Hit(path, title, round(-neg, 4)) for neg, path, title in ranked[:k]]
+
+
+def search(query: str, k: int = 10, index_dir: Path = INDEX_DIR) -> List[Hit]:
+    """One-off query (opens and closes the index)."""
+    with Searcher(index_dir) as s:
+        return s.search(query, k)
+
+
+# ---------- CLI -------------------------------------------------------------
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Query the published-docs search index (docs/.search)")
+    parser.add_argument("query", nargs="*", help='words to rank by; "quoted phrases" must match as written')
+    parser.add_argument("-k", type=int, default=10, help="results to show")
+    parser.add_argument("--index", type=Path, default=INDEX_DIR, help="index directory")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="reindex every Markdown file in docs/.publish-manifest first")
+    parser.add_argument("--json", action="store_true", help="print hits as JSON lines")
+    args = parser.parse_args(argv)
+
+    if args.rebuild:
+        from .roles.publisher import Manifest
+        manifest = Manifest().load()
+        stats = update(published_markdown(manifest.files), index_dir=args.index, full=True)
+        print(f"indexed {stats.indexed} documents in {stats.seconds:.2f}s", file=sys.stderr)
+    if not args.query:
+        return 0
+    start = time.perf_counter()
+    with Searcher(args.index) as s:
+        hits = s.search(" ".join(args.query), args.k)
+        docs = s.docs
+    ms = 1000 * (time.perf_counter() - start)
+    for h in hits:
+        if args.json:
+            print(json.dumps({"path": h.path, "title": h.title, "score": h.score}))
+        else:
+            print(f"{h.score:8.3f}  {h.path}  {h.title}")
+    print(f"{len(hits)} hits from {docs} documents in {ms:.1f} ms", file=sys.stderr)
+    return 0 if hits else 1
+
+
+def published_markdown(files: Mapping[str, Mapping[str, Any]]) -> Dict[str, Optional[str]]:
+    """Markdown entries of a publish manifest: path -> sha256 (size/mtime when not hashed yet)."""
+    out: Dict[str, Optional[str]] = {}
+    for rel, entry in files.items():
+        if rel.endswith(".md"):
+            out[rel] = entry.get("sha256") or f"{entry.get('size')}:{entry.get('mtime_ns')}"
+    return out
+
+
+if __name__ == "__main__":
+    sys.exit(main())
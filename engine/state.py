@@ -0,0 +1,81 @@
+# engine/state.py
+"""Small persistent state kept between runs (fingerprints, caches)."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import unicodedata
+from pathlib import Path
+from typing import Any, Iterable
+
+BASE = Path(__file__).resolve().parents[1]
+CACHE_DIR = Path(os.getenv("ECE_CACHE_DIR") or BASE / "engine/cache")
+
+POLICY_DIRS = [BASE / "docs/governance", BASE / "engine/policies"]
+
+# Per-article fingerprints of the last published KB (written by publisher).
+KB_FINGERPRINTS = "kb-fingerprints.json"
+# Per-release fingerprints of the last published comms batch (written by publisher).
+COMMS_FINGERPRINTS = "comms-releases.json"
+
+
+def digest(*parts: Any) -> str:
+    """Stable SHA-256 over JSON-serializable parts."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def files_digest(paths: Iterable[Path]) -> str:
+    """SHA-256 over the names and bytes of the existing ``paths``."""
+    h = hashlib.sha256()
+    for p in sorted(paths):
+        if p.is_file():
+            h.update(str(p.relative_to(BASE) if p.is_relative_to(BASE) else p).encode("utf-8"))
+            h.update(p.read_bytes())
+    return h.hexdigest()
+
+
+def file_digest(path: Path, block: int = 1 << 20) -> str:
+    """SHA-256 of one file's bytes, read ``block`` bytes at a time."""
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def slug(text: str, default: str = "") -> str:
+    """Lowercase ASCII ``a-z0-9`` words joined by ``-``; ``default`` when nothing is left."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or default
+
+
+def policy_digest() -> str:
+    """Fingerprint of every governance/engine policy file."""
+    return files_digest(p for d in POLICY_DIRS if d.exists() for p in d.glob("*.yml"))
+
+
+def load_json(name: str, default: Any = None) -> Any:
+    path = CACHE_DIR / name
+    if not path.exists():
+        return default
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        # A torn or hand-edited cache only costs a rebuild.
+        return default
+
+
+def save_json(name: str, data: Any) -> None:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", delete=False, dir=str(CACHE_DIR)) as tf:
+        # dumps, not dump: only the one-shot encoder runs in C.
+        tf.write(json.dumps(data, sort_keys=True, ensure_ascii=False))
+        tmp_name = tf.name
+    Path(tmp_name).replace(CACHE_DIR / name)
@@ -0,0 +1,60 @@
+# engine/stream.py
+"""Single-pass artifact stream threaded through roles (ECE_STREAM_KB=1).
+
+The writer creates the stream, each downstream role wraps it with a per-item
+stage, and the publisher finally pulls articles through all stages one at a
+time. Roles report problems into ``errors``/``notes`` instead of raising, so
+the consumer can fail the run before anything is committed.
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+Item = Tuple[str, Any]   # (file name, Artifact)
+
+
+def streaming_enabled() -> bool:
+    return os.getenv("ECE_STREAM_KB", "0") == "1"
+
+
+class ArtifactStream:
+    def __init__(self, items: Iterable[Item]):
+        self._it: Iterator[Item] = iter(items)
+        self.stages: List[str] = []
+        self.errors: List[str] = []
+        self.notes: List[str] = []
+        self.count = 0
+        self.consumed = False
+        self._on_complete: List[Callable[[], None]] = []
+
+    def map(self, stage: str, fn: Callable[[str, Any], Any]) -> "ArtifactStream":
+        """Lazily apply ``fn(name, content) -> content`` to every item."""
+        upstream = self._it
+        self._it = ((name, fn(name, content)) for name, content in upstream)
+        self.stages.append(stage)
+        return self
+
+    def on_complete(self, fn: Callable[[], None]) -> None:
+        """Run ``fn`` once every item has passed through all stages."""
+        self._on_complete.append(fn)
+
+    def __iter__(self) -> Iterator[Item]:
+        if self.consumed:
+            raise RuntimeError("artifact stream already consumed")
+        self.consumed = True
+        for item in self._it:
+            self.count += 1
+            yield item
+        for fn in self._on_complete:
+            fn()
+
+    def raise_errors(self) -> None:
+        if self.errors:
+            raise ValueError("; ".join(self.errors))
+
+    def drain(self) -> Dict[str, Any]:
+        """Materialize the stream (when no publisher pulls it) and fail on errors."""
+        out = dict(self)
+        self.raise_errors()
+        return out
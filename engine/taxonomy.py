@@ -0,0 +1,175 @@
+# engine/taxonomy.py
+"""Compiled support-signal taxonomy (topics, errors, causes, resolutions).
+
+The taxonomy lives in ``topics.yml``. Every entry is a list of literal
+phrases (matched case-insensitively on word boundaries) or regular
+expressions prefixed with ``re:``. All literal phrases of all categories are
+folded into one trie-shaped alternation and all regex entries into one
+alternation of named groups, so classifying a text costs one pass per
+alternation and grows only with phrase length, not with the topic count.
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+BASE = Path(__file__).resolve().parents[1]
+TOPIC_PATHS = [
+    BASE / "docs/governance/topics.yml",
+    BASE / "engine/policies/topics.yml",
+]
+
+CATEGORIES = ("topics", "errors", "causes", "resolutions")
+REGEX_PREFIX = "re:"
+
+
+@dataclass
+class Hits:
+    """Entry indices hit by one scan, per category."""
+    topics: Set[int] = field(default_factory=set)
+    causes: Set[int] = field(default_factory=set)
+    resolutions: Set[int] = field(default_factory=set)
+    errors: List[int] = field(default_factory=list)  # start offsets, ascending
+    text: str = ""                                    # the (lowercased) text scanned
+
+    def error_lines(self) -> Set[int]:
+        """Map error offsets to ``splitlines()`` indices of the scanned text."""
+        if not self.errors:
+            return set()
+        starts, pos = [], 0
+        for ln in self.text.splitlines(keepends=True):
+            starts.append(pos)
+            pos += len(ln)
+        return {bisect.bisect_right(starts, off) - 1 for off in self.errors}
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """Build a prefix-factored alternation; greedy, so the longest phrase wins."""
+    trie: Dict[str, Any] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, Any]) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+class Taxonomy:
+    """Support taxonomy compiled into (at most) two scanners."""
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.labels: Dict[str, List[str]] = {c: [] for c in CATEGORIES}
+        literals: Dict[str, List[Tuple[str, int]]] = {}
+        regexes: List[Tuple[str, str, int]] = []
+
+        for cat, label, patterns in self._entries(spec or {}):
+            idx = len(self.labels[cat])
+            self.labels[cat].append(label)
+            for pat in patterns:
+                if pat.startswith(REGEX_PREFIX):
+                    regexes.append((pat[len(REGEX_PREFIX):], cat, idx))
+                elif pat.strip():
+                    literals.setdefault(pat.strip().lower(), []).append((cat, idx))
+
+        # A greedy match at one offset hides shorter phrases starting there,
+        # so each phrase also carries the hits of its word-bounded prefixes.
+        self._literal_hits: Dict[str, List[Tuple[str, int]]] = {}
+        for phrase in literals:
+            hits = list(literals[phrase])
+            for other, more in literals.items():
+                if other != phrase and phrase.startswith(other) and re.match(re.escape(other) + r"\b", phrase):
+                    hits.extend(more)
+            self._literal_hits[phrase] = hits
+
+        # Literals run over lowercased text; a zero-width lookahead reports
+        # overlapping phrases. At most one regex entry is reported per offset.
+        self._literal_rx = (
+            re.compile(rf"(?=\b({trie_pattern(literals)})\b)") if literals else None
+        )
+        self._regex_groups: Dict[str, Tuple[str, int]] = {}
+        parts: List[str] = []
+        for n, (pat, cat, idx) in enumerate(regexes):
+            name = f"r{n}"
+            self._regex_groups[name] = (cat, idx)
+            parts.append(f"(?P<{name}>{pat})")
+        self._regex_rx = re.compile("|".join(parts), re.IGNORECASE) if parts else None
+
+    @staticmethod
+    def _entries(spec: Dict[str, Any]) -> Iterable[Tuple[str, str, List[str]]]:
+        for topic, patterns in (spec.get("topics") or {}).items():
+            yield "topics", str(topic), [str(p) for p in patterns or []]
+        for pat in spec.get("errors") or []:
+            yield "errors", str(pat), [str(pat)]
+        for cat in ("causes", "resolutions"):
+            for entry in spec.get(cat) or []:
+                yield cat, str(entry["text"]), [str(p) for p in entry.get("match") or []]
+
+    def _add(self, hits: Hits, cat: str, idx: int, offset: int) -> None:
+        if cat == "errors":
+            hits.errors.append(offset)
+        else:
+            getattr(hits, cat).add(idx)
+
+    def scan(self, text: str) -> Hits:
+        """Return every topic, error, cause and resolution hit in ``text``."""
+        hits = Hits()
+        if not text:
+            return hits
+        text = hits.text = text.lower()
+        if self._literal_rx is not None:
+            for m in self._literal_rx.finditer(text):
+                for cat, idx in self._literal_hits[m.group(1)]:
+                    self._add(hits, cat, idx, m.start())
+        if self._regex_rx is not None:
+            # Resume one char past each start so a long match cannot hide others.
+            m = self._regex_rx.search(text)
+            while m is not None:
+                cat, idx = self._regex_groups[m.lastgroup]
+                self._add(hits, cat, idx, m.start())
+                m = self._regex_rx.search(text, m.start() + 1)
+        hits.errors.sort()
+        return hits
+
+    def label_list(self, category: str, indices: Iterable[int]) -> List[str]:
+        """Labels for ``indices`` in taxonomy order."""
+        names = self.labels[category]
+        return [names[i] for i in sorted(indices)]
+
+    def infer_topic(self, text: str) -> Optional[str]:
+        """First configured topic with any hit, or None."""
+        found = self.scan(text).topics
+        return self.labels["topics"][min(found)] if found else None
+
+    def is_error(self, line: str) -> bool:
+        return bool(line.strip()) and bool(self.scan(line).errors)
+
+
+def _load_spec() -> Dict[str, Any]:
+    for p in TOPIC_PATHS:
+        if p.exists():
+            text = p.read_text(encoding="utf-8")
+            try:
+                import yaml  # optional
+                return yaml.safe_load(text) or {}
+            except ImportError:
+                return json.loads(text)
+    return {}
+
+
+@lru_cache(maxsize=1)
+def load_taxonomy() -> Taxonomy:
+    """Compile the taxonomy once per process."""
+    return Taxonomy(_load_spec())
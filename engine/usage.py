@@ -0,0 +1,574 @@
+# engine/usage.py
+"""Streaming aggregation of product usage events into evidence metrics.
+
+Event exports live in ``intake/usage/`` as JSON Lines or CSV, optionally
+gzipped (``*.jsonl``, ``*.csv``, ``*.jsonl.gz``, ``*.csv.gz``). Every event
+has a ``user`` and an ``event`` name. ``variant`` (the user's A/B arm) and
+``tag`` (the ticket tag of a ``ticketCreated`` event) are optional.
+
+Only the events a metric needs are tracked. These are the tooltips' ``measure``
+events, the walkthrough steps' ``success_criteria`` and ``ticketCreated`` for
+each ticket tag in ``feedback.csv``. Other lines are counted and skipped. JSON
+Lines are read in large blocks, and a regex over each block finds the tracked
+``"event"`` values, so skipped lines never reach Python. The ``user`` of every
+line is still collected (per block, also in C), so users who never emit a
+tracked event are counted too: they are the bulk of the deflection baseline.
+
+Each user is reduced to a bitmask of the tracked events they emitted, plus
+the first variant seen, so memory grows with users and not with events. Events
+are buffered ``CHUNK_EVENTS`` at a time and folded into the masks with NumPy
+(``bitwise_or.at``) when it is installed and at most 64 events are tracked,
+and with Python ints otherwise. Several exports are read on a process pool and
+the per-file masks are OR-merged by user.
+
+Exports are treated as shards that only accumulate (one per night, say).
+With ``incremental=True`` the merged masks are kept in the cache together
+with the SHA-256 of every export folded into them, and the next run reads
+only the exports it has not seen. If a known export changed or disappeared,
+or the tracked events changed, everything is read again, because an OR
+cannot be undone.
+
+From the masks:
+
+* walkthrough funnel: users who completed steps 1..k of a flow;
+* tooltip conversion: users who emitted the tooltip's ``event`` and its
+  ``success_criteria``, per variant (the tooltip's own variant when the
+  events carry none);
+* ticket deflection: for each ``ticket_tag`` in ``feedback.csv``, the ticket
+  rate among users who converted on a tooltip of a matching feature, against
+  the rate among every other user in the exports (whatever events they
+  emitted).
+"""
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, IO, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+try:  # optional: vectorized aggregation
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised where NumPy is absent
+    np = None
+
+from .state import file_digest, load_json, save_json, slug
+
+BASE = Path(__file__).resolve().parents[1]
+USAGE_DIR = BASE / "intake/usage"
+PATTERNS = ("*.jsonl", "*.jsonl.gz", "*.csv", "*.csv.gz")
+TICKET_EVENT = "ticketCreated"
+CHUNK_EVENTS = 1 << 20      # events buffered before they are folded into the masks
+BLOCK_BYTES = 1 << 24       # JSON Lines are scanned this many bytes at a time
+NUMPY_MAX_EVENTS = 64       # one uint64 mask per user
+SHARDS = "usage-shards.json"    # merged masks and the exports folded into them
+USAGE_VERSION = 2
+
+_USERS = re.compile(rb'"user"\s*:\s*("[^"\\]*"|-?[0-9][0-9.eE+-]*)')   # quotes kept
+_FIELDS = re.compile(rb'"(user|variant|tag)"\s*:\s*(?:"([^"\\]*)"|(-?[0-9][0-9.eE+-]*))')
+
+
+def event_files(directory: Path = USAGE_DIR) -> List[Path]:
+    if not directory.is_dir():
+        return []
+    return sorted({p for pattern in PATTERNS for p in directory.glob(pattern)})
+
+
+def _rel(path: Path) -> str:
+    return str(path.relative_to(BASE)) if path.is_relative_to(BASE) else str(path)
+
+
+# ---------- plan ------------------------------------------------------------
+
+@dataclass
+class Plan:
+    """What to measure: flows, tooltips and ticket tags, and the events they need."""
+    flows: List[Tuple[str, List[Tuple[str, str]]]] = field(default_factory=list)   # flow -> [(step, event)]
+    tooltips: List[Dict[str, str]] = field(default_factory=list)    # id, feature, variant, event, success
+    tickets: List[Tuple[str, int]] = field(default_factory=list)    # (ticket_tag, feedback tickets)
+    events: List[str] = field(default_factory=list)                 # tracked keys, bit i = events[i]
+
+    @classmethod
+    def from_guidance(cls, tooltips: Iterable[Mapping[str, Any]], flows: Iterable[Mapping[str, Any]],
+                      feedback: Iterable[Mapping[str, Any]]) -> "Plan":
+        plan = cls()
+        for f in flows:
+            steps = [(str(s.get("id")), str(s["success_criteria"]))
+                     for s in f.get("steps") or [] if s.get("success_criteria")]
+            if steps:
+                plan.flows.append((str(f.get("flow_id")), steps))
+        for t in tooltips:
+            m = t.get("measure") or {}
+            if m.get("event") and m.get("success_criteria"):
+                plan.tooltips.append({"id": str(t.get("id")), "feature": str(t.get("feature") or ""),
+                                      "variant": str(t.get("variant") or "-"),
+                                      "event": str(m["event"]), "success": str(m["success_criteria"])})
+        tickets: Dict[str, int] = {}
+        for row in feedback:
+            tag = str(row.get("ticket_tag") or "").strip()
+            if tag:
+                try:
+                    n = int(row.get("frequency") or 0)
+                except ValueError:
+                    n = 0
+                tickets[tag] = tickets.get(tag, 0) + n
+        plan.tickets = sorted(tickets.items())
+
+        keys: Dict[str, None] = {}
+        for _, steps in plan.flows:
+            keys.update((e, None) for _, e in steps)
+        for t in plan.tooltips:
+            keys.update({t["event"]: None, t["success"]: None})
+        keys.update((f"{TICKET_EVENT}:{tag}", None) for tag, _ in plan.tickets)
+        plan.events = list(keys)
+        return plan
+
+    def bits(self, *keys: str) -> int:
+        out = 0
+        for k in keys:
+            out |= 1 << self.events.index(k)
+        return out
+
+
+# ---------- reading ---------------------------------------------------------
+
+def _open(path: Path) -> IO[bytes]:
+    return gzip.open(path, "rb") if path.suffix == ".gz" else path.open("rb")
+
+
+Event = Tuple[str, str, str, str]     # (user, event, variant, tag)
+
+
+def _blocks(f: IO[bytes]) -> Iterator[bytes]:
+    """``f`` in ~``BLOCK_BYTES`` pieces that end on a line boundary."""
+    tail = b""
+    while True:
+        chunk = f.read(BLOCK_BYTES)
+        if not chunk:
+            break
+        chunk = tail + chunk
+        cut = chunk.rfind(b"\n") + 1
+        tail = chunk[cut:]
+        if cut:
+            yield chunk[:cut]
+    if tail:
+        yield tail + b"\n"
+
+
+def _user_names(raw: Iterable[bytes]) -> Iterator[str]:
+    return ((u[1:-1] if u[:1] == b'"' else u).decode("utf-8") for u in raw)
+
+
+def _read_jsonl(f: IO[bytes], wanted: frozenset, seen: List[int], everyone: set) -> Iterator[Event]:
+    raw_users: set = set()      # raw values, decoded once at the end
+    if not wanted:
+        for block in _blocks(f):
+            seen[0] += block.count(b"\n")
+            raw_users.update(_USERS.findall(block))
+        everyone.update(_user_names(raw_users))
+        return
+    # Tracked events are found per block in C; only their lines reach Python.
+    names = b"|".join(re.escape(e.encode("utf-8")) for e in sorted(wanted))
+    event_rx = re.compile(rb'"event"\s*:\s*"(' + names + rb')"')
+    for block in _blocks(f):
+        seen[0] += block.count(b"\n")
+        raw_users.update(_USERS.findall(block))
+        rfind, find, last = block.rfind, block.find, -1
+        for m in event_rx.finditer(block):
+            start = rfind(b"\n", 0, m.start()) + 1
+            if start == last:
+                continue                    # a second match on the same line
+            last = start
+            raw = block[start:find(b"\n", m.end())]
+            if b"\\" not in raw and raw.count(b"{") == 1:
+                # Flat line without escapes: pull the few fields out directly.
+                fields = {k: (q or n).decode("utf-8") for k, q, n in _FIELDS.findall(raw)}
+                yield fields.get(b"user", ""), m.group(1).decode("utf-8"), \
+                    fields.get(b"variant", ""), fields.get(b"tag", "")
+                continue
+            try:
+                ev = json.loads(raw)
+            except ValueError:
+                continue
+            if isinstance(ev, dict) and str(ev.get("event") or "") in wanted:
+                yield str(ev.get("user") or ""), str(ev.get("event") or ""), \
+                    str(ev.get("variant") or ""), str(ev.get("tag") or "")
+    everyone.update(_user_names(raw_users))
+
+
+def _read_csv(f: IO[bytes], wanted: frozenset, seen: List[int], everyone: set) -> Iterator[Event]:
+    rows = csv.reader(io.TextIOWrapper(f, encoding="utf-8", newline=""))
+    header = next(rows, None) or []
+    col = {name.strip(): i for i, name in enumerate(header)}
+    if "user" not in col or "event" not in col:
+        return
+    iu, ie, iv, it = col["user"], col["event"], col.get("variant"), col.get("tag")
+    for row in rows:
+        seen[0] += 1
+        if len(row) <= max(iu, ie):
+            continue
+        everyone.add(row[iu])
+        event = row[ie]
+        if event not in wanted:
+            continue
+        yield (row[iu], event,
+               row[iv] if iv is not None and iv < len(row) else "",
+               row[it] if it is not None and it < len(row) else "")
+
+
+def read_events(path: Path, wanted: frozenset, seen: List[int],
+                everyone: Optional[set] = None) -> Iterator[Event]:
+    """Events named in ``wanted`` from one export.
+
+    ``seen[0]`` counts every line read and ``everyone`` collects the user of
+    every line, tracked or not.
+    """
+    name = path.name[:-3] if path.suffix == ".gz" else path.name
+    reader = _read_csv if name.endswith(".csv") else _read_jsonl
+    with _open(path) as f:
+        yield from reader(f, wanted, seen, set() if everyone is None else everyone)
+
+
+# ---------- aggregation -----------------------------------------------------
+
+class _Masks:
+    """Per-user event bitmask and first variant code, grown as users appear."""
+
+    def __init__(self, vectorized: bool):
+        self.vectorized = vectorized
+        self.users: Dict[str, int] = {}
+        self.variants: Dict[str, int] = {"": 0}
+        self.n = 0
+        if vectorized:
+            self.mask = np.zeros(1024, dtype=np.uint64)
+            self.var = np.zeros(1024, dtype=np.uint16)
+        else:
+            self.mask: Any = []
+            self.var: Any = []
+        self._buf: Tuple[List[int], List[int], List[int]] = ([], [], [])
+
+    def user(self, name: str) -> int:
+        u = self.users.get(name)
+        if u is None:
+            u = self.users[name] = len(self.users)
+        return u
+
+    def variant(self, name: str) -> int:
+        v = self.variants.get(name)
+        if v is None:
+            v = self.variants[name] = len(self.variants)
+        return v
+
+    def add(self, u: int, bits: int, v: int) -> None:
+        iu, ib, iv = self._buf
+        iu.append(u)
+        ib.append(bits)
+        iv.append(v)
+        if len(iu) >= CHUNK_EVENTS:
+            self.flush()
+
+    def flush(self) -> None:
+        iu, ib, iv = self._buf
+        self._buf = ([], [], [])
+        n = len(self.users)
+        if self.vectorized:
+            if n > len(self.mask):
+                size = max(n, 2 * len(self.mask))
+                self.mask = np.concatenate([self.mask, np.zeros(size - len(self.mask), dtype=np.uint64)])
+                self.var = np.concatenate([self.var, np.zeros(size - len(self.var), dtype=np.uint16)])
+            self.n = n
+            if not iu:
+                return
+            idx = np.asarray(iu, dtype=np.int64)
+            np.bitwise_or.at(self.mask, idx, np.asarray(ib, dtype=np.uint64))
+            codes = np.asarray(iv, dtype=np.uint16)
+            tagged = codes > 0
+            if tagged.any():
+                # First variant per user in this chunk, kept only where none is known yet.
+                users, first = np.unique(idx[tagged], return_index=True)
+                fresh = self.var[users] == 0
+                self.var[users[fresh]] = codes[tagged][first][fresh]
+        else:
+            grow = n - len(self.mask)
+            if grow > 0:
+                self.mask.extend([0] * grow)
+                self.var.extend([0] * grow)
+            self.n = n
+            mask, var = self.mask, self.var
+            for u, b, v in zip(iu, ib, iv):
+                mask[u] |= b
+                if v and not var[u]:
+                    var[u] = v
+
+    def export(self) -> Tuple[List[str], Any, Any, List[str]]:
+        """(user names, masks, variant codes, variant names) for merging across processes."""
+        self.flush()
+        names = list(self.users)
+        variants = list(self.variants)
+        if self.vectorized:
+            return names, self.mask[:self.n].copy(), self.var[:self.n].copy(), variants
+        return names, list(self.mask), list(self.var), variants
+
+    def merge(self, names: List[str], mask: Any, var: Any, variants: List[str]) -> None:
+        remap = [self.variant(v) for v in variants]
+        idx = [self.user(n) for n in names]
+        self.flush()            # sizes the arrays for the new users
+        if self.vectorized:
+            at = np.asarray(idx, dtype=np.int64)
+            np.bitwise_or.at(self.mask, at, np.asarray(mask, dtype=np.uint64))
+            codes = np.asarray(remap, dtype=np.uint16)[np.asarray(var, dtype=np.int64)]
+            fresh = (self.var[at] == 0) & (codes > 0)
+            self.var[at[fresh]] = codes[fresh]
+        else:
+            for u, m, v in zip(idx, mask, var):
+                self.mask[u] |= int(m)
+                if v and not self.var[u]:
+                    self.var[u] = remap[int(v)]
+
+    def histogram(self) -> List[Tuple[int, int, int]]:
+        """(mask, variant code, users) for every distinct combination.
+
+        Users with the same events and variant are interchangeable for every
+        metric, and there are few distinct combinations, so the metrics are
+        counted over this instead of per user.
+        """
+        self.flush()
+        if self.vectorized:
+            pairs = np.stack([self.mask[:self.n], self.var[:self.n].astype(np.uint64)], axis=1)
+            keys, counts = np.unique(pairs, axis=0, return_counts=True)
+            return [(int(m), int(v), int(c)) for (m, v), c in zip(keys.tolist(), counts.tolist())]
+        return sorted((m, v, c) for (m, v), c in Counter(zip(self.mask, self.var)).items())
+
+
+def _scan_file(job: Tuple[str, List[str], bool]) -> Tuple[int, int, Tuple[List[str], Any, Any, List[str]]]:
+    """Aggregate one export (process-pool worker); returns (lines, tracked events, masks)."""
+    path, keys, vectorized = job
+    masks, seen, kept = _scan(Path(path), keys, _Masks(vectorized))
+    return seen, kept, masks.export()
+
+
+def _scan(path: Path, keys: List[str], masks: _Masks) -> Tuple[_Masks, int, int]:
+    bit = {k: 1 << i for i, k in enumerate(keys)}
+    wanted = frozenset(k.split(":", 1)[0] if k.startswith(TICKET_EVENT + ":") else k for k in keys)
+    seen, kept, everyone = [0], 0, set()
+    user_of, variant_of, add = masks.user, masks.variant, masks.add
+    for user, event, variant, tag in read_events(path, wanted, seen, everyone):
+        b = bit.get(f"{event}:{tag}" if event == TICKET_EVENT else event)
+        if b is None or not user:
+            continue
+        add(user_of(user), b, variant_of(variant) if variant else 0)
+        kept += 1
+    # Users without a tracked event join with an empty mask.
+    for user in everyone:
+        if user:
+            user_of(user)
+    masks.flush()
+    return masks, seen[0], kept
+
+
+def _usage_workers(n_files: int) -> int:
+    raw = os.getenv("ECE_USAGE_WORKERS", "").strip()
+    if raw:
+        return max(int(raw), 1)
+    return min(4, os.cpu_count() or 1, n_files) if n_files > 1 else 1
+
+
+# ---------- report ----------------------------------------------------------
+
+@dataclass
+class UsageReport:
+    files: List[str] = field(default_factory=list)
+    events: int = 0                 # lines read
+    tracked: int = 0                # events folded into the masks
+    users: int = 0                  # every user in the exports, tracked events or not
+    backend: str = "bitset"
+    reused: int = 0                 # exports taken from the shard cache
+    funnels: List[Dict[str, Any]] = field(default_factory=list)
+    conversion: List[Dict[str, Any]] = field(default_factory=list)
+    deflection: List[Dict[str, Any]] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"files": self.files, "events": self.events, "tracked": self.tracked, "users": self.users,
+                "backend": self.backend, "reused": self.reused, "funnels": self.funnels,
+                "conversion": self.conversion, "deflection": self.deflection}
+
+    def to_markdown(self, today: str, top_queries: Sequence[Mapping[str, Any]] = (),
+                    experiments: Sequence[str] = ()) -> str:
+        """The metrics page; ``experiments`` are Markdown lines placed after the conversion table."""
+        def pct(a: int, b: int) -> str:
+            return f"{100.0 * a / b:.1f}%" if b else "–"
+
+        out = [
+            "---",
+            "title: Portfolio metrics",
+            "owner: docs-team",
+            "status: active",
+            "tags: [metrics]",
+            f"last_reviewed: {today}",
+            "---",
+        ]
+        if not self.files:
+            out += ["No usage exports found in `intake/usage/`; product metrics are not available.", ""]
+        else:
+            out += [f"Usage: {self.events:,} events from {self.users:,} users in {len(self.files)} "
+                    f"export(s); {self.tracked:,} tracked events.", ""]
+        for f in self.funnels:
+            out += [f"## Walkthrough funnel — {f['flow']}", "",
+                    "| Step | Success event | Users | Of previous step | Of step 1 |",
+                    "|------|---------------|-------|------------------|-----------|"]
+            first = f["steps"][0]["users"] if f["steps"] else 0
+            prev = None
+            for s in f["steps"]:
+                out.append(f"| {s['step']} | `{s['event']}` | {s['users']:,} | "
+                           f"{pct(s['users'], prev) if prev is not None else '–'} | {pct(s['users'], first)} |")
+                prev = s["users"]
+            out.append("")
+        if self.conversion:
+            out += ["## Tooltip conversion", "",
+                    "| Tooltip | Variant | Exposed | Converted | Conversion |",
+                    "|---------|---------|---------|-----------|------------|"]
+            for c in self.conversion:
+                out.append(f"| {c['tooltip']} | {c['variant']} | {c['exposed']:,} | {c['converted']:,} | "
+                           f"{pct(c['converted'], c['exposed'])} |")
+            out.append("")
+        out += experiments
+        if self.deflection:
+            out += ["## Ticket deflection (estimate)", "",
+                    "| Ticket tag | Feedback tickets | Guided users | Ticket rate (guided) "
+                    "| Ticket rate (others) | Deflection | Tickets avoided |",
+                    "|------------|------------------|--------------|----------------------"
+                    "|----------------------|------------|-----------------|"]
+            for d in self.deflection:
+                rate = f"{100.0 * d['deflection']:.1f}%" if d["deflection"] is not None else "–"
+                out.append(f"| {d['tag']} | {d['feedback_tickets']:,} | {d['guided_users']:,} | "
+                           f"{pct(d['guided_tickets'], d['guided_users'])} | "
+                           f"{pct(d['other_tickets'], d['other_users'])} | {rate} | "
+                           f"{d['tickets_avoided'] if d['tickets_avoided'] is not None else '–'} |")
+            out += ["", "Guided users converted on a tooltip of a matching feature; others are every "
+                        "other user in the usage exports, with or without tracked events. Deflection "
+                        "is 1 − guided rate / others' rate. Tickets avoided applies it to the feedback "
+                        "volume for that tag.", ""]
+        if top_queries:
+            out += ["## Top support queries", "", "| Query | Frequency |", "|-------|-----------|"]
+            out += [f"| {q.get('query')} | {q.get('frequency')} |" for q in top_queries]
+            out.append("")
+        out.append("Source: intake/usage/, intake/support/feedback.csv")
+        return "\n".join(out) + "\n"
+
+
+def _load_shards(plan: Plan, digests: Mapping[str, str]) -> Optional[Dict[str, Any]]:
+    """The cached masks if every export folded into them is unchanged, else None."""
+    cached = load_json(SHARDS, {}) or {}
+    if cached.get("version") != USAGE_VERSION or cached.get("events") != plan.events:
+        return None
+    files = cached.get("files")
+    if not isinstance(files, dict) or not files or not isinstance(cached.get("masks"), list):
+        return None
+    if any(digests.get(name) != entry.get("sha256") for name, entry in files.items()):
+        return None
+    return cached
+
+
+def aggregate(paths: Sequence[Path], plan: Plan, vectorized: Optional[bool] = None,
+              workers: Optional[int] = None, incremental: bool = False) -> UsageReport:
+    """Stream ``paths`` and compute the plan's funnels, conversions and deflection.
+
+    ``incremental`` starts from the cached masks and reads only new exports
+    (see the module docstring) and saves them again after reading any.
+    """
+    use_numpy = (np is not None and len(plan.events) <= NUMPY_MAX_EVENTS) if vectorized is None else vectorized
+    masks = _Masks(use_numpy)
+    report = UsageReport(files=[_rel(p) for p in paths], backend="numpy" if use_numpy else "bitset")
+    digests = {_rel(p): file_digest(p) for p in paths} if incremental else {}
+    shards: Dict[str, Dict[str, Any]] = {}
+    todo = list(paths)
+    cached = _load_shards(plan, digests) if incremental and plan.events else None
+    if cached is not None:
+        masks.merge(*cached["masks"])
+        shards = cached["files"]
+        for entry in shards.values():
+            report.events += int(entry.get("events", 0))
+            report.tracked += int(entry.get("tracked", 0))
+        report.reused = len(shards)
+        todo = [p for p in paths if _rel(p) not in shards]
+
+    def folded(path: Path, seen: int, kept: int) -> None:
+        report.events += seen
+        report.tracked += kept
+        if incremental:
+            shards[_rel(path)] = {"sha256": digests[_rel(path)], "events": seen, "tracked": kept}
+
+    workers = _usage_workers(len(todo)) if workers is None else workers
+    if plan.events and todo:
+        if workers > 1 and len(todo) > 1:
+            jobs = [(str(p), plan.events, use_numpy) for p in todo]
+            with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+                for p, (seen, kept, part) in zip(todo, pool.map(_scan_file, jobs)):
+                    folded(p, seen, kept)
+                    masks.merge(*part)
+        else:
+            for p in todo:
+                _, seen, kept = _scan(p, plan.events, masks)
+                folded(p, seen, kept)
+        if incremental:
+            names, mask, var, variants = masks.export()
+            if use_numpy:
+                mask, var = mask.tolist(), var.tolist()
+            save_json(SHARDS, {"version": USAGE_VERSION, "events": plan.events, "files": shards,
+                               "masks": [names, mask, var, variants]})
+    hist = masks.histogram()
+    report.users = masks.n
+    if not hist:
+        return report
+
+    def users(pred) -> int:
+        return sum(c for m, v, c in hist if pred(m, v))
+
+    for flow, steps in plan.flows:
+        rows, need = [], 0
+        for step, event in steps:
+            need |= plan.bits(event)
+            rows.append({"step": step, "event": event,
+                         "users": users(lambda m, v, need=need: m & need == need)})
+        report.funnels.append({"flow": flow, "steps": rows})
+
+    names = {code: name for name, code in masks.variants.items()}
+    for t in plan.tooltips:
+        exposed, both = plan.bits(t["event"]), plan.bits(t["event"], t["success"])
+        arms: Dict[str, List[int]] = {}
+        for m, v, c in hist:
+            if m & exposed:
+                # Users without a recorded variant count under the tooltip's own variant.
+                arm = arms.setdefault(names[v] if v else t["variant"], [0, 0])
+                arm[0] += c
+                arm[1] += c if m & both == both else 0
+        for name, (n_exposed, n_converted) in sorted(arms.items()) or [(t["variant"], (0, 0))]:
+            report.conversion.append({"tooltip": t["id"], "variant": name,
+                                      "exposed": n_exposed, "converted": n_converted})
+
+    converted = {t["id"]: plan.bits(t["event"], t["success"]) for t in plan.tooltips}
+    for tag, tickets in plan.tickets:
+        related = [t["id"] for t in plan.tooltips if tag.lower() in slug(t["feature"]).split("-")]
+        needs = [converted[tid] for tid in related]
+        ticket = plan.bits(f"{TICKET_EVENT}:{tag}")
+        g = gt = o = ot = 0
+        for m, v, c in hist:
+            opened = c if m & ticket else 0
+            if any(m & need == need for need in needs):
+                g, gt = g + c, gt + opened
+            else:
+                o, ot = o + c, ot + opened
+        deflection = (1.0 - (gt / g) / (ot / o)) if g and o and ot else None
+        report.deflection.append({
+            "tag": tag, "feedback_tickets": tickets, "tooltips": related,
+            "guided_users": g, "guided_tickets": gt, "other_users": o, "other_tickets": ot,
+            "deflection": round(deflection, 4) if deflection is not None else None,
+            "tickets_avoided": round(tickets * deflection) if deflection is not None else None,
+        })
+    return report
@@ -0,0 +1,83 @@
+# engine/verdicts.py
+"""Persistent per-artifact verdicts for the checking roles.
+
+A verdict is whatever a role concluded about one artifact (notes, errors,
+findings), stored as JSON under a key derived from
+
+    (role version, policy digest, item name, artifact hash)
+
+so an unchanged document under unchanged policies is answered from the cache,
+while any edit to the text, ``compliance.yml``/``risk.yml`` or the checking
+code (bump the role's ``VERDICT_VERSION``) simply misses. Each entry carries the
+date it was last used. Saving merges this run's verdicts into the stored
+table, so packets that check different artifacts (tech-release, kb-update)
+keep each other's verdicts, and drops entries unused for
+``ECE_VERDICT_MAX_AGE_DAYS`` days. Set ``ECE_VERDICT_CACHE=0`` to always
+re-check.
+"""
+from __future__ import annotations
+
+import datetime
+import os
+from typing import Any, Dict, List, Optional
+
+from .state import digest, load_json, save_json
+
+VERDICTS_VERSION = 2    # file layout: {"version", "entries": {key: [last used, verdict]}}
+MAX_AGE_DAYS = int(os.getenv("ECE_VERDICT_MAX_AGE_DAYS", "30"))
+
+
+def verdict_cache_enabled() -> bool:
+    return os.getenv("ECE_VERDICT_CACHE", "1") != "0"
+
+
+class VerdictCache:
+    def __init__(self, name: str, policy: str, version: int):
+        self.name = name
+        self._salt = digest(version, policy)
+        self._table: Dict[str, List[Any]] = {}     # key -> [last used (ISO date), verdict]
+        self._seen: Dict[str, Any] = {}
+        self._dirty = False
+        self.stats = {"hits": 0, "misses": 0}
+
+    def key(self, label: str, content_hash: str) -> str:
+        return digest(self._salt, label, content_hash)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._table.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self._seen[key] = entry[1]
+        return entry[1]
+
+    def put(self, key: str, verdict: Any) -> None:
+        self._seen[key] = verdict
+        self._dirty = True
+
+    def load(self) -> "VerdictCache":
+        data = load_json(self.name, {})
+        if isinstance(data, dict) and data.get("version") == VERDICTS_VERSION:
+            entries = data.get("entries")
+            if isinstance(entries, dict):
+                self._table = {k: v for k, v in entries.items() if isinstance(v, list) and len(v) == 2}
+        return self
+
+    def save(self, today: Optional[datetime.date] = None) -> None:
+        """Merge this run's verdicts into the stored table and drop stale entries."""
+        today = today or datetime.date.today()
+        stamp = today.isoformat()
+        cutoff = (today - datetime.timedelta(days=MAX_AGE_DAYS)).isoformat()
+        table = {k: v for k, v in self._table.items() if v[0] >= cutoff}
+        touched = len(table) != len(self._table)
+        for k, verdict in self._seen.items():
+            old = table.get(k)
+            if old is None or old[0] != stamp or old[1] != verdict:
+                table[k] = [stamp, verdict]
+                touched = True
+        if touched or self._dirty:
+            save_json(self.name, {"version": VERDICTS_VERSION, "entries": table})
+        self._table = table
+        self._seen = {}
+        self._dirty = False